@@ -0,0 +1,74 @@
+# ground/bulk.py
+"""
+Vectorized bulk decoding of captured telemetry streams (requires NumPy).
+
+A capture is a contiguous run of fixed-size telemetry frames (TM_FRAME_LEN
+bytes each, layout per docs/Protocol.md and sat_sim.packet_np.TM_DTYPE). decode_many views the whole buffer
+as a NumPy structured array, checks preamble / msgtype / CRC for every frame
+at once and hands back one array per field.
+"""
+import os
+from typing import Dict, Tuple
+
+import numpy as np
+
+from sat_sim.packet import MSGTYPE_TM, TM_FRAME_LEN, TelemetryRecord
+from sat_sim.packet_np import PREAMBLE_U16, TM_DTYPE, crc16_x25_rows
+from .logger import SEG_MAGIC, SEG_FORMAT_VERSION, SEG_HEADER, SEG_RECORD_LEN
+
+FIELDS = TelemetryRecord._fields
+
+def as_frames(buffer) -> np.ndarray:
+    """
+    Zero-copy structured view of `buffer` (bytes, bytearray, memoryview, mmap).
+    Trailing bytes that do not make up a whole frame are ignored.
+    """
+    n = len(buffer) // TM_FRAME_LEN
+    return np.frombuffer(buffer, dtype=TM_DTYPE, count=n)
+
+def decode_many(buffer) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    Decode a contiguous run of telemetry frames in one pass.
+    Returns (columns, bad) where columns maps each TelemetryRecord field name
+    to an array over all frames and bad is a bool mask of frames whose
+    preamble, msgtype or CRC did not check out. Column values for bad frames
+    are whatever bytes were there; filter with columns[k][~bad].
+    """
+    frames = as_frames(buffer)
+    raw = frames.view(np.uint8).reshape(len(frames), TM_FRAME_LEN)
+    crc = crc16_x25_rows(raw[:, 2:TM_FRAME_LEN - 2])
+    bad = (frames["preamble"] != PREAMBLE_U16) \
+        | (frames["msgtype"] != MSGTYPE_TM) \
+        | (frames["crc"] != crc)
+    columns = {name: frames[name] for name in FIELDS}
+    return columns, bad
+
+# ---------------- binary archive reader (see ground.logger.BinaryLogger)
+SEG_DTYPE = np.dtype([("ground_ts_ms", "<i8"), ("frame", TM_DTYPE)])
+assert SEG_DTYPE.itemsize == SEG_RECORD_LEN
+
+def open_segment(path: str) -> Dict[str, np.ndarray]:
+    """
+    Memory-map a .tlm segment and return one read-only column per field
+    (ground_ts_ms plus every TelemetryRecord field). Nothing is copied; a
+    partially written trailing record is ignored.
+    Raises ValueError if the file is not a segment this reader understands.
+    """
+    with open(path, "rb") as f:
+        head = f.read(SEG_HEADER.size)
+    if len(head) < SEG_HEADER.size:
+        raise ValueError("Segment header truncated")
+    magic, version, header_len, record_len, _frame_len, _created = SEG_HEADER.unpack(head)
+    if magic != SEG_MAGIC or version != SEG_FORMAT_VERSION or record_len != SEG_RECORD_LEN:
+        raise ValueError(f"Unsupported segment: magic={magic!r} version={version} record_len={record_len}")
+
+    n = (os.path.getsize(path) - header_len) // record_len
+    if n > 0:
+        recs = np.memmap(path, dtype=SEG_DTYPE, mode="r", offset=header_len, shape=(n,))
+    else:
+        recs = np.zeros(0, dtype=SEG_DTYPE)  # np.memmap refuses empty maps
+    frames = recs["frame"]
+    columns = {"ground_ts_ms": recs["ground_ts_ms"]}
+    for name in FIELDS:
+        columns[name] = frames[name]
+    return columns
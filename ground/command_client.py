@@ -0,0 +1,190 @@
+# ground/command_client.py
+"""
+Pipelined uplink: keeps up to `window` commands in flight, matches ACKs
+by SEQ, retransmits on timeout and reports round-trip latency.
+
+The spacecraft acknowledges every command it receives (MSGTYPE_ACK, sent
+back to the command's source address) and suppresses duplicates by
+(source, SEQ), so retransmitting after a lost ACK never applies a
+command twice. Commands can therefore go out back to back instead of
+one send-and-wait at a time; the window bounds how far ahead of the
+ACKs the client runs. It is capped at CMD_HISTORY, the number of
+commands the spacecraft remembers: with more in flight, a retransmitted
+command could outlive its record there and be applied again.
+
+The retransmission timeout adapts like TCP's (RFC 6298): SRTT + 4 *
+RTTVAR from ACKed first transmissions only (Karn), clamped to
+[min_rto_s, max_rto_s], doubled per retry of the same command.
+"""
+import selectors
+import socket
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, List, NamedTuple, Optional, Tuple
+
+from sat_sim.packet import ACK_FRAME_LEN, CMD_HISTORY, pack_command, unpack_ack
+from sat_sim.timing import StageTimer
+
+
+class CommandResult(NamedTuple):
+    seq: int
+    cmd_id: int
+    param: int
+    ack_code: Optional[int]      # None: no ACK after all retries
+    rtt_us: Optional[int]        # last transmission to ACK
+    tries: int
+
+
+class _InFlight:
+    __slots__ = ("index", "cmd_id", "param", "frame", "sent_ns", "tries", "deadline_ns")
+
+    def __init__(self, index, cmd_id, param, frame):
+        self.index = index
+        self.cmd_id = cmd_id
+        self.param = param
+        self.frame = frame
+        self.sent_ns = 0
+        self.tries = 0
+        self.deadline_ns = 0
+
+
+class CommandClient:
+    """
+    UDP uplink to (host, port). send_all() pushes a command sequence
+    through the window and returns one CommandResult per command, in
+    order; request() is the one-command form. SEQ carries on across calls.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 5006, window: int = 32,
+                 timeout_s: float = 0.2, retries: int = 5, min_rto_s: float = 0.005,
+                 max_rto_s: float = 2.0, seq: int = 0):
+        if not 1 <= window <= CMD_HISTORY:
+            raise ValueError(f"window must be 1..{CMD_HISTORY} (the spacecraft's duplicate history)")
+        self.dest = (host, port)
+        self.window = window
+        self.retries = retries
+        self.min_rto_ns = int(min_rto_s * 1e9)
+        self.max_rto_ns = int(max_rto_s * 1e9)
+        self.rto_ns = int(timeout_s * 1e9)
+        self.srtt_ns: Optional[float] = None
+        self.rttvar_ns = 0.0
+        self.seq = seq & 0xFFFF
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.connect(self.dest)
+        self.sock.setblocking(False)
+        self._sel = selectors.DefaultSelector()
+        self._sel.register(self.sock, selectors.EVENT_READ)
+        self.timer = StageTimer()
+        self.sent = 0
+        self.retransmits = 0
+        self.acked = 0
+        self.failed = 0
+        self.stray_acks = 0          # duplicate / late / unknown ACKs
+        self.bad_frames = 0
+
+    def _update_rto(self, rtt_ns: int):
+        if self.srtt_ns is None:
+            self.srtt_ns = float(rtt_ns)
+            self.rttvar_ns = rtt_ns / 2.0
+        else:
+            self.rttvar_ns = 0.75 * self.rttvar_ns + 0.25 * abs(self.srtt_ns - rtt_ns)
+            self.srtt_ns = 0.875 * self.srtt_ns + 0.125 * rtt_ns
+        self.rto_ns = int(min(self.max_rto_ns, max(self.min_rto_ns, self.srtt_ns + 4 * self.rttvar_ns)))
+
+    def _transmit(self, f: _InFlight, now_ns: int):
+        try:
+            self.sock.send(f.frame)
+        except (BlockingIOError, ConnectionRefusedError):
+            pass    # counts as a lost datagram; the timeout retransmits
+        f.sent_ns = now_ns
+        f.deadline_ns = now_ns + min(self.max_rto_ns, self.rto_ns << f.tries)
+        f.tries += 1
+        self.sent += 1
+
+    def send_all(self, commands: Iterable[Tuple[int, int]],
+                 on_result: Optional[Callable[[CommandResult], None]] = None) -> List[CommandResult]:
+        """(cmd_id, param) pairs -> CommandResults in the same order."""
+        pending = iter(enumerate(commands))
+        results: List[Optional[CommandResult]] = []
+        inflight: "OrderedDict[int, _InFlight]" = OrderedDict()   # seq -> command, oldest first
+        exhausted = False
+        clock = time.perf_counter_ns
+        while True:
+            # fill the window
+            while not exhausted and len(inflight) < self.window:
+                try:
+                    index, (cmd_id, param) = next(pending)
+                except StopIteration:
+                    exhausted = True
+                    break
+                seq = self.seq
+                self.seq = (seq + 1) & 0xFFFF
+                f = _InFlight(index, cmd_id, param, pack_command(cmd_id, param, seq=seq))
+                results.append(None)
+                inflight[seq] = f
+                self._transmit(f, clock())
+            if not inflight:
+                break
+            timeout_ns = min(f.deadline_ns for f in inflight.values()) - clock()
+            if self._sel.select(max(0.0, timeout_ns / 1e9)):
+                self._read_acks(inflight, results, on_result)
+            now = clock()
+            for seq, f in list(inflight.items()):
+                if now < f.deadline_ns:
+                    continue
+                if f.tries > self.retries:
+                    del inflight[seq]
+                    self.failed += 1
+                    self._finish(results, on_result, f.index,
+                                 CommandResult(seq, f.cmd_id, f.param, None, None, f.tries))
+                else:
+                    self.retransmits += 1
+                    self._transmit(f, now)
+        return results
+
+    def _read_acks(self, inflight, results, on_result):
+        while True:
+            try:
+                data = self.sock.recv(64)
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionRefusedError:     # ICMP port unreachable: nobody listening yet
+                continue
+            now = time.perf_counter_ns()
+            try:
+                seq, cmd_id, ack_code = unpack_ack(data[:ACK_FRAME_LEN])
+            except ValueError:
+                self.bad_frames += 1
+                continue
+            f = inflight.get(seq)
+            if f is None or f.cmd_id != cmd_id:
+                self.stray_acks += 1
+                continue
+            del inflight[seq]
+            rtt = now - f.sent_ns
+            if f.tries == 1:
+                self._update_rto(rtt)    # Karn: a retransmitted command's ACK is ambiguous
+            self.timer.record("rtt", rtt)
+            self.acked += 1
+            self._finish(results, on_result, f.index,
+                         CommandResult(seq, f.cmd_id, f.param, ack_code, rtt // 1000, f.tries))
+
+    @staticmethod
+    def _finish(results, on_result, index: int, res: CommandResult):
+        results[index] = res
+        if on_result is not None:
+            on_result(res)
+
+    def request(self, cmd_id: int, param: int = 0) -> CommandResult:
+        return self.send_all([(cmd_id, param)])[0]
+
+    def stats(self) -> dict:
+        rtt = self.timer.snapshot()["lifetime"].get("rtt", {})
+        return {
+            "sent": self.sent, "retransmits": self.retransmits, "acked": self.acked,
+            "failed": self.failed, "stray_acks": self.stray_acks, "bad_frames": self.bad_frames,
+            "rto_ms": round(self.rto_ns / 1e6, 3), "rtt_us": rtt,
+        }
+
+    def close(self):
+        self._sel.close()
+        self.sock.close()
@@ -1,58 +1,117 @@
-# ground/command_sender.py
-import json
-import struct
-import time
+"""
+Uplink console. Interactive: each command waits for its ACK and prints
+the ack code and round-trip time. With --file the commands in the file
+(one per line, same syntax, # comments) go out pipelined through
+CommandClient's window, followed by throughput and RTT stats:
+
+    python -m ground.command_sender --file pass_plan.txt --window 64
+"""
 import argparse
-from sat_sim.packet import pack_command
-from sat_sim.link import UDPSender
+import sys
+import time
+from typing import Optional, Tuple
+
+from sat_sim.packet import CMD_HISTORY
+
+from .command_client import CommandClient, CommandResult
+
+ACK_TEXT = {0: "OK", 1: "UNKNOWN_CMD", 2: "BAD_PARAM"}
+CMD_NAMES = {1: "SET_MODE", 2: "RESET_SEQ", 3: "PING"}
+
+
+def parse_command(line: str) -> Optional[Tuple[int, int]]:
+    """'setmode 1' / 'resetseq' / 'ping' / 'raw <id> <param>' -> (cmd_id, param); None if not a command."""
+    parts = line.split()
+    cmd = parts[0].lower()
+    try:
+        if cmd == "setmode" and len(parts) == 2:
+            return 1, int(parts[1])
+        if cmd == "resetseq" and len(parts) == 1:
+            return 2, 0
+        if cmd == "ping" and len(parts) == 1:
+            return 3, 0
+        if cmd == "raw" and len(parts) == 3:
+            return int(parts[1]), int(parts[2])
+    except ValueError:
+        pass
+    return None
+
+
+def format_result(r: CommandResult) -> str:
+    name = CMD_NAMES.get(r.cmd_id, f"CMD{r.cmd_id}")
+    if r.ack_code is None:
+        return f"{name}({r.param}) seq={r.seq} NO ACK after {r.tries} tries"
+    retry = f" tries={r.tries}" if r.tries > 1 else ""
+    return (f"{name}({r.param}) seq={r.seq} ack={ACK_TEXT.get(r.ack_code, r.ack_code)} "
+            f"rtt={r.rtt_us / 1000:.2f}ms{retry}")
 
-def main():
+
+def run_file(client: CommandClient, path: str, verbose: bool) -> int:
+    commands = []
+    with (sys.stdin if path == "-" else open(path)) as f:
+        for n, line in enumerate(f, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            cmd = parse_command(line)
+            if cmd is None:
+                print(f"{path}:{n}: bad command {line!r}")
+                return 2
+            commands.append(cmd)
+    t0 = time.perf_counter()
+    results = client.send_all(commands, on_result=(lambda r: print(format_result(r))) if verbose else None)
+    elapsed = time.perf_counter() - t0
+    s = client.stats()
+    rtt = s["rtt_us"]
+    print(f"{len(results)} commands in {elapsed:.3f}s ({len(results) / elapsed:,.0f}/s), window {client.window}: "
+          f"acked={s['acked']} failed={s['failed']} retransmits={s['retransmits']} stray_acks={s['stray_acks']}")
+    if rtt:
+        print(f"rtt p50={rtt['p50']}us p99={rtt['p99']}us max={rtt['max']}us (rto {s['rto_ms']}ms)")
+    return 1 if s["failed"] else 0
+
+
+def main(argv=None):
     parser = argparse.ArgumentParser()
     parser.add_argument("--host", default="127.0.0.1")
     parser.add_argument("--port", type=int, default=5006)
-    args = parser.parse_args()
-
-    sender = UDPSender(args.host, args.port)
-    seq = 0
-    print(f"Command sender ready -> {args.host}:{args.port}")
-    print("Commands:")
-    print("  1) setmode <0|1|2>     -- 0=OP,1=SAFE,2=IDLE")
-    print("  2) resetseq            -- reset seq (sim only prints ack)")
-    print("  3) ping                -- test uplink")
-    print("  q) quit")
-
-    while True:
-        try:
-            line = input("> ").strip()
-        except EOFError:
-            break
-        if not line:
-            continue
-        parts = line.split()
-        cmd = parts[0].lower()
-        if cmd in ("q", "quit", "exit"):
-            break
-        if cmd == "setmode" and len(parts) == 2:
+    parser.add_argument("--file", default=None, help="send the commands in FILE ('-': stdin) pipelined")
+    parser.add_argument("--window", type=int, default=32, help=f"commands in flight (max {CMD_HISTORY})")
+    parser.add_argument("--timeout-ms", type=float, default=200.0, help="initial retransmission timeout")
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--quiet", action="store_true", help="--file: stats only, no line per command")
+    args = parser.parse_args(argv)
+
+    client = CommandClient(args.host, args.port, window=args.window,
+                           timeout_s=args.timeout_ms / 1000.0, retries=args.retries)
+    try:
+        if args.file:
+            return run_file(client, args.file, not args.quiet)
+
+        print(f"Command sender ready -> {args.host}:{args.port}")
+        print("Commands:")
+        print("  1) setmode <0|1|2>     -- 0=OP,1=SAFE,2=IDLE")
+        print("  2) resetseq            -- reset seq")
+        print("  3) ping                -- test uplink")
+        print("     raw <id> <param>    -- any command id")
+        print("  q) quit")
+        while True:
             try:
-                mode = int(parts[1])
-            except:
-                print("bad mode")
+                line = input("> ").strip()
+            except EOFError:
+                break
+            if not line:
+                continue
+            if line.lower() in ("q", "quit", "exit"):
+                break
+            cmd = parse_command(line)
+            if cmd is None:
+                print("Unknown command")
                 continue
-            frame = pack_command(cmd_id=1, param=mode, seq=seq)
-            sender.send(frame)
-            print(f"Sent SET_MODE={mode} seq={seq}")
-        elif cmd == "resetseq":
-            frame = pack_command(cmd_id=2, param=0, seq=seq)
-            sender.send(frame)
-            print(f"Sent RESET_SEQ seq={seq}")
-        elif cmd == "ping":
-            frame = pack_command(cmd_id=3, param=0, seq=seq)
-            sender.send(frame)
-            print(f"Sent PING seq={seq}")
-        else:
-            print("Unknown command")
-        seq = (seq + 1) & 0xFFFF
+            print(format_result(client.request(*cmd)))
+    finally:
+        client.close()
+    return 0
 
-if __name__ == "__main__":
-    main()
 
+if __name__ == "__main__":
+    sys.exit(main())
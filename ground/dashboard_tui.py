@@ -1,6 +1,12 @@
 # ground/dashboard_tui.py
-import os, json, time, curses, statistics
-from collections import deque
+import os, json, time, curses
+from sat_sim.packet import TM_FRAME_LEN
+from .decode import row_from_record
+from .ground import load_config
+from .pubsub import LiveSubscriber
+from .rollup import summary
+from .stats import FleetStats
+from .stats_http import fetch, parse_addr
 from .tail import tail_lines
 
 LOG_DIR = os.path.join(os.path.dirname(__file__), "logs")
@@ -22,6 +28,50 @@ def find_log():
         return None
     return max(cands, key=os.path.getmtime)
 
+def live_rows(sub: LiveSubscriber):
+    """Rows straight from the ground station's live socket; None while quiet."""
+    while True:
+        recs = sub.recv(0.1)
+        if not recs:
+            yield None
+        for ts_ms, rec in recs:
+            row = row_from_record(rec, TM_FRAME_LEN)
+            row["timestamp"] = ts_ms / 1000.0
+            yield row
+
+def log_rows(path):
+    for line in tail_lines(path):
+        try:
+            yield json.loads(line)
+        except Exception:
+            continue
+
+def open_source(cfg):
+    """(label, row iterator): the live socket if the ground publishes one, else the JSONL log."""
+    live = cfg.get("ground_live_socket")
+    if live and os.path.exists(live):
+        return f"live {live}", live_rows(LiveSubscriber(live))
+    path = find_log()
+    if not path:
+        return None, None
+    return os.path.basename(path), log_rows(path)
+
+TREND_FIELDS = ("temp_c", "batt_mv")
+TRENDS = (("1h", 3600, 60_000), ("24h", 86400, 3_600_000))   # label, span s, resolution read
+
+def trend_lines(rollup_dir, now):
+    """min/mean/max per TREND_FIELDS over each TRENDS span, from the ground's rollups."""
+    lines = []
+    for label, span_s, res in TRENDS:
+        end = int(now * 1000)
+        agg = summary(rollup_dir, end - span_s * 1000, end, res, TREND_FIELDS)
+        if agg is None:
+            lines.append(f"{label:>4}: no rollups yet")
+            continue
+        lines.append(f"{label:>4}: " + "   ".join(
+            f"{k} {agg[k]['min']:.6g}/{agg[k]['mean']:.6g}/{agg[k]['max']:.6g}" for k in TREND_FIELDS))
+    return lines
+
 def draw_bar(win, y, x, label, value, minv, maxv, width=40):
     v = max(minv, min(maxv, value))
     frac = 0.0 if maxv == minv else (v - minv) / (maxv - minv)
@@ -33,29 +83,37 @@ def main(stdscr):
     curses.curs_set(0)
     stdscr.nodelay(True)
 
-    path = find_log()
-    if not path:
-        stdscr.addstr(0, 0, "No JSONL log found. Start ground station first, then run dashboard.")
+    cfg = load_config()
+    label, rows = open_source(cfg)
+    if not rows:
+        stdscr.addstr(0, 0, "No live socket or JSONL log found. Start ground station first, then run dashboard.")
         stdscr.refresh()
         time.sleep(3)
         return
 
-    # rate calc over last N seconds using ground-side timestamps
-    recent_ts = deque(maxlen=1000)
-    recent_seq = deque(maxlen=1000)
+    # link stats: the ground's own (the numbers on its status line, per
+    # spacecraft and merged) from its stats endpoint; counted here only if
+    # that does not answer, and then rows carry no source, so one spacecraft
+    stats_addr = parse_addr(cfg.get("ground_stats_http"))
+    local = FleetStats()
+    link, last_fetch = None, 0.0
+    # trends over hours come from the rollups (ground.rollup), not from replaying rows
+    rollup_dir = cfg.get("ground_rollup_dir")
+    trends, last_trend = [], 0.0
 
     # last values
     last = {k: None for k in FIELDS}
     last_time = time.time()
 
-    stdscr.addstr(0, 0, f"Live Telemetry Dashboard  (source: {os.path.basename(path)})   Press 'q' to quit")
+    stdscr.addstr(0, 0, f"Live Telemetry Dashboard  (source: {label})   Press 'q' to quit")
     stdscr.refresh()
 
     row_y = 2
-    for line in tail_lines(path):
-        try:
-            row = json.loads(line)
-        except Exception:
+    for row in rows:
+        if row is None:
+            ch = stdscr.getch()
+            if ch in (ord('q'), ord('Q')):
+                break
             continue
 
         # update state
@@ -63,11 +121,9 @@ def main(stdscr):
             if k in row:
                 last[k] = row[k]
 
-        # update rate stats
-        if "timestamp" in row:
-            recent_ts.append(row["timestamp"])
+        # update link stats
         if "seq" in row:
-            recent_seq.append(row["seq"])
+            local.note_good(row.get("source"), row["seq"], row.get("timestamp_ms"))
 
         # draw UI at ~10 Hz
         now = time.time()
@@ -80,21 +136,27 @@ def main(stdscr):
         last_time = now
 
         stdscr.erase()
-        stdscr.addstr(0, 0, f"Live Telemetry Dashboard  (source: {os.path.basename(path)})   Press 'q' to quit")
+        stdscr.addstr(0, 0, f"Live Telemetry Dashboard  (source: {label})   Press 'q' to quit")
 
-        # compute pps over ~10s window
-        pps = 0.0
-        if len(recent_ts) >= 2:
-            dt = recent_ts[-1] - recent_ts[0]
-            if dt > 0:
-                pps = (len(recent_ts) - 1) / dt
+        if stats_addr and now - last_fetch >= 1.0:    # the ground publishes once a second
+            doc = fetch(stats_addr)
+            link = doc.get("link") if doc else None
+            last_fetch = now
+        snap = link or local.snapshot(now)
+        w10 = snap["windows"]["10s"]
+        w60 = snap["windows"]["60s"]
 
         # header line
-        stdscr.addstr(2, 0, f"pps≈{pps:.2f}   seq={last.get('seq')}   mode={last.get('mode')}   "
-                             f"ver={last.get('version')} type={last.get('msgtype')}")
+        stdscr.addstr(2, 0, f"pps≈{w10['rate_pps']:.2f}   seq={last.get('seq')}   mode={last.get('mode')}   "
+                             f"ver={last.get('version')} type={last.get('msgtype')}   "
+                             f"sources={snap['sources']} ({'ground' if link else 'local'} stats)")
+        lat = w10["latency_ms"]
+        stdscr.addstr(3, 0, f"loss 10s/60s={w10['loss_pct']}%/{w60['loss_pct']}%   dup={w60['duplicates']} "
+                             f"ooo={w60['reordered']}   jitter={w10['jitter_ms']}ms   "
+                             f"latency p50/p99={lat['p50']}/{lat['p99']}ms")
 
         # main metrics
-        y = 4
+        y = 5
         try:
             temp_c = float(last.get("temp_c") or 0.0)
             batt_mv = int(last.get("batt_mv") or 0)
@@ -116,6 +178,15 @@ def main(stdscr):
         # timestamps
         stdscr.addstr(y+7, 0, f"Sat ts (ms): {last.get('timestamp_ms')}    Ground ts: {last.get('timestamp')}")
 
+        # trends (min/mean/max), refreshed as minute buckets land
+        if rollup_dir and now - last_trend >= 10.0:
+            trends = trend_lines(rollup_dir, now)
+            last_trend = now
+        if trends:
+            stdscr.addstr(y+9, 0, "Trend min/mean/max (rollups):")
+            for i, line in enumerate(trends):
+                stdscr.addstr(y+10+i, 0, line)
+
         stdscr.refresh()
 
         # quit?
@@ -1,39 +1,113 @@
-# ground/decode.py
-from typing import Dict
-from sat_sim.packet import unpack_frame
+from typing import Dict, List, Tuple
+from sat_sim.packet import (
+    MSGTYPE_TM_BATCH, MSGTYPE_TM_DELTA, TelemetryDeltaDecoder, TelemetryRecord,
+    pack_record, unpack_telemetry, unpack_telemetry_batch, unpack_telemetry_delta,
+)
 
 MODE_MAP = {0: "OP", 1: "SAFE", 2: "IDLE"}
 
+def row_from_record(f: TelemetryRecord, raw_len: int) -> Dict:
+    """Human-friendly ground row for a telemetry record."""
+    return {
+        "version": f.version,
+        "msgtype": f.msgtype,
+        "seq": f.seq,
+        "timestamp_ms": f.timestamp_ms,
+        "mode": MODE_MAP.get(f.mode, str(f.mode)),
+        "batt_mv": f.batt_mv,
+        "temp_c": round(f.temp_centideg / 100.0, 2),
+        "press_pa": f.press_pa,
+        "alt_cm": f.alt_cm,
+        "gyro_x": f.gyro_x,
+        "gyro_y": f.gyro_y,
+        "gyro_z": f.gyro_z,
+        "acc_x": f.acc_x,
+        "acc_y": f.acc_y,
+        "acc_z": f.acc_z,
+        "light": f.light,
+        "comp_len": f.comp_len,
+        "raw_len": raw_len,
+    }
+
 def decode_datagram(data: bytes) -> Dict:
     """
-    Takes a single UDP datagram (one frame), validates CRC via unpack_frame,
+    Takes a single UDP datagram (one frame), validates CRC via unpack_telemetry,
     converts a few fields into human-friendly forms, and returns dict.
     Raises ValueError if frame is invalid.
     """
     try:
-        f = unpack_frame(data)  # may raise ValueError (bad preamble/CRC/len)
+        f = unpack_telemetry(data)  # may raise ValueError (bad preamble/CRC/len)
     except Exception as e:
         # Explicitly re-raise as ValueError for ground loop consistency
         raise ValueError(f"Failed to unpack frame: {e}")
+    return row_from_record(f, len(data))
 
-    return {
-        "version": int(f["version"]),
-        "msgtype": int(f["msgtype"]),
-        "seq": int(f["seq"]),
-        "timestamp_ms": int(f["timestamp_ms"]),
-        "mode": MODE_MAP.get(f["mode"], str(f["mode"])),
-        "batt_mv": int(f["batt_mv"]),
-        "temp_c": round(f["temp_centideg"] / 100.0, 2),
-        "press_pa": int(f["press_pa"]),
-        "alt_cm": int(f["alt_cm"]),
-        "gyro_x": int(f["gyro"][0]),
-        "gyro_y": int(f["gyro"][1]),
-        "gyro_z": int(f["gyro"][2]),
-        "acc_x": int(f["acc"][0]),
-        "acc_y": int(f["acc"][1]),
-        "acc_z": int(f["acc"][2]),
-        "light": int(f["light"]),
-        "comp_len": int(f["comp_len"]),
-        "raw_len": int(f["raw_frame_len"]),
-    }
+def predecode(data: bytes) -> tuple:
+    """
+    Stateless half of stream decoding (safe to run in worker processes):
+      ("tm", rows, records)  for a full telemetry frame / keyframe, or a
+                             batch frame unrolled into one row per sample
+      ("delta", seq, deltas) for a delta frame, to be applied in order
+    Raises ValueError if the frame is invalid.
+    """
+    try:
+        msgtype = data[3] if len(data) > 3 else None
+        if msgtype == MSGTYPE_TM_DELTA:
+            seq, deltas = unpack_telemetry_delta(data)
+            return ("delta", seq, deltas)
+        if msgtype == MSGTYPE_TM_BATCH:
+            recs = unpack_telemetry_batch(data)
+        else:
+            recs = [unpack_telemetry(data)]
+    except Exception as e:
+        raise ValueError(f"Failed to unpack frame: {e}")
+    n = len(data)
+    return ("tm", [row_from_record(r, n) for r in recs], recs)
+
+class StreamDecoder:
+    """
+    Decodes keyframes, batch and delta frames, keeping one
+    TelemetryDeltaDecoder per source so each spacecraft's delta chain is
+    reconstructed separately.
+    """
+    def __init__(self):
+        self.streams = {}
+
+    def _stream(self, source) -> TelemetryDeltaDecoder:
+        d = self.streams.get(source)
+        if d is None:
+            d = self.streams[source] = TelemetryDeltaDecoder()
+        return d
+
+    def decode(self, data: bytes, source=None) -> List[Tuple[Dict, bytes]]:
+        """Same as resolve(predecode(data), ...). Raises ValueError if invalid."""
+        return self.resolve(predecode(data), data, source)
+
+    def resolve(self, pre: tuple, data: bytes, source=None) -> List[Tuple[Dict, bytes]]:
+        """
+        Returns one (row, frame) per sample, where frame is the full 40-byte
+        telemetry frame for that sample (the datagram itself when it is one,
+        re-packed otherwise). Empty when a delta arrives without its
+        predecessor and the stream waits for a keyframe.
+        """
+        d = self._stream(source)
+        d.bytes_in += len(data)
+        if pre[0] == "tm":
+            rows, recs = pre[1], pre[2]
+            for r in recs:
+                d.keyframe(r)
+            if len(recs) == 1 and data[3] != MSGTYPE_TM_BATCH:
+                return [(rows[0], data)]
+            return [(row, pack_record(r)) for row, r in zip(rows, recs)]
+        rec = d.apply(pre[1], pre[2])
+        if rec is None:
+            return []
+        return [(row_from_record(rec, len(data)), pack_record(rec))]
 
+    def snapshot(self) -> dict:
+        bytes_in = sum(d.bytes_in for d in self.streams.values())
+        samples = sum(d.samples for d in self.streams.values())
+        return {
+            "bytes_per_sample": round(bytes_in / samples, 1) if samples else 0.0,
+            "unsynced": sum(d.unsynced for d in self.streams.values()),
+        }
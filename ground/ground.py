@@ -1,9 +1,17 @@
 # ground/ground.py
-import os, json, socket, time
+import os, json, signal, time
 from typing import Optional
-from .decode import decode_datagram
-from .logger import CsvLogger, JsonlLogger
-from .stats import StatsTracker
+from sat_sim.timing import StageTimer
+from .decode import StreamDecoder
+from .logger import CsvLogger, JsonlLogger, BinaryLogger, LogWriter, SourceRouter
+from .metrics import Sampler, install_toggle, instrument, profile_route, render_prometheus, uninstrument
+from .pubsub import LivePublisher
+from .rollup import RollupRouter
+from .shmring import RingWriter
+from .stats import FleetStats, format_windows
+from .stats_http import StatsEndpoint, parse_addr
+from .stream_rx import StreamReceiver, open_receiver
+from .udp_rx import BatchReceiver, open_socket
 
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config.json')
 
@@ -11,54 +19,230 @@ def load_config():
     with open(CONFIG_PATH, "r") as f:
         return json.load(f)
 
-def run():
-    cfg = load_config()
+def make_loggers(cfg: dict, log_dir: str):
+    """
+    Build (csv, jsonl, binlog) SourceRouters for the loggers enabled in
+    config (None if off). Call router.get(source) for the logger to write to.
+      ground_per_source_logs  one log stream per spacecraft (source address)
+    All loggers share the group-commit settings:
+      ground_log_flush_rows  flush after this many rows (1 = every row)
+      ground_log_flush_ms    ...or once this many ms passed since the last flush
+      ground_log_fsync       fsync on every flush (segment and index); run() then
+                             writes the logs from a LogWriter thread so the fsyncs
+                             never stall the receive loop
+    """
+    rows = int(cfg.get("ground_log_flush_rows", 1))
+    ms = float(cfg.get("ground_log_flush_ms", 0))
+    fsync = bool(cfg.get("ground_log_fsync", False))
+    bin_rows = int(cfg.get("ground_log_bin_batch", 256))
+    per_source = bool(cfg.get("ground_per_source_logs", False))
+    csv = SourceRouter(lambda tag: CsvLogger(log_dir, rows, ms, fsync, tag), per_source) \
+        if cfg.get("ground_log_csv", True) else None
+    jsonl = SourceRouter(lambda tag: JsonlLogger(log_dir, rows, ms, fsync, tag), per_source) \
+        if cfg.get("ground_log_jsonl", True) else None
+    binlog = SourceRouter(lambda tag: BinaryLogger(log_dir, bin_rows, ms, fsync, tag), per_source) \
+        if cfg.get("ground_log_bin", False) else None
+    return csv, jsonl, binlog
+
+def _raise_interrupt(signum, frame):
+    # treat SIGTERM like Ctrl-C so the finally block flushes and closes logs
+    raise KeyboardInterrupt
+
+def run(cfg: Optional[dict] = None):
+    """Receive loop; `cfg` overrides config.json (tools/bench.py runs it on spare ports)."""
+    cfg = cfg if cfg is not None else load_config()
     host = cfg.get("udp_host", "127.0.0.1")
     port = int(cfg.get("udp_port", 5005))
     log_dir = cfg.get("ground_log_dir", "ground/logs")
     status_iv = int(cfg.get("ground_status_interval_sec", 5))
 
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind((host, port))
-    sock.settimeout(0.5)
+    csv, jsonl, binlog = make_loggers(cfg, log_dir)
+    loggers = [l for l in (csv, jsonl, binlog) if l]
+    # wake up often enough to honour the time-based flush while idle
+    flush_ms = float(cfg.get("ground_log_flush_ms", 0))
+    idle_timeout = min(0.5, flush_ms / 1000.0) if flush_ms > 0 else 0.5
+    # fsync waits for the disk: hand the rows to a writer thread that owns the loggers
+    writer = None
+    if loggers and cfg.get("ground_log_fsync", False):
+        writer = LogWriter([(l, l is binlog) for l in loggers],
+                           int(cfg.get("ground_sink_queue", 4096)), idle_timeout)
+        loggers = []
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    stats = FleetStats()
+    decoder = StreamDecoder()
+    # live fan-out to dashboards (ground.pubsub); null in config turns it off
+    live_path = cfg.get("ground_live_socket")
+    pub = LivePublisher(live_path) if live_path else None
+    # recent-telemetry window in shared memory (ground.shmring)
+    ring_name = cfg.get("ground_shm_ring")
+    ring = RingWriter(ring_name, int(cfg.get("ground_shm_ring_records", 65536))) if ring_name else None
+    # 1 s / 1 min / 1 h aggregates (ground.rollup)
+    rollup_dir = cfg.get("ground_rollup_dir")
+    rollups = RollupRouter(rollup_dir, bool(cfg.get("ground_per_source_logs", False))) if rollup_dir else None
+    # per-stage latency histograms (queue / decode / deliver / ground) and the stats endpoint
+    timer = StageTimer() if cfg.get("ground_latency_stats", True) else None
+    stats_addr = parse_addr(cfg.get("ground_stats_http"))
+    endpoint = StatsEndpoint(*stats_addr) if stats_addr else None
+    # opt-in: timed wrappers around CRC / unpack / decode / logger writes (ground.metrics)
+    fn_stats = instrument() if cfg.get("ground_metrics", False) else None
+    # sampling profiler: idle until SIGUSR1 or GET /profile?seconds=N
+    sampler = Sampler(hz=float(cfg.get("ground_profile_hz", 200)))
+    install_toggle(sampler, cfg.get("ground_profile_dir", "ground/profiles"))
+    if endpoint:
+        endpoint.route("/profile", profile_route(sampler))
+
+    # link_transport "tcp"/"serial": a byte stream cut into frames (ground.stream_rx)
+    transport = cfg.get("link_transport", "udp")
+    workers = int(cfg.get("ground_decode_workers", 0)) if transport == "udp" else 0
+    pipe = rx = None
+    if transport != "udp":
+        rx = open_receiver(cfg)
+    elif workers > 0:
+        sock = open_socket(host, port, cfg.get("ground_rcvbuf_bytes"))
+        from .pipeline import DecodePipeline
+        pipe = DecodePipeline(sock, workers, int(cfg.get("ground_decode_batch", 256)), decoder=decoder)
+    else:
+        sock = open_socket(host, port, cfg.get("ground_rcvbuf_bytes"))
+        rx = BatchReceiver(sock, int(cfg.get("ground_rx_batch", 64)))
+
+    def deliver(frame, addr, row):
+        # frame is the full telemetry frame (re-packed if it arrived as a delta)
+        if row is None:
+            stats.note_bad(addr)
+            return
+        stats.note_good(addr, row["seq"], row["timestamp_ms"])
+        if writer:
+            writer.write(addr, row, frame)
+        else:
+            if csv: csv.get(addr).write(row)
+            if jsonl: jsonl.get(addr).write(row)
+            if binlog: binlog.get(addr).write_frame(frame)
+        if pub: pub.publish(frame)
+        if ring: ring.write(frame)
+        if rollups: rollups.get(addr).add(row)
 
-    csv = CsvLogger(log_dir) if cfg.get("ground_log_csv", True) else None
-    jsonl = JsonlLogger(log_dir) if cfg.get("ground_log_jsonl", True) else None
-    stats = StatsTracker()
+    def receive_batch():
+        # views into the receive ring; valid until the next recv_batch
+        for data, addr, rx_ns in rx.timed_frames():
+            t0 = time.perf_counter_ns()
+            try:
+                samples = decoder.decode(data, addr)   # may raise ValueError
+            except Exception as e:
+                print("[GROUND] Decode failed:", e)   # debug info
+                deliver(data, addr, None)
+                continue
+            t1 = time.perf_counter_ns()
+            # one per sample; none for a delta waiting for a keyframe
+            for row, frame in samples:
+                deliver(frame, addr, row)
+            t2 = time.perf_counter_ns()
+            if timer:
+                timer.record("decode", t1 - t0)
+                if samples:
+                    timer.record("deliver", (t2 - t1) // len(samples))
+                if rx_ns:
+                    # kernel stamp -> everything written out for this datagram
+                    ground_ns = time.time_ns() - rx_ns
+                    timer.record("queue", ground_ns - (t2 - t0))
+                    timer.record("ground", ground_ns)
+
+    def publish_stats():
+        link = stats.snapshot()
+        latency = timer.snapshot() if timer else None
+        src = pipe or rx
+        endpoint.publish({
+            "link": link,
+            "per_source": stats.per_source(),
+            "latency_us": latency,
+            "decoder": decoder.snapshot(),
+            "kernel_drops": src.kernel_drops,
+            "stream": rx.snapshot() if isinstance(rx, StreamReceiver) else None,
+        })
+        endpoint.publish_text(render_prometheus(link, latency, fn_stats, {
+            "cubesat_kernel_drops_total": ("Datagrams the kernel dropped (SO_RXQ_OVFL).", src.kernel_drops),
+            "cubesat_rx_timeouts_total": ("Receive waits that timed out with no datagram.", src.timeouts),
+        }), "/metrics", "text/plain; version=0.0.4; charset=utf-8")
 
-    print(f"Ground station listening on {host}:{port}")
-    last_status = time.time()
+    print(f"Ground station listening on {host}:{port}" + (f" ({transport})" if transport != "udp" else "")
+          + (f" ({workers} decode workers)" if pipe else "")
+          + (f", stats on http://{stats_addr[0]}:{endpoint.address[1]}/stats" if endpoint else ""))
+    last_status = last_publish = time.time()
 
     try:
         while True:
-            try:
-                data, _ = sock.recvfrom(4096)
-            except socket.timeout:
-                # periodic status even if quiet
-                pass
+            if pipe:
+                batch = pipe.poll(0.5)
+                t0 = time.perf_counter_ns()
+                for frame, addr, row in batch:
+                    if row is None:
+                        print(f"[GROUND] Decode failed: bad frame from {addr}")
+                    deliver(frame, addr, row)
+                if timer and batch:
+                    timer.record("deliver", (time.perf_counter_ns() - t0) // len(batch))
+                if not batch:
+                    for l in loggers:
+                        l.poll()
+                    if rollups: rollups.poll()
+                if pub: pub.flush()
+            elif rx.recv_batch(idle_timeout):
+                receive_batch()
+                if pub: pub.flush()   # one datagram per viewer per receive batch
             else:
-                try:
-                    row = decode_datagram(data)   # may raise ValueError
-                except Exception as e:
-                    print("[GROUND] Decode failed:", e)   # debug info
-                    stats.note_bad()
-                else:
-                    stats.note_good(row["seq"])
-                    if csv: csv.write(row)
-                    if jsonl: jsonl.write(row)
+                # periodic status even if quiet; push out rows waiting on flush_ms
+                for l in loggers:
+                    l.poll()
+                if rollups: rollups.poll()
+                if pub: pub.flush()   # still pick up (un)subscribes while idle
+
+            if endpoint and time.time() - last_publish >= 1.0:
+                publish_stats()
+                last_publish = time.time()
 
             # Print periodic status
             if time.time() - last_status >= status_iv:
                 snap = stats.snapshot()
+                kdrop = (pipe or rx).kernel_drops
+                dec = decoder.snapshot()
                 print(f"[status] good={snap['total_good']} bad={snap['total_bad']} "
-                      f"loss={snap['seq_loss']} ({snap['loss_pct']}%) rate≈{snap['rate_est_pps']} pps")
+                      f"loss={snap['seq_loss']} ({snap['loss_pct']}%) kdrop={kdrop} "
+                      f"rate≈{snap['rate_est_pps']} pps sources={snap['sources']} "
+                      f"B/sample={dec['bytes_per_sample']} unsynced={dec['unsynced']}"
+                      + (f" viewers={len(pub.subscribers)} vdrop={pub.dropped}" if pub else "")
+                      + (f" logdrop={writer.dropped}" if writer else ""))
+                if isinstance(rx, StreamReceiver):
+                    st = rx.snapshot()
+                    print(f"[stream] streams={st['streams']} bytes={st['bytes_in']} frames={st['frames']} "
+                          f"skipped={st['skipped']} crc_err={st['crc_errors']}")
+                print(f"[window] {format_windows(snap)}")
+                if timer:
+                    print(f"[latency] {timer.status(stages=['queue', 'decode', 'deliver', 'ground'])}")
                 last_status = time.time()
 
     except KeyboardInterrupt:
         print("Ground station stopped.")
     finally:
-        if csv: csv.close()
-        if jsonl: jsonl.close()
+        if pipe:
+            pipe.stop()
+            for frame, addr, row in pipe.drain():
+                deliver(frame, addr, row)
+            pipe.close()
+        if isinstance(rx, StreamReceiver):
+            rx.close()
+        for l in loggers:
+            l.close()
+        if writer:
+            writer.close()    # writes what is queued, then flushes, fsyncs and closes
+        if pub:
+            pub.close()
+        if ring:
+            ring.close()
+        if rollups:
+            rollups.close()
+        if endpoint:
+            endpoint.close()
+        if sampler.running:
+            sampler.stop()
+        uninstrument()
 
 if __name__ == "__main__":
     run()
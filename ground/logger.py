@@ -1,5 +1,8 @@
 # ground/logger.py
-import os, csv, time, json
+import os, csv, time, json, struct, queue, threading
+from typing import Callable, Iterable, List, Optional, Tuple
+from sat_sim.packet import TM_FRAME_LEN
+from .stats import source_tag
 
 def _update_symlink(path: str, link_path: str):
     try:
@@ -13,13 +16,121 @@ def _update_symlink(path: str, link_path: str):
         # symlink may fail on some filesystems; ignore
         pass
 
-class CsvLogger:
-    def __init__(self, log_dir: str):
+def _log_path(log_dir: str, ext: str, tag: Optional[str]) -> str:
+    ts = int(time.time())
+    if tag:
+        return os.path.join(log_dir, f"telemetry_{tag}_{ts}.{ext}")
+    return os.path.join(log_dir, f"telemetry_{ts}.{ext}")
+
+def _latest_link(log_dir: str, ext: str, tag: Optional[str]) -> str:
+    return os.path.join(log_dir, f"latest_{tag}.{ext}" if tag else f"latest.{ext}")
+
+class _GroupCommit:
+    """
+    Flush policy shared by the loggers: rows are staged in the file's
+    userspace buffer and pushed to the OS every `flush_rows` rows or once
+    `flush_ms` has passed since the last flush, whichever comes first.
+    With `fsync` the flush also waits for the data, and the .idx sidecar
+    if the logger keeps one, to reach the disk. That blocks for as long as
+    the disk takes, so fsync loggers belong off the receive path: a
+    LogWriter thread in ground.ground, a worker thread in ground.server.
+    The defaults (flush_rows=1) flush every row, as the loggers always did.
+    """
+    def _init_commit(self, flush_rows: int = 1, flush_ms: float = 0, fsync: bool = False):
+        self.flush_rows = max(1, int(flush_rows))
+        self.flush_ms = float(flush_ms)
+        self.fsync = bool(fsync)
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def _row_staged(self):
+        self._pending += 1
+        if self._pending >= self.flush_rows:
+            self.flush()
+        elif self.flush_ms and (time.monotonic() - self._last_flush) * 1000.0 >= self.flush_ms:
+            self.flush()
+
+    def poll(self):
+        """Flush if rows have been waiting longer than flush_ms (call when idle)."""
+        if self._pending and self.flush_ms and \
+                (time.monotonic() - self._last_flush) * 1000.0 >= self.flush_ms:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._write_pending()
+            if self.fsync:
+                # same order as written: a crash in between can leave an entry
+                # past EOF (query.read_index skips those), never data without one
+                idx = getattr(self, "_idx", None)
+                if idx is not None:
+                    os.fsync(idx.fileno())
+                os.fsync(self._f.fileno())
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def _write_pending(self):
+        self._f.flush()
+
+    def close(self):
+        self.flush()
+        self._f.close()
+
+
+class _CountingWriter:
+    """Passes writes through to `f`, counting bytes (the text logs are ASCII, so chars == bytes)."""
+    def __init__(self, f):
+        self.f = f
+        self.n = 0
+
+    def write(self, s: str):
+        self.n += len(s)
+        return self.f.write(s)
+
+
+class _TextIndex:
+    """
+    Sparse .idx sidecar for the text logs, in the same INDEX_ENTRY format as
+    the binary archive: one entry per flushed batch, pointing at the byte
+    offset of the batch's first row (see ground.query).
+    """
+    def _init_index(self):
+        self.index_path = self.path + ".idx"
+        self._idx = open(self.index_path, "wb", buffering=0)
+        self._idx_entry = None
+
+    def _mark_row(self, row: dict, offset: int):
+        if self._idx_entry is None:
+            self._idx_entry = INDEX_ENTRY.pack(offset, int(row["timestamp"] * 1000),
+                                               row.get("timestamp_ms") or 0, row.get("seq") or 0)
+
+    def _write_pending(self):
+        # index first: a crash then leaves an entry past EOF, never data without one
+        if self._idx_entry is not None:
+            self._idx.write(self._idx_entry)
+            self._idx_entry = None
+        self._f.flush()
+
+    def close(self):
+        super().close()
+        self._idx.close()
+
+
+def _stamp(row: dict) -> dict:
+    # ground timestamp (s, ms resolution) is stamped once per row and shared by every logger
+    if "timestamp" not in row:
+        row["timestamp"] = round(time.time(), 3)
+    return row
+
+
+class CsvLogger(_TextIndex, _GroupCommit):
+    def __init__(self, log_dir: str, flush_rows: int = 1, flush_ms: float = 0, fsync: bool = False,
+                 tag: Optional[str] = None):
         os.makedirs(log_dir, exist_ok=True)
-        ts = int(time.time())
-        self.path = os.path.join(log_dir, f"telemetry_{ts}.csv")  # set path first
+        self.path = _log_path(log_dir, "csv", tag)  # set path first
         self._f = open(self.path, "w", newline="")
-        self._w = csv.DictWriter(self._f, fieldnames=[
+        self._out = _CountingWriter(self._f)
+        self._w = csv.DictWriter(self._out, fieldnames=[
             "timestamp",      # local ground timestamp
             "version",
             "msgtype",
@@ -41,32 +152,200 @@ class CsvLogger:
             "raw_len",
         ])
         self._w.writeheader()
-        _update_symlink(self.path, os.path.join(log_dir, "latest.csv"))
+        self._init_commit(flush_rows, flush_ms, fsync)
+        self._init_index()
+        _update_symlink(self.path, _latest_link(log_dir, "csv", tag))
 
     def write(self, row: dict):
-        row = dict(row)  # shallow copy
-        row["timestamp"] = int(time.time())
+        """Log one decoded row. Adds a ground "timestamp" to `row` if missing."""
+        self._mark_row(_stamp(row), self._out.n)
         self._w.writerow(row)
-        self._f.flush()
-
-    def close(self):
-        self._f.close()
+        self._row_staged()
 
 
-class JsonlLogger:
-    def __init__(self, log_dir: str):
+class JsonlLogger(_TextIndex, _GroupCommit):
+    def __init__(self, log_dir: str, flush_rows: int = 1, flush_ms: float = 0, fsync: bool = False,
+                 tag: Optional[str] = None):
         os.makedirs(log_dir, exist_ok=True)
-        ts = int(time.time())
-        self.path = os.path.join(log_dir, f"telemetry_{ts}.jsonl")  # set path first
+        self.path = _log_path(log_dir, "jsonl", tag)  # set path first
         self._f = open(self.path, "w")
-        _update_symlink(self.path, os.path.join(log_dir, "latest.jsonl"))
+        self._offset = 0
+        self._init_commit(flush_rows, flush_ms, fsync)
+        self._init_index()
+        _update_symlink(self.path, _latest_link(log_dir, "jsonl", tag))
 
     def write(self, row: dict):
-        row = dict(row)  # shallow copy
-        row["timestamp"] = int(time.time())
-        self._f.write(json.dumps(row) + "\n")
-        self._f.flush()
+        """Log one decoded row. Adds a ground "timestamp" to `row` if missing."""
+        line = json.dumps(_stamp(row)) + "\n"
+        self._mark_row(row, self._offset)
+        self._offset += len(line)
+        self._f.write(line)
+        self._row_staged()
+
+
+class SourceRouter:
+    """
+    Hands out one logger per source (spacecraft), built with factory(tag) on
+    the first frame from that source. With per_source=False every source
+    shares a single untagged logger, created up front. Only ask for a
+    source's logger once it has sent a good frame: every get() of a new
+    source opens files that stay open until close().
+    """
+    def __init__(self, factory: Callable[[Optional[str]], _GroupCommit], per_source: bool = True):
+        self.factory = factory
+        self.per_source = per_source
+        self.loggers = {}
+        if not per_source:
+            self.loggers[None] = factory(None)
+
+    def get(self, source):
+        key = source if self.per_source else None
+        log = self.loggers.get(key)
+        if log is None:
+            log = self.loggers[key] = self.factory(source_tag(source))
+        return log
+
+    def poll(self):
+        for log in list(self.loggers.values()):
+            log.poll()
 
     def close(self):
-        self._f.close()
+        for log in list(self.loggers.values()):
+            log.close()
+
+
+class LogWriter:
+    """
+    Feeds SourceRouters from a thread of its own, so flushes and fsyncs
+    never stall the caller (ground.ground's receive loop). write() hands
+    the sample over through a bounded queue; when the queue is full the
+    sample is dropped and counted, like a ground.server sink. While no
+    samples arrive for `idle_s` the routers are polled (flush_ms).
+    close() writes out what is queued, then closes the routers.
+    """
+    def __init__(self, routers: List[Tuple[SourceRouter, bool]], maxsize: int = 4096, idle_s: float = 0.5):
+        self.routers = routers          # (router, raw): raw routers get write_frame(frame)
+        self.idle_s = idle_s
+        self.dropped = 0
+        self.errors = 0
+        self._q = queue.Queue(maxsize)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, source, row: dict, frame: bytes):
+        try:
+            self._q.put_nowait((source, row, frame))
+        except queue.Full:
+            self.dropped += 1
 
+    def _run(self):
+        q = self._q
+        while True:
+            try:
+                batch = [q.get(timeout=self.idle_s)]
+            except queue.Empty:
+                self._each("poll")
+                continue
+            try:
+                while True:
+                    batch.append(q.get_nowait())
+            except queue.Empty:
+                pass
+            stop = batch[-1] is None    # close() queues None last
+            if stop:
+                batch.pop()
+            for router, raw in self.routers:
+                get = router.get
+                try:
+                    if raw:
+                        for source, _row, frame in batch:
+                            get(source).write_frame(frame)
+                    else:
+                        for source, row, _frame in batch:
+                            get(source).write(row)
+                except Exception as e:
+                    self.errors += 1
+                    print("[GROUND] log writer failed:", e)
+            if stop:
+                return
+
+    def _each(self, method: str):
+        for router, _raw in self.routers:
+            try:
+                getattr(router, method)()
+            except Exception as e:
+                self.errors += 1
+                print(f"[GROUND] log writer {method} failed:", e)
+
+    def close(self):
+        self._q.put(None)
+        self._thread.join()
+        self._each("close")
+
+
+# ---------------- binary telemetry archive
+# Segment file (.tlm): SEG_HEADER, then fixed-size records of
+#   GROUND_TS_MS (int64, ms since epoch) + raw validated telemetry frame.
+# Sidecar index (.tlm.idx): one INDEX_ENTRY per flushed batch pointing at the
+# batch's first record, so readers can seek without scanning the segment.
+# The CSV / JSONL logs keep the same kind of sidecar (.csv.idx, .jsonl.idx).
+SEG_MAGIC = b"CSTM"
+SEG_FORMAT_VERSION = 1
+SEG_HEADER = struct.Struct("<4sHHHHd12x")   # magic, fmt ver, header len, record len, frame len, created
+REC_TS = struct.Struct("<q")
+INDEX_ENTRY = struct.Struct("<QqIH2x")      # byte offset, ground ts ms, sat timestamp_ms, seq
+SEG_RECORD_LEN = REC_TS.size + TM_FRAME_LEN
+_FRAME_SEQ_TS = struct.Struct("<4xHI")     # SEQ, TIMESTAMP_MS at fixed frame offsets
+
+class BinaryLogger(_GroupCommit):
+    """
+    Appends raw validated frames to a binary segment. Records are staged in
+    memory and written with a single write() per batch of `flush_rows`
+    (or sooner, once `flush_ms` has elapsed).
+    """
+    def __init__(self, log_dir: str, flush_rows: int = 256, flush_ms: float = 0, fsync: bool = False,
+                 tag: Optional[str] = None):
+        os.makedirs(log_dir, exist_ok=True)
+        self.path = _log_path(log_dir, "tlm", tag)  # set path first
+        self.index_path = self.path + ".idx"
+        # unbuffered: every write() below is exactly one syscall
+        self._f = open(self.path, "wb", buffering=0)
+        self._idx = open(self.index_path, "wb", buffering=0)
+        self._f.write(SEG_HEADER.pack(SEG_MAGIC, SEG_FORMAT_VERSION, SEG_HEADER.size,
+                                      SEG_RECORD_LEN, TM_FRAME_LEN, time.time()))
+        self._offset = SEG_HEADER.size
+        self._buf = bytearray()
+        self._init_commit(flush_rows, flush_ms, fsync)
+        _update_symlink(self.path, _latest_link(log_dir, "tlm", tag))
+
+    def write_frame(self, frame: bytes, ground_ts_ms: Optional[int] = None):
+        """Stage one raw frame (already CRC-checked by the caller)."""
+        if len(frame) != TM_FRAME_LEN:
+            raise ValueError(f"BinaryLogger expects {TM_FRAME_LEN}-byte frames, got {len(frame)}")
+        if ground_ts_ms is None:
+            ground_ts_ms = time.time_ns() // 1_000_000
+        buf = self._buf
+        buf += REC_TS.pack(ground_ts_ms)
+        buf += frame
+        self._row_staged()
+
+    def write_frames(self, frames: Iterable[bytes], ground_ts_ms: Optional[int] = None):
+        """Stage a batch of raw frames sharing one ground timestamp."""
+        if ground_ts_ms is None:
+            ground_ts_ms = time.time_ns() // 1_000_000
+        for frame in frames:
+            self.write_frame(frame, ground_ts_ms)
+
+    def _write_pending(self):
+        buf = self._buf
+        ground_ts_ms = REC_TS.unpack_from(buf, 0)[0]
+        seq, sat_ts_ms = _FRAME_SEQ_TS.unpack_from(buf, REC_TS.size)
+        # index first: a crash then leaves an entry past EOF, never data without one
+        self._idx.write(INDEX_ENTRY.pack(self._offset, ground_ts_ms, sat_ts_ms, seq))
+        self._f.write(buf)
+        self._offset += len(buf)
+        self._buf = bytearray()
+
+    def close(self):
+        super().close()
+        self._idx.close()
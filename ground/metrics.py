@@ -0,0 +1,258 @@
+# ground/metrics.py
+"""
+Opt-in hot-path instrumentation, Prometheus text rendering and an
+on-demand sampling profiler for the ground station.
+
+instrument() swaps timed wrappers in for the hot functions (CRC, frame
+unpacking, datagram decoding, logger writes/flushes) at their module and
+class attributes, and uninstrument() puts the originals back. Nothing is
+wrapped unless it is switched on (ground_metrics), so the disabled cost
+is exactly zero: the receive loop runs the same function objects as
+before.
+
+The sampler walks one thread's stack via sys._current_frames() at a fixed
+rate and counts collapsed stacks ("outer;inner;leaf N" lines), the input
+format of flamegraph.pl, speedscope and inferno.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# (module path, attribute) of every hot function; a class method is "Class.method"
+HOT_PATHS = (
+    ("sat_sim.packet", "crc16_x25"),
+    ("sat_sim.packet", "unpack_telemetry"),
+    ("sat_sim.packet", "unpack_frame"),
+    ("ground.decode", "unpack_telemetry"),      # bound by name at import
+    ("ground.decode", "decode_datagram"),
+    ("ground.decode", "predecode"),
+    ("ground.decode", "StreamDecoder.decode"),
+    ("ground.logger", "CsvLogger.write"),
+    ("ground.logger", "JsonlLogger.write"),
+    ("ground.logger", "BinaryLogger.write_frame"),
+    ("ground.logger", "_GroupCommit.flush"),
+)
+
+
+class FunctionStats:
+    """calls / total ns per instrumented function name."""
+    def __init__(self):
+        self.calls: Dict[str, int] = {}
+        self.ns: Dict[str, int] = {}
+
+    def items(self):
+        return [(name, self.calls[name], self.ns[name]) for name in sorted(self.calls)]
+
+
+_patched: List[Tuple[object, str, object]] = []
+
+
+def _resolve(module: str, attr: str):
+    owner = sys.modules.get(module) or __import__(module, fromlist=["_"])
+    *path, name = attr.split(".")
+    for p in path:
+        owner = getattr(owner, p)
+    return owner, name
+
+
+def _timed(fn, name: str, fstats: FunctionStats):
+    calls, total = fstats.calls, fstats.ns
+    calls.setdefault(name, 0)
+    total.setdefault(name, 0)
+    clock = time.perf_counter_ns
+
+    def wrapper(*args, **kwargs):
+        t0 = clock()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            calls[name] += 1
+            total[name] += clock() - t0
+
+    wrapper.__wrapped__ = fn
+    wrapper.__name__ = getattr(fn, "__name__", name)
+    wrapper.__doc__ = fn.__doc__
+    return wrapper
+
+
+def instrument(fstats: Optional[FunctionStats] = None) -> FunctionStats:
+    """Wrap every HOT_PATHS function (once); returns the stats they feed."""
+    fstats = fstats or FunctionStats()
+    if _patched:
+        return fstats
+    for module, attr in HOT_PATHS:
+        owner, name = _resolve(module, attr)
+        fn = owner.__dict__[name] if isinstance(owner, type) else getattr(owner, name)
+        # the same function reached through two modules is counted once, under its own name
+        label = getattr(fn, "__qualname__", attr)
+        setattr(owner, name, _timed(fn, label, fstats))
+        _patched.append((owner, name, fn))
+    return fstats
+
+
+def uninstrument():
+    while _patched:
+        owner, name, fn = _patched.pop()
+        setattr(owner, name, fn)
+
+
+# ---------------- Prometheus text exposition
+def _esc(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Text:
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def metric(self, name: str, kind: str, help_: str, samples):
+        self.lines.append(f"# HELP {name} {help_}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            if value is None:
+                continue
+            lab = ",".join(f'{k}="{_esc(v)}"' for k, v in labels.items())
+            self.lines.append(f"{name}{{{lab}}} {value}" if lab else f"{name} {value}")
+
+
+def render_prometheus(link: Optional[dict] = None, latency: Optional[dict] = None,
+                      functions: Optional[FunctionStats] = None, counters: Optional[dict] = None,
+                      gauges: Optional[dict] = None) -> str:
+    """
+    Prometheus text format (0.0.4) for a FleetStats snapshot, a StageTimer
+    snapshot, instrumented function totals and extra counters / gauges
+    ({name: (help, value or [(labels, value), ...])}).
+    """
+    t = _Text()
+    if link:
+        t.metric("cubesat_frames_total", "counter", "Frames received, by result.",
+                 [({"result": "good"}, link["total_good"]), ({"result": "bad"}, link["total_bad"])])
+        t.metric("cubesat_seq_lost_total", "counter", "Frames missing from the sequence.", [({}, link["seq_loss"])])
+        t.metric("cubesat_seq_duplicates_total", "counter", "Duplicate frames.", [({}, link["duplicates"])])
+        t.metric("cubesat_seq_reordered_total", "counter", "Late (reordered) frames.", [({}, link["reordered"])])
+        t.metric("cubesat_sources", "gauge", "Spacecraft heard from.", [({}, link.get("sources"))])
+        t.metric("cubesat_rate_pps", "gauge", "Frame rate over a window.",
+                 [({"window": w}, v["rate_pps"]) for w, v in link["windows"].items()])
+    if counters:
+        for name, (help_, value) in sorted(counters.items()):
+            t.metric(name, "counter", help_, value if isinstance(value, list) else [({}, value)])
+    if gauges:
+        for name, (help_, value) in sorted(gauges.items()):
+            t.metric(name, "gauge", help_, value if isinstance(value, list) else [({}, value)])
+    if functions:
+        items = functions.items()
+        t.metric("cubesat_fn_calls_total", "counter", "Calls of instrumented hot-path functions.",
+                 [({"fn": n}, c) for n, c, _ in items])
+        t.metric("cubesat_fn_seconds_total", "counter", "Time spent in instrumented hot-path functions.",
+                 [({"fn": n}, round(ns / 1e9, 9)) for n, _, ns in items])
+    if latency:
+        name = "cubesat_stage_latency_seconds"
+        t.lines.append(f"# HELP {name} Per-stage latency since start (log-linear histogram quantiles).")
+        t.lines.append(f"# TYPE {name} summary")
+        for stage, s in sorted(latency["lifetime"].items()):
+            for q in ("50", "90", "99"):
+                if s[f"p{q}"] is not None:
+                    t.lines.append(f'{name}{{stage="{_esc(stage)}",quantile="0.{q}"}} {s[f"p{q}"] / 1e6}')
+            t.lines.append(f'{name}_sum{{stage="{_esc(stage)}"}} {(s["mean_us"] or 0) * s["count"] / 1e6}')
+            t.lines.append(f'{name}_count{{stage="{_esc(stage)}"}} {s["count"]}')
+    return "\n".join(t.lines) + "\n"
+
+
+# ---------------- sampling profiler
+class Sampler:
+    """
+    Samples one thread's Python stack `hz` times a second on a daemon
+    thread. start()/stop() can be called from anywhere (a signal handler,
+    the HTTP thread); folded() returns the collapsed stacks so far.
+    """
+    def __init__(self, thread_id: Optional[int] = None, hz: float = 200.0):
+        self.thread_id = thread_id or threading.main_thread().ident
+        self.interval = 1.0 / hz
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self._thread:
+            return
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        """Stop sampling and return the folded profile."""
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return self.folded()
+
+    def _run(self):
+        tid = self.thread_id
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(tid)
+            if frame is None:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(parts))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def profile_for(self, seconds: float) -> str:
+        """Blocking: sample for `seconds` and return the folded profile."""
+        self.start()
+        time.sleep(seconds)
+        return self.stop()
+
+
+def toggle_to_file(sampler: Sampler, out_dir: str) -> Optional[str]:
+    """Start the sampler, or stop it and write profile_<ts>.folded; returns the path written."""
+    if not sampler.running:
+        sampler.start()
+        return None
+    folded = sampler.stop()
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"profile_{int(time.time())}.folded")
+    with open(path, "w") as f:
+        f.write(folded)
+    return path
+
+
+def profile_route(sampler: Sampler, max_seconds: float = 60.0):
+    """StatsEndpoint.route handler: GET /profile?seconds=N -> folded stacks."""
+    def handler(params: dict):
+        seconds = float(params.get("seconds", 10))
+        if not 0 < seconds <= max_seconds:
+            raise ValueError(f"seconds must be in (0, {max_seconds}]")
+        if sampler.running:
+            raise ValueError("profiler already running")
+        return sampler.profile_for(seconds).encode(), "text/plain; charset=utf-8"
+    return handler
+
+
+def install_toggle(sampler: Sampler, out_dir: str, signum=None):
+    """`kill -USR1 <pid>` starts the sampler, the next one writes the profile."""
+    import signal
+    signum = signum or signal.SIGUSR1
+
+    def on_signal(_signum, _frame):
+        path = toggle_to_file(sampler, out_dir)
+        print(f"[profile] wrote {path}" if path else f"[profile] sampling at {1 / sampler.interval:.0f} Hz")
+
+    signal.signal(signum, on_signal)
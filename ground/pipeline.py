@@ -0,0 +1,205 @@
+# ground/pipeline.py
+"""
+Multi-core decode pipeline for ground ingest.
+
+A receiver thread reads datagrams straight into slots of one shared-memory
+block (recvmsg_into, no per-datagram bytes objects) and hands each filled
+slot to a ProcessPoolExecutor worker by index. Workers attach to the same
+block, CRC-check and decode in place, and only the decoded rows travel back.
+Batches are handed out and collected in submission order, so the caller
+sees frames in exactly the order they were received even though batches
+decode in parallel. That order is also what lets delta frames, which are
+only validated in the workers, be applied to their stream afterwards.
+
+Frames are deliberately not re-sorted by SEQ: a late frame stays late, so
+the link statistics can count it as reordered, and deltas must be applied
+in the order they arrived anyway.
+
+A batch whose worker raised or died comes back with every frame marked
+bad; a pool broken by a dead worker is replaced, so decoding carries on.
+"""
+import queue
+import socket
+import struct
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+from .decode import StreamDecoder, predecode
+from .udp_rx import ANC_BUFSIZE, MAX_DATAGRAM, rxq_ovfl
+
+_LEN = struct.Struct("<H")
+
+# worker-process state (set by _attach)
+_shm = None
+_slot_size = 0
+_max_batch = 0
+
+
+def _attach(name: str, slot_size: int, max_batch: int):
+    global _shm, _slot_size, _max_batch
+    _shm = shared_memory.SharedMemory(name=name)
+    _slot_size = slot_size
+    _max_batch = max_batch
+
+
+def _decode_slot(slot: int, count: int) -> list:
+    """predecode() `count` datagrams from `slot`; None marks a bad frame."""
+    buf = _shm.buf
+    base = slot * _slot_size
+    off = base + _LEN.size * _max_batch
+    rows = []
+    for i in range(count):
+        n = _LEN.unpack_from(buf, base + _LEN.size * i)[0]
+        try:
+            rows.append(predecode(bytes(buf[off:off + n])))
+        except ValueError:
+            rows.append(None)
+        off += n
+    return rows
+
+
+class DecodePipeline:
+    """
+    Slot layout: `max_batch` u16 datagram lengths, then the datagrams back
+    to back. A slot is submitted when it holds `max_batch` datagrams, when
+    it cannot fit another MAX_DATAGRAM, or after `flush_ms` of quiet.
+    When every slot is in flight the receiver waits for one to come back,
+    pushing backpressure into the socket buffer.
+    """
+    def __init__(self, sock: socket.socket, workers: int, max_batch: int = 256,
+                 flush_ms: float = 20.0, slots: Optional[int] = None,
+                 decoder: Optional[StreamDecoder] = None):
+        self.sock = sock
+        self.decoder = decoder or StreamDecoder()
+        self.max_batch = max_batch
+        self.flush_s = flush_ms / 1000.0
+        n_slots = slots or workers * 4
+        self.slot_size = _LEN.size * max_batch + max_batch * 64 + MAX_DATAGRAM
+        self.shm = shared_memory.SharedMemory(create=True, size=n_slots * self.slot_size)
+        self.workers = workers
+        self.pool = self._new_pool()
+        self._free: "queue.Queue[int]" = queue.Queue()
+        for i in range(n_slots):
+            self._free.put(i)
+        # (future, slot, [(addr, offset, length), ...]) in submission order
+        self._inflight: "queue.Queue[tuple]" = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._receive, daemon=True)
+        self.batches = 0
+        self.kernel_drops = 0
+        self.timeouts = 0      # socket.timeout in the receiver thread
+        self.failed_batches = 0    # worker raised or died: frames reported bad
+        self.respawns = 0
+        self._thread.start()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(self.workers, initializer=_attach,
+                                   initargs=(self.shm.name, self.slot_size, self.max_batch))
+
+    def _respawn(self, broken: ProcessPoolExecutor):  # receiver thread only
+        """Replace a pool a dead worker broke."""
+        self.pool = self._new_pool()
+        self.respawns += 1
+        broken.shutdown(wait=False)
+
+    def _submit(self, slot: int, count: int):
+        pool = self.pool
+        try:
+            return pool.submit(_decode_slot, slot, count)
+        except BrokenProcessPool:
+            self._respawn(pool)
+            return self.pool.submit(_decode_slot, slot, count)
+
+    def _receive(self):
+        buf = self.shm.buf
+        sock = self.sock
+        while not self._stop.is_set():
+            try:
+                slot = self._free.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            base = slot * self.slot_size
+            off = base + _LEN.size * self.max_batch
+            end = base + self.slot_size
+            meta = []
+            sock.settimeout(0.5)
+            while len(meta) < self.max_batch and end - off >= MAX_DATAGRAM and not self._stop.is_set():
+                try:
+                    n, anc, _flags, addr = sock.recvmsg_into([buf[off:off + MAX_DATAGRAM]], ANC_BUFSIZE)
+                except socket.timeout:
+                    self.timeouts += 1
+                    if meta:
+                        break  # quiet link: ship what we have
+                    continue
+                except OSError:
+                    break  # socket closed under us
+                if anc:
+                    drops = rxq_ovfl(anc)
+                    if drops is not None and drops > self.kernel_drops:
+                        self.kernel_drops = drops
+                _LEN.pack_into(buf, base + _LEN.size * len(meta), n)
+                meta.append((addr, off, n))
+                off += n
+                if len(meta) == 1:
+                    sock.settimeout(self.flush_s)
+            if not meta:
+                self._free.put(slot)
+                continue
+            fut = self._submit(slot, len(meta))
+            self._inflight.put((fut, slot, meta))
+            self.batches += 1
+
+    def poll(self, timeout: float) -> List[Tuple[bytes, tuple, Optional[dict]]]:
+        """
+        Next decoded batch in receive order as (frame, addr, row) tuples
+        (row is None for a bad frame), or [] if nothing arrived in `timeout`.
+        Batch frames are unrolled into one tuple per sample; deltas that
+        arrive without their predecessor are left out.
+        """
+        try:
+            fut, slot, meta = self._inflight.get(timeout=timeout)
+        except queue.Empty:
+            return []
+        try:
+            pres = fut.result()
+        except Exception as e:
+            # worker raised, or died and broke the pool (the next submit
+            # replaces it): the batch counts as bad frames
+            self.failed_batches += 1
+            print(f"[GROUND] decode worker failed, {len(meta)} frames marked bad: {e!r}")
+            pres = [None] * len(meta)
+        buf = self.shm.buf
+        resolve = self.decoder.resolve
+        out = []
+        try:
+            for (addr, off, n), pre in zip(meta, pres):
+                data = bytes(buf[off:off + n])
+                if pre is None:
+                    out.append((data, addr, None))
+                    continue
+                for row, frame in resolve(pre, data, addr):
+                    out.append((frame, addr, row))
+        finally:
+            self._free.put(slot)
+        return out
+
+    def stop(self):
+        """Stop receiving; batches already in flight can still be polled."""
+        self._stop.set()
+        self._thread.join(timeout=2.0)
+
+    def drain(self):
+        while True:
+            items = self.poll(0)
+            if not items:
+                return
+            yield from items
+
+    def close(self):
+        self.stop()
+        self.pool.shutdown()
+        self.shm.close()
+        self.shm.unlink()
@@ -0,0 +1,143 @@
+# ground/pubsub.py
+"""
+Live telemetry fan-out over a local Unix datagram socket.
+
+The ground station owns a LivePublisher bound at a well-known path.
+Viewers (LiveSubscriber) bind their own socket and register by sending SUB
+to the publisher; every published batch is then sent straight to each
+registered viewer as binary records (int64 ground ms + raw 40-byte frame,
+the same record the binary archive uses). Nothing touches the filesystem
+besides the socket inodes, and sends never block: a viewer whose receive
+buffer is full just misses that batch (counted in `dropped`).
+"""
+import os
+import socket
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+from sat_sim.packet import TelemetryRecord, TM_FIELDS
+from .logger import REC_TS, SEG_RECORD_LEN
+
+SUB = b"SUB"
+UNSUB = b"UNSUB"
+MAX_BATCH_RECORDS = 64           # records per datagram (keeps datagrams ~3 KiB)
+RESUBSCRIBE_S = 2.0              # viewers re-register so a restarted publisher finds them
+
+
+class LivePublisher:
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(path)
+        self.sock.setblocking(False)
+        self.subscribers = set()
+        self.sent = 0
+        self.dropped = 0
+        self._buf = bytearray()
+        self._count = 0
+
+    def _accept(self):
+        while True:
+            try:
+                msg, addr = self.sock.recvfrom(64)
+            except (BlockingIOError, InterruptedError):
+                return
+            if not addr:
+                continue  # unbound sender; nowhere to publish to
+            if msg == SUB:
+                self.subscribers.add(addr)
+            elif msg == UNSUB:
+                self.subscribers.discard(addr)
+
+    def publish(self, frame: bytes, ground_ts_ms: Optional[int] = None):
+        """Stage one frame; sent on flush() or once MAX_BATCH_RECORDS are staged."""
+        if ground_ts_ms is None:
+            ground_ts_ms = time.time_ns() // 1_000_000
+        self._buf += REC_TS.pack(ground_ts_ms)
+        self._buf += frame
+        self._count += 1
+        if self._count >= MAX_BATCH_RECORDS:
+            self.flush()
+
+    def flush(self):
+        """Pick up new/removed viewers and send staged records to every viewer."""
+        self._accept()
+        if not self._count:
+            return
+        data = bytes(self._buf)
+        self._buf = bytearray()
+        self._count = 0
+        for addr in list(self.subscribers):
+            try:
+                self.sock.sendto(data, addr)
+                self.sent += 1
+            except (BlockingIOError, InterruptedError):
+                self.dropped += 1
+            except OSError:
+                # viewer went away (ECONNREFUSED / ENOENT)
+                self.subscribers.discard(addr)
+
+    def close(self):
+        try:
+            self.sock.close()
+        finally:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+def parse_records(data: bytes) -> List[Tuple[int, TelemetryRecord]]:
+    """(ground_ts_ms, TelemetryRecord) for every record in a published batch."""
+    out = []
+    for off in range(0, len(data) - SEG_RECORD_LEN + 1, SEG_RECORD_LEN):
+        ts = REC_TS.unpack_from(data, off)[0]
+        # frames were CRC-checked by the ground station before publishing
+        rec = TelemetryRecord._make(TM_FIELDS.unpack_from(data, off + REC_TS.size + 2))
+        out.append((ts, rec))
+    return out
+
+
+class LiveSubscriber:
+    def __init__(self, publisher_path: str):
+        self.publisher_path = publisher_path
+        self.path = os.path.join(tempfile.gettempdir(), f"cubesat_live_{os.getpid()}_{id(self):x}.sock")
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self._last_sub = 0.0
+        self._subscribe()
+
+    def _subscribe(self):
+        self._last_sub = time.monotonic()
+        try:
+            self.sock.sendto(SUB, self.publisher_path)
+        except OSError:
+            pass  # publisher not up yet; retried every RESUBSCRIBE_S
+
+    def recv(self, timeout: float) -> List[Tuple[int, TelemetryRecord]]:
+        """Records from the next batch, or [] if none arrived within `timeout`."""
+        if time.monotonic() - self._last_sub >= RESUBSCRIBE_S:
+            self._subscribe()
+        self.sock.settimeout(timeout)
+        try:
+            data = self.sock.recv(65536)
+        except socket.timeout:
+            return []
+        return parse_records(data)
+
+    def close(self):
+        try:
+            self.sock.sendto(UNSUB, self.publisher_path)
+        except OSError:
+            pass
+        self.sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
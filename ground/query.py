@@ -0,0 +1,272 @@
+# ground/query.py
+"""
+Time-range queries over ground logs through their sparse .idx sidecars.
+
+Every log the ground writes (.tlm, .jsonl, .csv) has an index of
+INDEX_ENTRY(byte offset, ground ts ms, sat timestamp_ms, seq), one per
+flushed batch. query() bisects the index, seeks straight to the batch that
+can hold `start`, and streams rows until the key passes `end`, keeping only
+the requested fields. Keys are taken to be non-decreasing within a log
+(ground time is the wall clock; satellite time is per-spacecraft, so use
+per-source logs for it). Logs written before indexes existed can be
+indexed after the fact with build_index() or:
+
+    python -m ground.query --reindex ground/logs/telemetry_*.jsonl
+    python -m ground.query ground/logs/latest.tlm --start MS --end MS --fields seq,batt_mv
+"""
+import argparse
+import bisect
+import csv
+import glob
+import json
+import os
+import sys
+from typing import Iterator, List, Optional, Sequence
+
+from sat_sim.packet import TM_FIELDS, TelemetryRecord
+from .logger import INDEX_ENTRY, REC_TS, SEG_HEADER, SEG_RECORD_LEN
+
+KEYS = ("ground_ts_ms", "timestamp_ms")
+_KEY_COL = {"ground_ts_ms": 1, "timestamp_ms": 2}    # column in an INDEX_ENTRY tuple
+_TLM_FIELDS = ("ground_ts_ms",) + TelemetryRecord._fields
+_CHUNK_RECORDS = 4096
+
+
+def read_index(path: str) -> List[tuple]:
+    """Index entries of the log at `path`, dropping any that point past EOF."""
+    try:
+        with open(path + ".idx", "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    size = os.path.getsize(path)
+    usable = len(data) - len(data) % INDEX_ENTRY.size
+    return [e for e in INDEX_ENTRY.iter_unpack(data[:usable]) if e[0] < size]
+
+
+def _csv_value(s: str):
+    """CSV cell -> int, float or str (empty: None), so CSV rows match the JSONL ones."""
+    if s == "":
+        return None
+    try:
+        return int(s)
+    except ValueError:
+        pass
+    try:
+        return float(s)
+    except ValueError:
+        return s     # e.g. mode names
+
+
+def _kind(path: str) -> str:
+    for ext in ("tlm", "jsonl", "csv"):
+        if path.endswith("." + ext):
+            return ext
+    raise ValueError(f"Not a ground log: {path}")
+
+
+def _seek_offset(path: str, start: Optional[int], by: str) -> Optional[int]:
+    """Byte offset of the batch that may hold the first row >= start (None: scan from the top)."""
+    entries = read_index(path)
+    if not entries:
+        return None
+    if start is None:
+        return entries[0][0]
+    keys = [e[_KEY_COL[by]] for e in entries]
+    # the batch before the first one keyed >= start can still end with matching rows
+    i = max(0, bisect.bisect_left(keys, start) - 1)
+    return entries[i][0]
+
+
+def _tlm_rows(path, offset, start, end, by, fields):
+    with open(path, "rb") as f:
+        header_len = SEG_HEADER.unpack(f.read(SEG_HEADER.size))[2]
+        f.seek(header_len if offset is None else offset)
+        cols = [_TLM_FIELDS.index(k) for k in fields]
+        key = _TLM_FIELDS.index(by)
+        unpack_ts, unpack_tm, skip = REC_TS.unpack_from, TM_FIELDS.unpack_from, REC_TS.size + 2
+        while True:
+            chunk = f.read(_CHUNK_RECORDS * SEG_RECORD_LEN)
+            for off in range(0, len(chunk) - SEG_RECORD_LEN + 1, SEG_RECORD_LEN):
+                rec = unpack_ts(chunk, off) + unpack_tm(chunk, off + skip)
+                k = rec[key]
+                if start is not None and k < start:
+                    continue
+                if end is not None and k > end:
+                    return
+                yield {name: rec[c] for name, c in zip(fields, cols)}
+            if len(chunk) < _CHUNK_RECORDS * SEG_RECORD_LEN:
+                return
+
+
+def _row_key(row: dict, by: str):
+    return int(row["timestamp"] * 1000) if by == "ground_ts_ms" else row[by]
+
+
+def _jsonl_rows(path, offset, start, end, by, fields):
+    with open(path, "rb") as f:
+        if offset:
+            f.seek(offset)
+        for line in f:
+            try:
+                row = json.loads(line.decode())
+            except ValueError:
+                continue   # torn last line of a live log
+            k = _row_key(row, by)
+            if start is not None and k < start:
+                continue
+            if end is not None and k > end:
+                return
+            yield {name: row.get(name) for name in fields} if fields else row
+
+
+def _csv_rows(path, offset, start, end, by, fields):
+    with open(path, "r", newline="") as f:
+        header = next(csv.reader([f.readline()]))
+        if offset:
+            f.seek(offset)
+        names = fields or header
+        cols = [header.index(n) for n in names]
+        kcol = header.index("timestamp" if by == "ground_ts_ms" else by)
+        scale = 1000 if by == "ground_ts_ms" else 1
+        for rec in csv.reader(f):
+            if len(rec) != len(header):
+                continue
+            k = int(float(rec[kcol]) * scale)
+            if start is not None and k < start:
+                continue
+            if end is not None and k > end:
+                return
+            yield {n: _csv_value(rec[c]) for n, c in zip(names, cols)}
+
+
+_READERS = {"tlm": _tlm_rows, "jsonl": _jsonl_rows, "csv": _csv_rows}
+
+
+def log_files(log_dir: str, ext: str = "tlm", tag: Optional[str] = None) -> List[str]:
+    """Logs of one kind in `log_dir`, oldest first (names carry the creation time)."""
+    pattern = f"telemetry_{tag}_*.{ext}" if tag else f"telemetry_*.{ext}"
+    paths = glob.glob(os.path.join(log_dir, pattern))
+    return sorted(paths, key=lambda p: int(os.path.splitext(p)[0].rsplit("_", 1)[1]))
+
+
+def query(path: str, start: Optional[int] = None, end: Optional[int] = None,
+          fields: Optional[Sequence[str]] = None, by: str = "ground_ts_ms") -> Iterator[dict]:
+    """
+    Rows of the log at `path` with start <= key <= end (ms, inclusive; None
+    leaves that side open), as dicts holding only `fields` (all columns of
+    that log format if None). `by` picks the key: "ground_ts_ms" (ground
+    receive time) or "timestamp_ms" (satellite time). A directory is
+    queried log by log, in creation order, over its .tlm segments.
+    """
+    if by not in KEYS:
+        raise ValueError(f"by must be one of {KEYS}")
+    if os.path.isdir(path):
+        for p in log_files(path):
+            yield from query(p, start, end, fields, by)
+        return
+    kind = _kind(path)
+    if kind == "tlm" and not fields:
+        fields = _TLM_FIELDS
+    yield from _READERS[kind](path, _seek_offset(path, start, by), start, end, by, list(fields or ()))
+
+
+def query_columns(path: str, start: Optional[int] = None, end: Optional[int] = None,
+                  fields: Optional[Sequence[str]] = None, by: str = "ground_ts_ms") -> dict:
+    """
+    Columnar variant for one .tlm segment (requires NumPy): zero-copy
+    memory-mapped arrays of `fields` for the rows in [start, end].
+    """
+    import numpy as np
+    from .bulk import open_segment
+    if by not in KEYS:
+        raise ValueError(f"by must be one of {KEYS}")
+    columns = open_segment(path)
+    keys = columns[by]
+    entries = read_index(path)
+    lo, hi = 0, len(keys)
+    if entries:
+        with open(path, "rb") as f:
+            header_len = SEG_HEADER.unpack(f.read(SEG_HEADER.size))[2]
+        ikeys = [e[_KEY_COL[by]] for e in entries]
+        rows = [(e[0] - header_len) // SEG_RECORD_LEN for e in entries]
+        # narrow to the batches that can hold the range, then bisect inside them
+        if start is not None:
+            lo = rows[max(0, bisect.bisect_left(ikeys, start) - 1)]
+        if end is not None:
+            i = bisect.bisect_right(ikeys, end)
+            hi = rows[i] if i < len(rows) else hi
+    if start is not None:
+        lo += int(np.searchsorted(keys[lo:hi], start, side="left"))
+    if end is not None:
+        hi = lo + int(np.searchsorted(keys[lo:hi], end, side="right"))
+    return {name: columns[name][lo:hi] for name in (fields or columns)}
+
+
+def build_index(path: str, every: int = 256) -> int:
+    """
+    (Re)write the .idx sidecar of an existing log with one entry every
+    `every` rows. Returns the number of entries written.
+    """
+    kind = _kind(path)
+    entries = []
+    if kind == "tlm":
+        for n, row in enumerate(_tlm_rows(path, None, None, None, "ground_ts_ms", list(_TLM_FIELDS))):
+            if n % every == 0:
+                entries.append((SEG_HEADER.size + n * SEG_RECORD_LEN,
+                                row["ground_ts_ms"], row["timestamp_ms"], row["seq"]))
+    else:
+        with open(path, "rb") as f:
+            offset = 0
+            n = 0
+            header = None
+            if kind == "csv":
+                line = f.readline()
+                header = next(csv.reader([line.decode()]))
+                offset = len(line)
+            for line in f:
+                if n % every == 0:
+                    if header:
+                        row = dict(zip(header, next(csv.reader([line.decode()]))))
+                        row = {k: _csv_value(row[k]) for k in ("timestamp", "timestamp_ms", "seq")}
+                    else:
+                        try:
+                            row = json.loads(line)
+                        except ValueError:
+                            break
+                    entries.append((offset, int(row["timestamp"] * 1000),
+                                    int(row["timestamp_ms"]), int(row["seq"])))
+                offset += len(line)
+                n += 1
+    with open(path + ".idx", "wb") as f:
+        for e in entries:
+            f.write(INDEX_ENTRY.pack(*e))
+    return len(entries)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Query or index ground logs")
+    ap.add_argument("paths", nargs="+", help="log files (or a log directory for .tlm)")
+    ap.add_argument("--start", type=int, default=None, help="ms, inclusive")
+    ap.add_argument("--end", type=int, default=None, help="ms, inclusive")
+    ap.add_argument("--by", choices=KEYS, default="ground_ts_ms")
+    ap.add_argument("--fields", default=None, help="comma separated; default all")
+    ap.add_argument("--reindex", action="store_true", help="rebuild the .idx sidecars and exit")
+    ap.add_argument("--every", type=int, default=256, help="rows per index entry with --reindex")
+    args = ap.parse_args(argv)
+
+    if args.reindex:
+        for p in args.paths:
+            print(f"{p}: {build_index(p, args.every)} index entries")
+        return
+    fields = args.fields.split(",") if args.fields else None
+    out = None
+    for p in args.paths:
+        for row in query(p, args.start, args.end, fields, args.by):
+            if out is None:
+                out = csv.DictWriter(sys.stdout, fieldnames=list(row))
+                out.writeheader()
+            out.writerow(row)
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,23 @@
 # ground/receiver.py (diagnostic)
-import socket
 import csv
 import time
-from sat_sim.packet import unpack_frame
+from typing import Optional
+from ground.decode import StreamDecoder
+from ground.ground import load_config
+from ground.udp_rx import BatchReceiver, open_socket
 
-HOST = '127.0.0.1'
-PORT = 5005
 LOG_FILE = "telemetry_log.csv"
 
-def run():
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind((HOST, PORT))
-    print(f"[GROUND] Listening on {HOST}:{PORT}")
+def run(cfg: Optional[dict] = None):
+    """Listen on config.json's udp_host/udp_port with its ground_rcvbuf_bytes, like ground.ground."""
+    cfg = cfg if cfg is not None else load_config()
+    host = cfg.get("udp_host", "127.0.0.1")
+    port = int(cfg.get("udp_port", 5005))
+    sock = open_socket(host, port, cfg.get("ground_rcvbuf_bytes"))
+    rx = BatchReceiver(sock)
+    decoder = StreamDecoder()   # keyframes, delta and batch frames, as ground.ground decodes them
+    reported_drops = 0
+    print(f"[GROUND] Listening on {host}:{port}")
 
     # open CSV file for logging
     with open(LOG_FILE, "w", newline="") as f:
@@ -19,41 +25,46 @@ def run():
         writer.writerow(["timestamp", "seq", "mode", "batt_mv", "temp_c", "press_pa", "alt_m", "light"])
 
         while True:
-            data, addr = sock.recvfrom(4096)
-            try:
-                info = unpack_frame(data)
-
-                # convert units
-                temp_c = info['temp_centideg'] / 100.0
-                alt_m = info['alt_cm'] / 100.0
-
-                # print a nicely formatted line
-                print(f"RX seq={info['seq']:5d}  mode={info['mode']:2d}  "
-                      f"batt={info['batt_mv']:4d} mV  temp={temp_c:6.2f} °C  "
-                      f"alt={alt_m:7.2f} m  light={info['light']:4d}")
-
-                # log to CSV
-                writer.writerow([
-                    int(time.time()), info['seq'], info['mode'],
-                    info['batt_mv'], temp_c, info['press_pa'],
-                    alt_m, info['light']
-                ])
-                f.flush()  # ensure data is saved
-
-            except Exception as e:
-                # DIAGNOSTIC: print debug info about the raw datagram
-                print("[GROUND] Bad frame:", e)
-                print("[GROUND] datagram len:", len(data))
-                # print at most first 200 chars of hex so it's readable
-                hexdump = data.hex()
-                print("[GROUND] datagram hex (start..):", hexdump[:200])
-                # optional: write the first few bad frames to files for deeper analysis
-                ts = int(time.time())
+            if not rx.recv_batch(1.0):
+                continue
+            if rx.kernel_drops != reported_drops:
+                print(f"[GROUND] kernel dropped {rx.kernel_drops - reported_drops} datagrams "
+                      f"(total {rx.kernel_drops})")
+                reported_drops = rx.kernel_drops
+            for data, addr in rx.frames():
                 try:
-                    with open(f"ground/badframe_{ts}.bin", "wb") as bf:
-                        bf.write(data)
-                except Exception:
-                    pass
+                    # a delta frame waiting for its keyframe yields no rows
+                    for info, _frame in decoder.decode(bytes(data), addr):
+                        temp_c = info['temp_c']
+                        alt_m = info['alt_cm'] / 100.0
+
+                        # print a nicely formatted line
+                        print(f"RX seq={info['seq']:5d}  mode={info['mode']:>4}  "
+                              f"batt={info['batt_mv']:4d} mV  temp={temp_c:6.2f} °C  "
+                              f"alt={alt_m:7.2f} m  light={info['light']:4d}")
+
+                        # log to CSV
+                        writer.writerow([
+                            int(time.time()), info['seq'], info['mode'],
+                            info['batt_mv'], temp_c, info['press_pa'],
+                            alt_m, info['light']
+                        ])
+                    f.flush()  # ensure data is saved
+
+                except Exception as e:
+                    # DIAGNOSTIC: print debug info about the raw datagram
+                    print("[GROUND] Bad frame:", e)
+                    print("[GROUND] datagram len:", len(data))
+                    # print at most first 200 chars of hex so it's readable
+                    hexdump = data.hex()
+                    print("[GROUND] datagram hex (start..):", hexdump[:200])
+                    # optional: write the first few bad frames to files for deeper analysis
+                    ts = int(time.time())
+                    try:
+                        with open(f"ground/badframe_{ts}.bin", "wb") as bf:
+                            bf.write(bytes(data))
+                    except Exception:
+                        pass
 
 if __name__ == '__main__':
     run()
@@ -0,0 +1,279 @@
+# ground/rollup.py
+"""
+Pre-aggregated telemetry rollups at 1 s / 1 min / 1 h.
+
+Rows only ever touch the 1 s accumulator (min/max/sum/last per field);
+when a second closes its bucket is appended to disk and merged into the
+open minute, a closed minute into the open hour. Each resolution is one
+file of fixed-size records sorted by bucket start, so a query bisects the
+file and reads just the buckets in range: a week of hourly means is 168
+records no matter how many frames were received.
+
+File (rollup_[{tag}_]{resolution}.rlp): ROLLUP_HEADER, then ROLLUP_RECORD per
+bucket: start ms (int64), count (u32), then min/max/mean/last (float32)
+for every ROLLUP_FIELDS entry. A bucket start can repeat after a restart;
+query() merges such buckets.
+
+    python -m ground.rollup ground/rollups --field batt_mv --last 604800 --step 60
+"""
+import argparse
+import bisect
+import os
+import struct
+import time
+from typing import Dict, List, Optional, Sequence
+
+from .stats import source_tag
+
+ROLLUP_FIELDS = (
+    "batt_mv", "temp_c", "press_pa", "alt_cm",
+    "gyro_x", "gyro_y", "gyro_z", "acc_x", "acc_y", "acc_z", "light",
+)
+RESOLUTIONS_MS = (1_000, 60_000, 3_600_000)
+ROLLUP_MAGIC = b"CSRU"
+ROLLUP_FORMAT_VERSION = 1
+ROLLUP_HEADER = struct.Struct("<4sHHId16x")   # magic, fmt ver, n fields, resolution ms, created
+ROLLUP_RECORD = struct.Struct("<qI4x" + "ffff" * len(ROLLUP_FIELDS))
+_STATS = ("min", "max", "mean", "last")
+
+
+class _Bucket:
+    """Running aggregate of one bucket: parallel per-field lists."""
+    __slots__ = ("start", "count", "mins", "maxs", "sums", "lasts")
+
+    def __init__(self, start: int):
+        n = len(ROLLUP_FIELDS)
+        self.start = start
+        self.count = 0
+        self.mins = [float("inf")] * n
+        self.maxs = [float("-inf")] * n
+        self.sums = [0.0] * n
+        self.lasts = [0.0] * n
+
+    def add(self, values: Sequence[float]):
+        mins, maxs, sums = self.mins, self.maxs, self.sums
+        for i, v in enumerate(values):
+            if v < mins[i]: mins[i] = v
+            if v > maxs[i]: maxs[i] = v
+            sums[i] += v
+        self.lasts = values
+        self.count += 1
+
+    def merge(self, other: "_Bucket"):
+        for i in range(len(ROLLUP_FIELDS)):
+            if other.mins[i] < self.mins[i]: self.mins[i] = other.mins[i]
+            if other.maxs[i] > self.maxs[i]: self.maxs[i] = other.maxs[i]
+            self.sums[i] += other.sums[i]
+        self.lasts = other.lasts
+        self.count += other.count
+
+    def pack(self) -> bytes:
+        vals = []
+        c = self.count
+        for i in range(len(ROLLUP_FIELDS)):
+            vals += (self.mins[i], self.maxs[i], self.sums[i] / c, self.lasts[i])
+        return ROLLUP_RECORD.pack(self.start, c, *vals)
+
+    @classmethod
+    def unpack(cls, data, offset: int = 0) -> "_Bucket":
+        start, count, *vals = ROLLUP_RECORD.unpack_from(data, offset)
+        b = cls(start)
+        b.count = count
+        b.mins = list(vals[0::4])
+        b.maxs = list(vals[1::4])
+        b.sums = [m * count for m in vals[2::4]]
+        b.lasts = list(vals[3::4])
+        return b
+
+    def as_dict(self, fields: Sequence[str]) -> dict:
+        out = {"start_ms": self.start, "count": self.count}
+        for name in fields:
+            i = ROLLUP_FIELDS.index(name)
+            out[name] = {"min": self.mins[i], "max": self.maxs[i],
+                         "mean": self.sums[i] / self.count, "last": self.lasts[i]}
+        return out
+
+
+def _path(rollup_dir: str, resolution_ms: int, tag: Optional[str]) -> str:
+    name = f"rollup_{tag}_{resolution_ms}.rlp" if tag else f"rollup_{resolution_ms}.rlp"
+    return os.path.join(rollup_dir, name)
+
+
+class Rollup:
+    """Rollups of one stream (a spacecraft, or all of them) at every resolution."""
+    def __init__(self, rollup_dir: str, tag: Optional[str] = None):
+        os.makedirs(rollup_dir, exist_ok=True)
+        self._files = []
+        for res in RESOLUTIONS_MS:
+            path = _path(rollup_dir, res, tag)
+            # unbuffered: one write() per closed bucket
+            f = open(path, "ab", buffering=0)
+            if f.tell() == 0:
+                f.write(ROLLUP_HEADER.pack(ROLLUP_MAGIC, ROLLUP_FORMAT_VERSION,
+                                           len(ROLLUP_FIELDS), res, time.time()))
+            self._files.append(f)
+        self._open: List[Optional[_Bucket]] = [None] * len(RESOLUTIONS_MS)
+
+    def add(self, row: dict, now_ms: Optional[int] = None):
+        if now_ms is None:
+            now_ms = time.time_ns() // 1_000_000
+        b = self._open[0]
+        if b is None or now_ms - b.start >= RESOLUTIONS_MS[0]:
+            self.poll(now_ms)
+            b = self._open[0] = _Bucket(now_ms - now_ms % RESOLUTIONS_MS[0])
+        b.add([row[k] for k in ROLLUP_FIELDS])
+
+    def poll(self, now_ms: Optional[int] = None):
+        """Close every open bucket whose interval has passed (call when idle too)."""
+        if now_ms is None:
+            now_ms = time.time_ns() // 1_000_000
+        for level, res in enumerate(RESOLUTIONS_MS):
+            b = self._open[level]
+            if b is not None and now_ms - b.start >= res:
+                self._close(level)
+
+    def _close(self, level: int):
+        b = self._open[level]
+        self._open[level] = None
+        self._files[level].write(b.pack())
+        if level + 1 < len(RESOLUTIONS_MS):
+            res = RESOLUTIONS_MS[level + 1]
+            up = self._open[level + 1]
+            if up is not None and b.start - up.start >= res:
+                self._close(level + 1)
+                up = None
+            if up is None:
+                up = self._open[level + 1] = _Bucket(b.start - b.start % res)
+            up.merge(b)
+
+    def close(self):
+        """Write out the partial buckets too; a restart in the same interval merges on read."""
+        for level in range(len(RESOLUTIONS_MS)):
+            if self._open[level] is not None:
+                self._close(level)
+        for f in self._files:
+            f.close()
+
+
+class RollupRouter:
+    """One Rollup per source (spacecraft), like logger.SourceRouter."""
+    def __init__(self, rollup_dir: str, per_source: bool = True):
+        self.rollup_dir = rollup_dir
+        self.per_source = per_source
+        self.rollups: Dict[object, Rollup] = {}
+        if not per_source:
+            self.rollups[None] = Rollup(rollup_dir)
+
+    def get(self, source) -> Rollup:
+        key = source if self.per_source else None
+        r = self.rollups.get(key)
+        if r is None:
+            r = self.rollups[key] = Rollup(self.rollup_dir, source_tag(source))
+        return r
+
+    def poll(self):
+        now_ms = time.time_ns() // 1_000_000
+        for r in list(self.rollups.values()):
+            r.poll(now_ms)
+
+    def close(self):
+        for r in list(self.rollups.values()):
+            r.close()
+
+
+def pick_resolution(step_ms: int) -> int:
+    """Coarsest stored resolution that divides `step_ms` (1 s if none does)."""
+    for res in reversed(RESOLUTIONS_MS):
+        if res <= step_ms and step_ms % res == 0:
+            return res
+    return RESOLUTIONS_MS[0]
+
+
+def _read_range(path: str, start_ms: int, end_ms: int) -> List[_Bucket]:
+    rec = ROLLUP_RECORD.size
+    with open(path, "rb") as f:
+        head = f.read(ROLLUP_HEADER.size)
+        magic, version, n_fields, _res, _created = ROLLUP_HEADER.unpack(head)
+        if magic != ROLLUP_MAGIC or version != ROLLUP_FORMAT_VERSION or n_fields != len(ROLLUP_FIELDS):
+            raise ValueError(f"Unsupported rollup file: {path}")
+        n = (os.path.getsize(path) - ROLLUP_HEADER.size) // rec
+
+        def start_at(i):
+            f.seek(ROLLUP_HEADER.size + i * rec)
+            return struct.unpack("<q", f.read(8))[0]
+
+        # records are in start order (up to restarts, which only repeat a start)
+        lo = bisect.bisect_left(range(n), start_ms, key=start_at)
+        f.seek(ROLLUP_HEADER.size + lo * rec)
+        out = []
+        while True:
+            data = f.read(rec * 256)
+            for off in range(0, len(data) - rec + 1, rec):
+                b = _Bucket.unpack(data, off)
+                if b.start > end_ms:
+                    return out
+                out.append(b)
+            if len(data) < rec * 256:
+                return out
+
+
+def query(rollup_dir: str, start_ms: int, end_ms: int, step_ms: int,
+          fields: Optional[Sequence[str]] = None, tag: Optional[str] = None) -> List[dict]:
+    """
+    Aggregates over [start_ms, end_ms] in `step_ms` buckets, read from the
+    coarsest resolution that divides the step: one dict per non-empty step
+    with start_ms, count and {min, max, mean, last} per field.
+    Cost depends on the number of stored buckets in range, not on frames.
+    """
+    fields = list(fields or ROLLUP_FIELDS)
+    res = pick_resolution(step_ms)
+    path = _path(rollup_dir, res, tag)
+    if not os.path.exists(path):
+        return []
+    steps: Dict[int, _Bucket] = {}
+    for b in _read_range(path, start_ms - start_ms % res, end_ms):
+        key = b.start - b.start % step_ms
+        s = steps.get(key)
+        if s is None:
+            s = steps[key] = _Bucket(key)
+        s.merge(b)
+    return [steps[k].as_dict(fields) for k in sorted(steps)]
+
+
+def summary(rollup_dir: str, start_ms: int, end_ms: int, resolution_ms: int,
+            fields: Optional[Sequence[str]] = None, tag: Optional[str] = None) -> Optional[dict]:
+    """
+    One aggregate over [start_ms, end_ms] (start_ms, count, {min, max,
+    mean, last} per field) from the buckets of the given resolution;
+    None if there are none. Buckets still open in the ground are not on
+    disk yet, so use a resolution well below the span.
+    """
+    path = _path(rollup_dir, pick_resolution(resolution_ms), tag)
+    if not os.path.exists(path):
+        return None
+    total = _Bucket(start_ms)
+    for b in _read_range(path, start_ms - start_ms % resolution_ms, end_ms):
+        total.merge(b)
+    return total.as_dict(list(fields or ROLLUP_FIELDS)) if total.count else None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Query telemetry rollups")
+    ap.add_argument("rollup_dir")
+    ap.add_argument("--field", action="append", dest="fields", help="repeatable; default all")
+    ap.add_argument("--last", type=float, default=3600, help="seconds back from now")
+    ap.add_argument("--step", type=float, default=60, help="seconds per output row")
+    ap.add_argument("--tag", default=None, help="spacecraft tag with per-source rollups")
+    args = ap.parse_args(argv)
+
+    end = time.time_ns() // 1_000_000
+    rows = query(args.rollup_dir, end - int(args.last * 1000), end, int(args.step * 1000),
+                 args.fields, args.tag)
+    fields = args.fields or ROLLUP_FIELDS
+    print("start_ms,count," + ",".join(f"{k}_{s}" for k in fields for s in _STATS))
+    for r in rows:
+        print(f"{r['start_ms']},{r['count']}," +
+              ",".join(f"{r[k][s]:.6g}" for k in fields for s in _STATS))
+
+if __name__ == "__main__":
+    main()
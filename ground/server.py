@@ -0,0 +1,464 @@
+# ground/server.py
+"""
+asyncio ground station: a DatagramProtocol (or, with link_transport
+"tcp", a stream protocol cutting frames out with packet.Deframer)
+decodes every frame as it arrives and fans the result out to independent
+sinks. Each sink owns a bounded queue and its own task, so a slow disk or
+viewer only ever fills (and then drops from) its own queue instead of
+stalling reception.
+
+Run with: python -m ground.server
+"""
+import asyncio
+import time
+from typing import List, Optional
+
+from sat_sim.packet import Deframer
+from sat_sim.timing import StageTimer
+
+from .decode import StreamDecoder
+from .ground import load_config, make_loggers
+from .metrics import (FunctionStats, Sampler, install_toggle, instrument, profile_route,
+                      render_prometheus, uninstrument)
+from .pubsub import LivePublisher
+from .rollup import RollupRouter
+from .shmring import RingWriter
+from .stats import FleetStats, format_windows
+from .stats_http import StatsEndpoint, parse_addr
+from .udp_rx import open_socket
+
+
+class Sink:
+    """
+    Consumes (row, frame, source) items from a bounded queue on its own task.
+    offer() never blocks: when the queue is full the item is dropped and
+    counted. Subclasses implement handle(batch).
+    """
+    name = "sink"
+    max_batch = 512      # items handed to handle() at once
+    idle_s = None        # if set, idle() is called after this long without items
+    timer: Optional[StageTimer] = None   # set by GroundServer: per-item handle() time
+
+    def __init__(self, maxsize: int = 4096):
+        self.queue = asyncio.Queue(maxsize)
+        self.maxsize = maxsize
+        self.delivered = 0
+        self.dropped = 0
+        self.high_water = 0
+
+    def offer(self, item) -> bool:
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        depth = self.queue.qsize()
+        if depth > self.high_water:
+            self.high_water = depth
+        return True
+
+    async def run(self):
+        q = self.queue
+        while True:
+            try:
+                item = await asyncio.wait_for(q.get(), self.idle_s)
+            except asyncio.TimeoutError:
+                await self.idle()
+                continue
+            batch = [item]
+            while len(batch) < self.max_batch and not q.empty():
+                batch.append(q.get_nowait())
+            t0 = time.perf_counter_ns()
+            try:
+                await self.handle(batch)
+                if self.timer:
+                    self.timer.record(f"sink_{self.name}", (time.perf_counter_ns() - t0) // len(batch))
+            except Exception as e:
+                print(f"[GROUND] sink {self.name} failed:", e)
+            finally:
+                for _ in batch:
+                    q.task_done()
+            self.delivered += len(batch)
+
+    async def handle(self, batch: list):
+        raise NotImplementedError
+
+    async def idle(self):
+        pass
+
+    async def wait_idle(self):
+        """After the task is cancelled: wait for work it left running elsewhere (threads)."""
+        pass
+
+    def close(self):
+        pass
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.name,
+            "depth": self.queue.qsize(),
+            "maxsize": self.maxsize,
+            "high_water": self.high_water,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+class LoggerSink(Sink):
+    """
+    Wraps a ground.logger.SourceRouter. Writes happen in a worker thread,
+    one hop per batch, so file I/O (and fsync) never runs on the event loop.
+    raw=True feeds the raw frame to write_frame (BinaryLogger) instead of
+    the decoded row to write.
+    """
+    def __init__(self, name: str, router, raw: bool = False, maxsize: int = 4096,
+                 idle_s: Optional[float] = None):
+        super().__init__(maxsize)
+        self.name = name
+        self.router = router
+        self.raw = raw
+        self.idle_s = idle_s
+        self._busy: Optional[asyncio.Future] = None   # the worker-thread call in progress
+
+    async def _in_thread(self, fn, *args):
+        # A thread cannot be interrupted: cancelling the sink task only cancels
+        # the shield, the call itself runs on and wait_idle() waits for it.
+        self._busy = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+        await asyncio.shield(self._busy)
+
+    def _write(self, batch):
+        get = self.router.get
+        if self.raw:
+            for _row, frame, source in batch:
+                get(source).write_frame(frame)
+        else:
+            for row, _frame, source in batch:
+                get(source).write(row)
+
+    async def handle(self, batch):
+        await self._in_thread(self._write, batch)
+
+    async def idle(self):
+        await self._in_thread(self.router.poll)
+
+    async def wait_idle(self):
+        if self._busy is not None:
+            await asyncio.gather(self._busy, return_exceptions=True)
+
+    def close(self):
+        self.router.close()
+
+
+class SubscriberSink(Sink):
+    """
+    Live fan-out of decoded rows to in-process subscribers (one asyncio.Queue
+    each). A slow subscriber loses rows from its own queue only.
+    """
+    name = "live"
+
+    def __init__(self, maxsize: int = 4096):
+        super().__init__(maxsize)
+        self.subscribers: List[asyncio.Queue] = []
+        self.subscriber_drops = 0
+
+    def subscribe(self, maxsize: int = 1024) -> asyncio.Queue:
+        q = asyncio.Queue(maxsize)
+        self.subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue):
+        if q in self.subscribers:
+            self.subscribers.remove(q)
+
+    async def handle(self, batch):
+        for q in self.subscribers:
+            for row, _frame, _source in batch:
+                try:
+                    q.put_nowait(row)
+                except asyncio.QueueFull:
+                    self.subscriber_drops += 1
+
+    def snapshot(self) -> dict:
+        snap = super().snapshot()
+        snap["subscribers"] = len(self.subscribers)
+        snap["subscriber_drops"] = self.subscriber_drops
+        return snap
+
+
+class PublisherSink(Sink):
+    """
+    Live fan-out to out-of-process viewers through a ground.pubsub
+    LivePublisher. Sends are non-blocking, so this runs on the event loop;
+    each handled batch goes out as one datagram per viewer.
+    """
+    name = "pub"
+    idle_s = 0.5         # pick up (un)subscribes while the link is quiet
+
+    def __init__(self, publisher: LivePublisher, maxsize: int = 4096):
+        super().__init__(maxsize)
+        self.publisher = publisher
+
+    async def handle(self, batch):
+        now = time.time_ns() // 1_000_000
+        publish = self.publisher.publish
+        for _row, frame, _source in batch:
+            publish(frame, now)
+        self.publisher.flush()
+
+    async def idle(self):
+        self.publisher.flush()
+
+    def close(self):
+        self.publisher.close()
+
+    def snapshot(self) -> dict:
+        snap = super().snapshot()
+        snap["subscribers"] = len(self.publisher.subscribers)
+        snap["subscriber_drops"] = self.publisher.dropped
+        return snap
+
+
+class RingSink(Sink):
+    """Keeps the shared-memory window of recent telemetry (ground.shmring) current."""
+    name = "ring"
+
+    def __init__(self, ring: RingWriter, maxsize: int = 4096):
+        super().__init__(maxsize)
+        self.ring = ring
+
+    async def handle(self, batch):
+        now = time.time_ns() // 1_000_000
+        write = self.ring.write
+        for _row, frame, _source in batch:
+            write(frame, now)
+
+    def close(self):
+        self.ring.close()
+
+
+class RollupSink(Sink):
+    """Feeds the 1 s / 1 min / 1 h rollups (ground.rollup); at most a few small writes per second."""
+    name = "rollup"
+    idle_s = 1.0         # close finished buckets while the link is quiet
+
+    def __init__(self, router: RollupRouter, maxsize: int = 4096):
+        super().__init__(maxsize)
+        self.router = router
+
+    async def handle(self, batch):
+        now = time.time_ns() // 1_000_000
+        get = self.router.get
+        for row, _frame, source in batch:
+            get(source).add(row, now)
+
+    async def idle(self):
+        self.router.poll()
+
+    def close(self):
+        self.router.close()
+
+
+class GroundProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server: "GroundServer"):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        self.server.on_datagram(data, addr)
+
+    def error_received(self, exc):
+        print("[GROUND] socket error:", exc)
+
+
+class GroundStreamProtocol(asyncio.BufferedProtocol):
+    """One TCP downlink: the event loop reads straight into a Deframer."""
+    def __init__(self, server: "GroundServer"):
+        self.server = server
+        self.deframer = Deframer()
+        self.peer = None
+
+    def connection_made(self, transport):
+        self.peer = transport.get_extra_info("peername")
+
+    def get_buffer(self, sizehint):
+        return self.deframer.writable()
+
+    def buffer_updated(self, nbytes):
+        self.deframer.commit(nbytes)
+        for view in self.deframer.frames():
+            # sinks keep frames past this call; the view is reused by the next read
+            self.server.on_datagram(bytes(view), self.peer)
+
+
+class GroundServer:
+    """
+    Owns the UDP endpoint, the per-source FleetStats and the sink tasks.
+    Stats are updated inline (they are cheap and must see every datagram);
+    everything else goes through a sink.
+    """
+    def __init__(self, sinks: List[Sink], stats: Optional[FleetStats] = None,
+                 timer: Optional[StageTimer] = None):
+        self.sinks = sinks
+        self.stats = stats or FleetStats()
+        self.timer = timer or StageTimer()
+        for s in sinks:
+            s.timer = self.timer
+        self.decoder = StreamDecoder()
+        self.transport = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self, host: str, port: int, rcvbuf: Optional[int] = None, transport: str = "udp"):
+        """Receive on UDP, or accept TCP stream downlinks with transport="tcp"."""
+        loop = asyncio.get_running_loop()
+        if transport == "tcp":
+            self.transport = await loop.create_server(lambda: GroundStreamProtocol(self), host, port)
+        elif transport == "udp":
+            self.transport, _ = await loop.create_datagram_endpoint(
+                lambda: GroundProtocol(self), sock=open_socket(host, port, rcvbuf))
+        else:
+            raise ValueError(f"Unsupported transport for the asyncio server: {transport!r} (use ground.ground)")
+        self._tasks = [asyncio.create_task(s.run(), name=f"sink-{s.name}") for s in self.sinks]
+
+    @property
+    def address(self):
+        if isinstance(self.transport, asyncio.AbstractServer):
+            return self.transport.sockets[0].getsockname()
+        return self.transport.get_extra_info("sockname") if self.transport else None
+
+    def on_datagram(self, data: bytes, addr):
+        t0 = time.perf_counter_ns()
+        try:
+            samples = self.decoder.decode(data, addr)   # may raise ValueError
+        except Exception as e:
+            print("[GROUND] Decode failed:", e)   # debug info
+            self.stats.note_bad(addr)
+            return
+        t1 = time.perf_counter_ns()
+        # one ground timestamp per datagram, shared by every sink
+        now = round(time.time(), 3)
+        for row, frame in samples:   # empty for a delta waiting for a keyframe
+            self.stats.note_good(addr, row["seq"], row["timestamp_ms"])
+            row["timestamp"] = now
+            item = (row, frame, addr)
+            for s in self.sinks:
+                s.offer(item)
+        self.timer.record("decode", t1 - t0)
+        if samples:
+            self.timer.record("dispatch", (time.perf_counter_ns() - t1) // len(samples))
+
+    def stats_doc(self) -> dict:
+        """Everything the stats endpoint serves."""
+        return {
+            "link": self.stats.snapshot(),
+            "per_source": self.stats.per_source(),
+            "latency_us": self.timer.snapshot(),
+            "decoder": self.decoder.snapshot(),
+            "sinks": [s.snapshot() for s in self.sinks],
+        }
+
+    def metrics_text(self, functions: Optional[FunctionStats] = None) -> str:
+        """Prometheus exposition for /metrics: link, stage latency, hot-path functions, sinks."""
+        sinks = [s.snapshot() for s in self.sinks]
+        by_sink = lambda key: [({"sink": k["name"]}, k[key]) for k in sinks]
+        return render_prometheus(self.stats.snapshot(), self.timer.snapshot(), functions, {
+            "cubesat_sink_delivered_total": ("Items a sink has handled.", by_sink("delivered")),
+            "cubesat_sink_dropped_total": ("Items dropped because a sink queue was full.", by_sink("dropped")),
+        }, {
+            "cubesat_sink_queue_depth": ("Items waiting in a sink queue.", by_sink("depth")),
+            "cubesat_sink_queue_high_water": ("Deepest a sink queue has been.", by_sink("high_water")),
+        })
+
+    async def stop(self, drain_timeout: float = 2.0):
+        """Stop receiving, let sinks drain what they hold, then close them."""
+        if self.transport:
+            self.transport.close()
+        try:
+            await asyncio.wait_for(asyncio.gather(*(s.queue.join() for s in self.sinks)), drain_timeout)
+        except asyncio.TimeoutError:
+            print("[GROUND] sinks did not drain in time; closing anyway")
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for s in self.sinks:
+            await s.wait_idle()     # never close a router a worker thread is still writing to
+            s.close()
+
+    def status_line(self) -> str:
+        snap = self.stats.snapshot()
+        line = (f"[status] good={snap['total_good']} bad={snap['total_bad']} "
+                f"loss={snap['seq_loss']} ({snap['loss_pct']}%) rate≈{snap['rate_est_pps']} pps "
+                f"sources={snap['sources']}")
+        dec = self.decoder.snapshot()
+        line += f" B/sample={dec['bytes_per_sample']} unsynced={dec['unsynced']}"
+        for s in self.sinks:
+            k = s.snapshot()
+            line += f" | {k['name']} q={k['depth']}/{k['maxsize']} hw={k['high_water']} drop={k['dropped']}"
+        return (line + f"\n[window] {format_windows(snap)}"
+                + f"\n[latency] {self.timer.status()}")
+
+
+def build_sinks(cfg: dict, log_dir: str) -> List[Sink]:
+    qsize = int(cfg.get("ground_sink_queue", 4096))
+    flush_ms = float(cfg.get("ground_log_flush_ms", 0))
+    idle_s = flush_ms / 1000.0 if flush_ms > 0 else None
+    csv, jsonl, binlog = make_loggers(cfg, log_dir)
+    sinks: List[Sink] = []
+    if csv: sinks.append(LoggerSink("csv", csv, maxsize=qsize, idle_s=idle_s))
+    if jsonl: sinks.append(LoggerSink("jsonl", jsonl, maxsize=qsize, idle_s=idle_s))
+    if binlog: sinks.append(LoggerSink("bin", binlog, raw=True, maxsize=qsize, idle_s=idle_s))
+    sinks.append(SubscriberSink(maxsize=qsize))
+    if cfg.get("ground_live_socket"):
+        sinks.append(PublisherSink(LivePublisher(cfg["ground_live_socket"]), maxsize=qsize))
+    if cfg.get("ground_shm_ring"):
+        ring = RingWriter(cfg["ground_shm_ring"], int(cfg.get("ground_shm_ring_records", 65536)))
+        sinks.append(RingSink(ring, maxsize=qsize))
+    if cfg.get("ground_rollup_dir"):
+        rollups = RollupRouter(cfg["ground_rollup_dir"], bool(cfg.get("ground_per_source_logs", False)))
+        sinks.append(RollupSink(rollups, maxsize=qsize))
+    return sinks
+
+
+async def serve(cfg: dict):
+    host = cfg.get("udp_host", "127.0.0.1")
+    port = int(cfg.get("udp_port", 5005))
+    log_dir = cfg.get("ground_log_dir", "ground/logs")
+    status_iv = int(cfg.get("ground_status_interval_sec", 5))
+
+    fn_stats = instrument() if cfg.get("ground_metrics", False) else None
+    server = GroundServer(build_sinks(cfg, log_dir))
+    await server.start(host, port, cfg.get("ground_rcvbuf_bytes"), cfg.get("link_transport", "udp"))
+    stats_addr = parse_addr(cfg.get("ground_stats_http"))
+    endpoint = StatsEndpoint(*stats_addr) if stats_addr else None
+    sampler = Sampler(hz=float(cfg.get("ground_profile_hz", 200)))
+    install_toggle(sampler, cfg.get("ground_profile_dir", "ground/profiles"))
+    if endpoint:
+        endpoint.route("/profile", profile_route(sampler))
+    print(f"Ground station (asyncio) listening on {host}:{port}"
+          + (f", stats on http://{stats_addr[0]}:{endpoint.address[1]}/stats" if endpoint else ""))
+    last_status = time.monotonic()
+    try:
+        while True:
+            await asyncio.sleep(1.0)
+            if endpoint:
+                endpoint.publish(server.stats_doc())
+                endpoint.publish_text(server.metrics_text(fn_stats), "/metrics",
+                                      "text/plain; version=0.0.4; charset=utf-8")
+            if time.monotonic() - last_status >= status_iv:
+                print(server.status_line())
+                last_status = time.monotonic()
+    finally:
+        await server.stop()
+        if endpoint:
+            endpoint.close()
+        if sampler.running:
+            sampler.stop()
+        uninstrument()
+
+
+def run():
+    try:
+        asyncio.run(serve(load_config()))
+    except KeyboardInterrupt:
+        print("Ground station stopped.")
+
+if __name__ == "__main__":
+    run()
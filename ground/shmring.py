@@ -0,0 +1,214 @@
+# ground/shmring.py
+"""
+Shared-memory ring of recent telemetry.
+
+The ground station (RingWriter) keeps the last `capacity` frames in one
+multiprocessing.shared_memory block, as the same 48-byte records the
+binary archive uses (int64 ground ms + raw 40-byte frame). Any number of
+local processes attach with RingReader and look at the window as a NumPy
+structured array (bulk.SEG_DTYPE) without copying or parsing.
+
+Readers never take a lock and never block the writer. Two counters in the
+header act as a seqlock: the writer bumps `reserve` before it touches a
+slot and `head` once the slot is complete. A reader notes which records
+it read, then re-reads `reserve`; if the writer has since reserved any of
+those slots, the read is torn and is retried (latest()) or reported
+(valid()).
+
+A name can only have one writer. A ground station that finds the block
+already there takes it over only if it is stale: not a ring of this
+format, its owner process is gone, or its head has not moved for
+`stale_after_s`. A ring another ground station is still feeding is left
+alone and RingWriter raises instead.
+
+Block layout (little endian):
+    0  4s  magic b"CSRG"
+    4  u16 format version
+    6  u16 record length (48)
+    8  u32 capacity (records)
+   12  u32 owner pid (the ground station writing the ring)
+   16  u64 head     records committed since the ring was created
+   24  u64 reserve  head + records being written right now
+   32  capacity * record
+"""
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+from sat_sim.packet import TM_FRAME_LEN
+from .logger import REC_TS, SEG_RECORD_LEN
+
+RING_MAGIC = b"CSRG"
+RING_FORMAT_VERSION = 1
+RING_HEADER = struct.Struct("<4sHHIIQQ")
+_COUNTER = struct.Struct("<Q")
+_HEAD_OFF = 16
+_RESERVE_OFF = 24
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Open an existing block without taking ownership of it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: attaching registers the block with this process's
+        # resource tracker, which would unlink it when we exit
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0 or os.name != "posix":
+        return True     # unknown: let the head check decide
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass            # exists, owned by another user
+    return True
+
+
+def _stale_reason(shm: shared_memory.SharedMemory, stale_after_s: float) -> Optional[str]:
+    """Why an existing block may be replaced, or None if its writer is live."""
+    if shm.size < RING_HEADER.size:
+        return "not a ring"
+    magic, version, record_len, _cap, pid, head, _reserve = RING_HEADER.unpack_from(shm.buf, 0)
+    if magic != RING_MAGIC or version != RING_FORMAT_VERSION or record_len != SEG_RECORD_LEN:
+        return f"unsupported ring (magic={magic!r} version={version})"
+    if not _pid_alive(pid):
+        return f"owner pid {pid} is gone"
+    deadline = time.monotonic() + stale_after_s
+    while True:
+        if _COUNTER.unpack_from(shm.buf, _HEAD_OFF)[0] != head:
+            return None
+        if time.monotonic() >= deadline:
+            return f"head idle for {stale_after_s:g}s"
+        time.sleep(min(0.05, stale_after_s))
+
+
+class RingWriter:
+    """
+    Single writer; does not need NumPy. The block is created and unlinked
+    on close(). A stale block under the same name (see the module notes)
+    is replaced; a live one raises FileExistsError.
+    """
+    def __init__(self, name: str, capacity: int = 65536, stale_after_s: float = 2.0):
+        self.name = name
+        self.capacity = int(capacity)
+        size = RING_HEADER.size + self.capacity * SEG_RECORD_LEN
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            old = _attach(name)
+            try:
+                reason = _stale_reason(old, stale_after_s)
+            finally:
+                old.close()
+            if reason is None:
+                raise FileExistsError(
+                    f"Shared-memory ring {name!r} is being written by another ground station; "
+                    f"stop it or choose another ground_shm_ring") from None
+            print(f"[GROUND] Replacing stale shared-memory ring {name!r}: {reason}")
+            old = shared_memory.SharedMemory(name=name)    # tracked, so unlink() balances it
+            old.close()
+            old.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.buf = self.shm.buf
+        RING_HEADER.pack_into(self.buf, 0, RING_MAGIC, RING_FORMAT_VERSION,
+                              SEG_RECORD_LEN, self.capacity, os.getpid(), 0, 0)
+        self.head = 0
+
+    def write(self, frame: bytes, ground_ts_ms: Optional[int] = None):
+        if len(frame) != TM_FRAME_LEN:
+            raise ValueError(f"Ring records hold {TM_FRAME_LEN}-byte frames, got {len(frame)}")
+        if ground_ts_ms is None:
+            ground_ts_ms = time.time_ns() // 1_000_000
+        buf = self.buf
+        head = self.head
+        _COUNTER.pack_into(buf, _RESERVE_OFF, head + 1)
+        off = RING_HEADER.size + (head % self.capacity) * SEG_RECORD_LEN
+        REC_TS.pack_into(buf, off, ground_ts_ms)
+        buf[off + REC_TS.size:off + SEG_RECORD_LEN] = frame
+        self.head = head + 1
+        _COUNTER.pack_into(buf, _HEAD_OFF, self.head)
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class RingReader:
+    """Attach to a ring by name (requires NumPy)."""
+    def __init__(self, name: str):
+        import numpy as np
+        from .bulk import SEG_DTYPE
+        self._np = np
+        self.shm = _attach(name)
+        magic, version, record_len, capacity, _pid, _head, _reserve = RING_HEADER.unpack_from(self.shm.buf, 0)
+        if magic != RING_MAGIC or version != RING_FORMAT_VERSION or record_len != SEG_RECORD_LEN:
+            self.shm.close()
+            raise ValueError(f"Unsupported ring: magic={magic!r} version={version} record_len={record_len}")
+        self.capacity = capacity
+        self.records = np.ndarray((capacity,), dtype=SEG_DTYPE, buffer=self.shm.buf,
+                                  offset=RING_HEADER.size)
+
+    @property
+    def head(self) -> int:
+        return _COUNTER.unpack_from(self.shm.buf, _HEAD_OFF)[0]
+
+    def valid(self, lo: int) -> bool:
+        """True if no record from absolute index `lo` on has been overwritten (or is being)."""
+        reserve = _COUNTER.unpack_from(self.shm.buf, _RESERVE_OFF)[0]
+        return reserve - lo <= self.capacity
+
+    def views(self, n: Optional[int] = None) -> Tuple[int, tuple]:
+        """
+        Zero-copy views of the newest `n` records (all available if None):
+        (lo, (older, newer)) where lo is the absolute index of the first
+        record and the window is split in two where it wraps (newer may be
+        empty). The views alias live memory; check valid(lo) after using
+        them to know the writer did not lap you meanwhile.
+        """
+        head = self.head
+        avail = min(head, self.capacity)
+        n = avail if n is None else min(int(n), avail)
+        lo = head - n
+        start = lo % self.capacity
+        end = start + n
+        if end <= self.capacity:
+            return lo, (self.records[start:end], self.records[:0])
+        return lo, (self.records[start:], self.records[:end - self.capacity])
+
+    def latest(self, n: Optional[int] = None, retries: int = 8):
+        """
+        Consistent copy of the newest `n` records as one SEG_DTYPE array,
+        oldest first. Retries if the writer lapped the read.
+        Raises RuntimeError if it never got a clean read.
+        """
+        np = self._np
+        for _ in range(retries):
+            lo, (a, b) = self.views(n)
+            out = np.concatenate((a, b))
+            if self.valid(lo):
+                return out
+        raise RuntimeError("Ring reader kept getting lapped by the writer")
+
+    def since(self, ground_ts_ms: int):
+        """Consistent copy of every record stamped at or after `ground_ts_ms`."""
+        recs = self.latest()
+        # ground stamps are monotonic within a ring, so bisect
+        i = self._np.searchsorted(recs["ground_ts_ms"], ground_ts_ms, side="left")
+        return recs[i:]
+
+    def close(self):
+        self.records = None
+        self.shm.close()
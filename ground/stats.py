@@ -1,34 +1,300 @@
 # ground/stats.py
+"""
+Link statistics for the ground station.
+
+StatsTracker follows one spacecraft's sequence numbers (16-bit, wrap
+aware, RFC 3550 style) and books every event into a ring of one-second
+slots, so an update is O(1) and any window up to WINDOWS_S[-1] is the sum
+of its slots. Per window it reports rate, loss, duplicates, reordering,
+inter-arrival jitter and latency percentiles from a log-linear
+(HDR-style) histogram in ms (see sat_sim.timing). FleetStats keeps one
+tracker per source and merges their windows.
+"""
 import time
+from array import array
+from typing import Dict, Optional
+
+from sat_sim.timing import hist_index, hist_percentiles
+
+WINDOWS_S = (10, 60, 300)
+SEQ_MOD = 1 << 16
+SAT_TS_MOD = 1 << 32
+MAX_DROPOUT = 3000        # forward jumps up to this are gaps (lost frames)
+MAX_MISORDER = 1024       # backward steps up to this are late or duplicate frames
+
+
+class _Slot:
+    __slots__ = ("second", "good", "bad", "lost", "dup", "reordered", "jit_sum", "jit_n", "lat")
 
-class StatsTracker:
     def __init__(self):
+        self.reset(-1)
+
+    def reset(self, second: int):
+        self.second = second
+        self.good = self.bad = self.lost = self.dup = self.reordered = 0
+        self.jit_sum = 0.0
+        self.jit_n = 0
+        self.lat = {}
+
+
+class WindowAgg:
+    """Raw sums over a window; mergeable across sources, turned into numbers by result()."""
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.good = self.bad = self.lost = self.dup = self.reordered = 0
+        self.jit_sum = 0.0
+        self.jit_n = 0
+        self.lat: Dict[int, int] = {}
+
+    def add(self, s):
+        self.good += s.good
+        self.bad += s.bad
+        self.lost += s.lost
+        self.dup += s.dup
+        self.reordered += s.reordered
+        self.jit_sum += s.jit_sum
+        self.jit_n += s.jit_n
+        lat = self.lat
+        for k, n in s.lat.items():
+            lat[k] = lat.get(k, 0) + n
+
+    def result(self) -> dict:
+        lost = max(0, self.lost)
+        expected = self.good - self.dup + lost
+        return {
+            "rate_pps": round(self.good / self.seconds, 1) if self.seconds > 0 else 0.0,
+            "good": self.good,
+            "bad": self.bad,
+            "lost": lost,
+            "loss_pct": round(lost / expected * 100.0, 2) if expected > 0 else 0.0,
+            "duplicates": self.dup,
+            "reordered": self.reordered,
+            "jitter_ms": round(self.jit_sum / self.jit_n, 2) if self.jit_n else None,
+            "latency_ms": hist_percentiles(self.lat),
+        }
+
+
+def _span(seconds: int, now: float, first_event: Optional[float]) -> float:
+    # the window starts at a second boundary, or at the first frame if later
+    start = int(now) - seconds + 1
+    if first_event is not None and first_event > start:
+        start = first_event
+    return max(1.0, now - start)
+
+
+class StatsTracker:
+    def __init__(self, windows=WINDOWS_S):
+        self.windows = tuple(windows)
         self.total_good = 0
         self.total_bad = 0
         self.last_seq = None
         self.seq_loss = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self.restarts = 0
+        self.jitter_ms = 0.0          # RFC 3550 running estimate
         self.start_time = time.time()
+        self.first_event = None       # ground time of the first frame, bounds young windows
+        self._max_ext = None
+        # extended seq last received in each of MAX_MISORDER slots: a seq was
+        # received iff its slot holds exactly it, so gaps need no clearing
+        self._seen = array("q", [-1]) * MAX_MISORDER
+        self._last_transit = None
+        self._slots = [_Slot() for _ in range(max(self.windows) + 1)]
 
-    def note_good(self, seq):
+    def _slot(self, now: float) -> _Slot:
+        if self.first_event is None:
+            self.first_event = now
+        sec = int(now)
+        s = self._slots[sec % len(self._slots)]
+        if s.second != sec:
+            s.reset(sec)
+        return s
+
+    def note_good(self, seq, sat_ts_ms: Optional[int] = None, now: Optional[float] = None):
+        """
+        One valid frame. `sat_ts_ms` (the frame's timestamp_ms) enables
+        latency and jitter; `now` is the ground receive time in seconds.
+        """
+        if now is None:
+            now = time.time()
+        slot = self._slot(now)
         self.total_good += 1
-        # check for lost sequence numbers
-        if self.last_seq is not None and seq > self.last_seq + 1:
-            self.seq_loss += (seq - self.last_seq - 1)
+        slot.good += 1
+        self._track_seq(seq, slot)
         self.last_seq = seq
 
-    def note_bad(self):
+        if sat_ts_ms is not None:
+            now_ms = int(now * 1000)
+            # sat clock is wall-clock ms mod 2**32; a negative transit is clock skew
+            transit = (now_ms - sat_ts_ms) % SAT_TS_MOD
+            if transit >= SAT_TS_MOD // 2:
+                transit -= SAT_TS_MOD
+            lat = slot.lat
+            k = hist_index(max(0, transit))
+            lat[k] = lat.get(k, 0) + 1
+            if self._last_transit is not None:
+                d = abs(transit - self._last_transit)
+                slot.jit_sum += d
+                slot.jit_n += 1
+                self.jitter_ms += (d - self.jitter_ms) / 16.0
+            self._last_transit = transit
+
+    def _track_seq(self, seq: int, slot: _Slot):
+        seen = self._seen
+        if self._max_ext is None:
+            self._max_ext = seq
+            seen[seq % MAX_MISORDER] = seq
+            return
+        max_ext = self._max_ext
+        delta = (seq - max_ext) % SEQ_MOD
+        if delta == 0:
+            self.duplicates += 1
+            slot.dup += 1
+        elif delta < MAX_DROPOUT:
+            # in order, possibly after a gap (the skipped slots hold older seqs)
+            ext = max_ext + delta
+            seen[ext % MAX_MISORDER] = ext
+            self._max_ext = ext
+            if delta > 1:
+                self.seq_loss += delta - 1
+                slot.lost += delta - 1
+        elif delta >= SEQ_MOD - MAX_MISORDER + 1:
+            # older than the newest: a late frame we counted as lost, or a duplicate
+            ext = max_ext - (SEQ_MOD - delta)
+            i = ext % MAX_MISORDER
+            if seen[i] == ext:
+                self.duplicates += 1
+                slot.dup += 1
+            else:
+                seen[i] = ext
+                self.reordered += 1
+                slot.reordered += 1
+                self.seq_loss -= 1
+                slot.lost -= 1
+        else:
+            # a jump no reordering explains: the spacecraft restarted its counter
+            self.restarts += 1
+            self._max_ext = max_ext + delta
+            seen[self._max_ext % MAX_MISORDER] = self._max_ext
+
+    def note_bad(self, now: Optional[float] = None):
         self.total_bad += 1
+        self._slot(time.time() if now is None else now).bad += 1
 
-    def snapshot(self):
-        elapsed = time.time() - self.start_time
-        rate = self.total_good / elapsed if elapsed > 0 else 0
-        total = self.total_good + self.total_bad
-        loss_pct = (self.seq_loss / total * 100.0) if total > 0 else 0.0
+    def window(self, seconds: int, now: Optional[float] = None, agg: Optional[WindowAgg] = None) -> WindowAgg:
+        """Sum of the current second and the `seconds` - 1 before it."""
+        if now is None:
+            now = time.time()
+        sec = int(now)
+        if agg is None:
+            agg = WindowAgg(_span(seconds, now, self.first_event))
+        n = len(self._slots)
+        for back in range(min(seconds, n)):
+            s = self._slots[(sec - back) % n]
+            if s.second == sec - back:
+                agg.add(s)
+        return agg
+
+    def snapshot(self, now: Optional[float] = None):
+        if now is None:
+            now = time.time()
+        windows = {f"{w}s": self.window(w, now).result() for w in self.windows}
+        lost = max(0, self.seq_loss)
+        expected = self.total_good - self.duplicates + lost
         return {
             "total_good": self.total_good,
             "total_bad": self.total_bad,
-            "seq_loss": self.seq_loss,
-            "loss_pct": round(loss_pct, 1),
-            "rate_est_pps": round(rate, 1),
+            "seq_loss": lost,
+            "loss_pct": round(lost / expected * 100.0, 1) if expected > 0 else 0.0,
+            "rate_est_pps": windows[f"{self.windows[0]}s"]["rate_pps"],
+            "duplicates": self.duplicates,
+            "reordered": self.reordered,
+            "restarts": self.restarts,
+            "jitter_ms": round(self.jitter_ms, 2),
+            "windows": windows,
         }
 
+
+
+def source_tag(source) -> str:
+    """Filesystem/label-friendly name for a source address ("ip_port")."""
+    if isinstance(source, tuple):
+        return "_".join(str(p) for p in source[:2])
+    return str(source)
+
+class FleetStats:
+    """
+    One StatsTracker per source (spacecraft), keyed by sender address, so
+    each spacecraft has its own sequence tracking and loss counters. A
+    source gets its tracker with its first good frame; bad frames from
+    addresses not heard from yet (noise, scanners) are booked on one
+    fleet-level tracker instead, so junk senders cost no memory.
+    """
+    def __init__(self, windows=WINDOWS_S):
+        self.windows = tuple(windows)
+        self.trackers = {}
+        self.unknown = StatsTracker(self.windows)    # bad frames from sources without a tracker
+        self.start_time = time.time()
+
+    def tracker(self, source) -> StatsTracker:
+        t = self.trackers.get(source)
+        if t is None:
+            t = self.trackers[source] = StatsTracker(self.windows)
+        return t
+
+    def note_good(self, source, seq, sat_ts_ms: Optional[int] = None, now: Optional[float] = None):
+        self.tracker(source).note_good(seq, sat_ts_ms, now)
+
+    def note_bad(self, source, now: Optional[float] = None):
+        (self.trackers.get(source) or self.unknown).note_bad(now)
+
+    def snapshot(self, now: Optional[float] = None):
+        """Fleet totals in the same shape as StatsTracker.snapshot, plus `sources`."""
+        if now is None:
+            now = time.time()
+        trackers = list(self.trackers.values())
+        good = sum(t.total_good for t in trackers)
+        bad = sum(t.total_bad for t in trackers) + self.unknown.total_bad
+        loss = sum(max(0, t.seq_loss) for t in trackers)
+        dup = sum(t.duplicates for t in trackers)
+        first = min((t.first_event for t in trackers if t.first_event is not None), default=None)
+        windows = {}
+        for w in self.windows:
+            agg = WindowAgg(_span(w, now, first))
+            for t in trackers:
+                t.window(w, now, agg)
+            self.unknown.window(w, now, agg)
+            windows[f"{w}s"] = agg.result()
+        expected = good - dup + loss
+        return {
+            "total_good": good,
+            "total_bad": bad,
+            "seq_loss": loss,
+            "loss_pct": round(loss / expected * 100.0, 1) if expected > 0 else 0.0,
+            "rate_est_pps": windows[f"{self.windows[0]}s"]["rate_pps"],
+            "duplicates": dup,
+            "reordered": sum(t.reordered for t in trackers),
+            "restarts": sum(t.restarts for t in trackers),
+            "jitter_ms": round(max((t.jitter_ms for t in trackers), default=0.0), 2),
+            "windows": windows,
+            "sources": len(trackers),
+            "bad_unknown_source": self.unknown.total_bad,
+        }
+
+    def per_source(self, now: Optional[float] = None):
+        return {source_tag(src): t.snapshot(now) for src, t in self.trackers.items()}
+
+
+def format_windows(snap: dict) -> str:
+    """Compact one-line summary of a snapshot's windows for status lines."""
+    parts = []
+    for name, w in snap["windows"].items():
+        lat = w["latency_ms"]
+        part = f"{name}: {w['rate_pps']}pps loss={w['loss_pct']}% dup={w['duplicates']} ooo={w['reordered']}"
+        if w["jitter_ms"] is not None:
+            part += f" jit={w['jitter_ms']}ms"
+        if lat["p50"] is not None:
+            part += f" lat p50/p99={lat['p50']}/{lat['p99']}ms"
+        parts.append(part)
+    return " | ".join(parts)
@@ -0,0 +1,96 @@
+# ground/stats_http.py
+"""
+Local HTTP stats endpoint for the ground station.
+
+The receive loop owns every counter, so it hands finished snapshots over
+with publish() (about once a second); the HTTP thread only serves the
+latest one and never touches live state. route() adds computed pages
+(e.g. the sampling profiler), run on the HTTP thread.
+
+    curl http://127.0.0.1:8765/stats
+    curl http://127.0.0.1:8765/metrics
+"""
+import json
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional, Tuple
+from urllib.parse import parse_qs
+
+
+class StatsEndpoint:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765):
+        self._docs = {"/stats": (b"{}", "application/json")}
+        self._routes = {}
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path, _, qs = self.path.partition("?")
+                route = endpoint._routes.get(path)
+                if route is not None:
+                    try:
+                        doc = route({k: v[-1] for k, v in parse_qs(qs).items()})
+                    except ValueError as e:
+                        self.send_error(400, str(e))
+                        return
+                else:
+                    doc = endpoint._docs.get(path)
+                if doc is None:
+                    self.send_error(404)
+                    return
+                body, ctype = doc
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass   # keep the ground console for status lines
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.httpd.server_address[:2]
+
+    def publish(self, doc: dict, path: str = "/stats"):
+        """Replace what GET `path` returns (JSON-encoded here, on the caller's thread)."""
+        self._docs[path] = (json.dumps(doc).encode(), "application/json")
+
+    def publish_text(self, text: str, path: str, ctype: str = "text/plain; charset=utf-8"):
+        self._docs[path] = (text.encode(), ctype)
+
+    def route(self, path: str, handler: Callable[[dict], Tuple[bytes, str]]):
+        """Serve GET `path` with handler(query params) -> (body, content type); ValueError is a 400."""
+        self._routes[path] = handler
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def parse_addr(value, default_host: str = "127.0.0.1") -> Optional[Tuple[str, int]]:
+    """Config value -> (host, port): 8765, "8765" or "host:8765"; None/0/"" disables."""
+    if not value:
+        return None
+    if isinstance(value, int):
+        return default_host, value
+    host, _, port = str(value).rpartition(":")
+    return host or default_host, int(port)
+
+
+def fetch(addr: Tuple[str, int], path: str = "/stats", timeout: float = 0.5) -> Optional[dict]:
+    """GET a JSON document from a StatsEndpoint at `addr`; None if it does not answer."""
+    host, port = addr
+    if host in ("", "0.0.0.0"):
+        host = "127.0.0.1"
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}{path}", timeout=timeout) as r:
+            return json.load(r)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,122 @@
+# ground/udp_rx.py
+"""
+Batched UDP receive for the ground station.
+
+BatchReceiver drains every datagram that is already queued on the socket
+per wakeup, with recvmsg_into into a preallocated ring of buffers (no new
+bytes object per datagram). On Linux it also enables SO_RXQ_OVFL so each
+datagram carries the socket's cumulative kernel drop counter, which is
+exposed as `kernel_drops`, and SO_TIMESTAMPNS so each datagram carries the
+wall-clock time the kernel queued it (how long it waited in the socket
+buffer is the first stage of ground latency).
+"""
+import select
+import socket
+import struct
+import sys
+from typing import Iterator, Optional, Tuple
+
+from sat_sim.link import SO_TIMESTAMPNS, TIMESPEC, rx_timestamp_ns
+
+MAX_DATAGRAM = 4096
+
+# not exported by the socket module; value from <asm-generic/socket.h>
+SO_RXQ_OVFL = getattr(socket, "SO_RXQ_OVFL", 40 if sys.platform.startswith("linux") else None)
+_U32 = struct.Struct("=I")
+ANC_BUFSIZE = (socket.CMSG_SPACE(_U32.size) if SO_RXQ_OVFL is not None else 0) \
+    + (socket.CMSG_SPACE(TIMESPEC.size) if SO_TIMESTAMPNS is not None else 0)
+
+
+def open_socket(host: str, port: int, rcvbuf: Optional[int] = None) -> socket.socket:
+    """
+    Bound UDP socket with SO_RCVBUF set to `rcvbuf` bytes (the kernel may
+    clamp it to net.core.rmem_max), drop accounting and receive timestamps
+    enabled if available.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if rcvbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, int(rcvbuf))
+    for opt in (SO_RXQ_OVFL, SO_TIMESTAMPNS):
+        if opt is not None:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, opt, 1)
+            except OSError:
+                pass
+    sock.bind((host, port))
+    return sock
+
+
+def rxq_ovfl(ancdata) -> Optional[int]:
+    """Kernel drop counter from recvmsg ancillary data, or None if absent."""
+    for level, ctype, data in ancdata:
+        if level == socket.SOL_SOCKET and ctype == SO_RXQ_OVFL and len(data) >= _U32.size:
+            return _U32.unpack_from(data)[0]
+    return None
+
+
+class BatchReceiver:
+    """
+    recv_batch() returns how many datagrams landed in the ring; frames()
+    then yields (memoryview, addr) for them (timed_frames() adds the
+    kernel receive time in ns, or None). The views point into the ring
+    and are overwritten by the next recv_batch(), so copy (bytes(view))
+    anything that must outlive the batch.
+    """
+    def __init__(self, sock: socket.socket, batch: int = 64):
+        self.sock = sock
+        sock.setblocking(False)
+        self.batch = max(1, int(batch))
+        self._bufs = [bytearray(MAX_DATAGRAM) for _ in range(self.batch)]
+        self._views = [memoryview(b) for b in self._bufs]
+        self._lens = [0] * self.batch
+        self._addrs = [None] * self.batch
+        self._stamps = [None] * self.batch
+        self._count = 0
+        self.kernel_drops = 0
+        self.wakeups = 0
+        self.timeouts = 0      # recv_batch() calls that waited the full timeout for nothing
+
+    def _drain(self) -> int:
+        sock = self.sock
+        views, lens, addrs, stamps = self._views, self._lens, self._addrs, self._stamps
+        n = 0
+        while n < self.batch:
+            try:
+                nbytes, anc, _flags, addr = sock.recvmsg_into([views[n]], ANC_BUFSIZE)
+            except (BlockingIOError, InterruptedError):
+                break
+            if anc:
+                drops = rxq_ovfl(anc)
+                if drops is not None and drops > self.kernel_drops:
+                    self.kernel_drops = drops
+                stamps[n] = rx_timestamp_ns(anc)
+            else:
+                stamps[n] = None
+            lens[n] = nbytes
+            addrs[n] = addr
+            n += 1
+        return n
+
+    def recv_batch(self, timeout: float) -> int:
+        """Wait up to `timeout` s for traffic, then drain up to `batch` datagrams."""
+        n = self._drain()
+        if not n:
+            ready, _, _ = select.select([self.sock], [], [], timeout)
+            if ready:
+                n = self._drain()
+        if n:
+            self.wakeups += 1
+        else:
+            self.timeouts += 1
+        self._count = n
+        return n
+
+    def frames(self) -> Iterator[Tuple[memoryview, tuple]]:
+        views, lens, addrs = self._views, self._lens, self._addrs
+        for i in range(self._count):
+            yield views[i][:lens[i]], addrs[i]
+
+    def timed_frames(self) -> Iterator[Tuple[memoryview, tuple, Optional[int]]]:
+        views, lens, addrs, stamps = self._views, self._lens, self._addrs, self._stamps
+        for i in range(self._count):
+            yield views[i][:lens[i]], addrs[i], stamps[i]
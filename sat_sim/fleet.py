@@ -0,0 +1,137 @@
+# sat_sim/fleet.py
+"""
+Vectorized fleet simulator (requires NumPy): the SensorSimulator model and
+CubeSatFSM for N spacecraft x T steps per call, every channel an (N, T)
+array, and the matching telemetry frames from packet_np.pack_many.
+
+Per-spacecraft parameters come from the "fleet_sim" config section, falling
+back to the single-spacecraft keys. Each value is a scalar (the whole
+fleet), a list with one value per spacecraft, or {"min": a, "max": b} for a
+uniform spread:
+
+    "fleet_sim": {"battery_start_mv": {"min": 3900, "max": 4200},
+                  "temp_base_c": [20.0, 25.0, 30.0], "phase_s": {"min": 0, "max": 3600}}
+
+phase_s shifts each spacecraft along the temperature / pressure / light
+oscillations so the fleet does not move in lockstep.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+from .fsm import CubeSatFSM
+from .packet_np import TM_DTYPE, pack_many
+
+# parameter -> default when neither fleet_sim nor the top-level config sets it
+FLEET_PARAMS = {
+    "battery_start_mv": 4200,
+    "battery_drain_mv_per_sec": 0.05,
+    "temp_base_c": 25.0,
+    "pressure_base_pa": 101325,
+    "phase_s": 0.0,
+}
+CHANNELS = ("batt_mv", "temp_centideg", "press_pa", "alt_cm",
+            "gyro_x", "gyro_y", "gyro_z", "acc_x", "acc_y", "acc_z", "light")
+
+
+def fleet_params(config: dict, n: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """One float64 array of length n per FLEET_PARAMS entry."""
+    section = config.get("fleet_sim", {})
+    out = {}
+    for name, default in FLEET_PARAMS.items():
+        v = section.get(name, config.get(name, default))
+        if isinstance(v, dict):
+            out[name] = rng.uniform(v["min"], v["max"], n)
+        elif isinstance(v, (list, tuple)):
+            if len(v) != n:
+                raise ValueError(f"fleet_sim.{name}: {len(v)} values for {n} spacecraft")
+            out[name] = np.asarray(v, dtype=np.float64)
+        else:
+            out[name] = np.full(n, float(v))
+    return out
+
+
+class FleetSimulator:
+    """
+    N spacecraft sampled every `period_s` from epoch second `start`.
+    step(T) advances all of them T samples and returns the (N, T) channels
+    plus "mode" (N, T), "seq" (T,) and "timestamp_ms" (T,, full epoch ms);
+    successive calls continue where the last one stopped.
+    """
+    def __init__(self, n: int, config: dict, period_s: float = 0.5, start: float = 1_700_000_000.0,
+                 seed: Optional[int] = None, temp_high_centi: int = 4000, batt_low_mv: int = 3300):
+        self.n = int(n)
+        self.period_s = float(period_s)
+        self.rng = np.random.default_rng(config.get("sim_seed") if seed is None else seed)
+        p = self.params = fleet_params(config, self.n, self.rng)
+        self.t0 = float(start)
+        self.steps = 0                         # samples taken so far
+        self.temp_high = temp_high_centi
+        self.batt_low = batt_low_mv
+        # CubeSatFSM starts operational
+        self.mode = np.full(self.n, CubeSatFSM.MODE_OPERATIONAL, dtype=np.uint8)
+
+    def step(self, t: int) -> Dict[str, np.ndarray]:
+        n, p, rng = self.n, self.params, self.rng
+        k = self.steps + np.arange(t)
+        elapsed = k * self.period_s                       # (T,) since start
+        ts = self.t0 + elapsed
+        # sample time along each spacecraft's oscillations
+        tt = elapsed[None, :] + p["phase_s"][:, None]     # (N, T)
+
+        # battery: linear drain; the first sample has dt = 0 like SensorSimulator
+        drain = p["battery_drain_mv_per_sec"][:, None] * elapsed[None, :]
+        batt = np.clip(p["battery_start_mv"][:, None] - drain, 3000, 4200)
+
+        temp = p["temp_base_c"][:, None] + np.sin(tt / 30.0) * 1.5 + rng.normal(0, 0.2, (n, t))
+        press = p["pressure_base_pa"][:, None] + np.cos(tt / 45.0) * 5 + rng.normal(0, 1, (n, t))
+        alt_m = 44330.0 * (1.0 - (press / 101325.0) ** (1.0 / 5.255))
+        noise = rng.normal(0.0, 1.0, (6, n, t))
+        light = np.clip(512 + np.sin(tt / 10.0) * 400 + rng.normal(0, 40, (n, t)), 0, 1023)
+
+        out = {
+            "batt_mv": batt.astype(np.int64),             # int() truncation, as in SensorSimulator
+            "temp_centideg": np.trunc(temp * 100).astype(np.int64),
+            "press_pa": np.trunc(press).astype(np.int64),
+            "alt_cm": np.trunc(alt_m * 100).astype(np.int64),
+            "gyro_x": np.trunc(noise[0] * 20).astype(np.int64),
+            "gyro_y": np.trunc(noise[1] * 20).astype(np.int64),
+            "gyro_z": np.trunc(noise[2] * 20).astype(np.int64),
+            "acc_x": np.trunc(noise[3] * 50).astype(np.int64),
+            "acc_y": np.trunc(noise[4] * 50).astype(np.int64),
+            "acc_z": np.trunc(1000 + noise[5] * 50).astype(np.int64),
+            "light": light.astype(np.int64),
+        }
+        out["mode"] = self._modes(out["temp_centideg"], out["batt_mv"])
+        out["seq"] = (k & 0xFFFF).astype(np.uint16)
+        out["timestamp_ms"] = (ts * 1000).astype(np.int64)
+        self.steps += t
+        return out
+
+    def _modes(self, temp: np.ndarray, batt: np.ndarray) -> np.ndarray:
+        """CubeSatFSM.update for the whole fleet, one vector step per sample."""
+        safe, op = CubeSatFSM.MODE_SAFE, CubeSatFSM.MODE_OPERATIONAL
+        modes = np.empty(temp.shape, dtype=np.uint8)
+        mode = self.mode
+        enter = (temp > self.temp_high) | (batt < self.batt_low)
+        leave = (temp < self.temp_high - 200) & (batt > self.batt_low + 50)
+        for j in range(temp.shape[1]):
+            # safe on a limit; leave safe only with margin; otherwise operational
+            mode = np.where(enter[:, j], safe, np.where((mode == safe) & ~leave[:, j], safe, op)).astype(np.uint8)
+            modes[:, j] = mode
+        self.mode = mode
+        return modes
+
+    def frames(self, t: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        step(t) packed as telemetry frames in send order, time-major:
+        shape (T, N) of TM_DTYPE, so frames[j] is every spacecraft's
+        sample j and frames.reshape(-1) one contiguous wire buffer.
+        """
+        s = self.step(t)
+        fields = {name: s[name].T for name in CHANNELS}
+        fields["mode"] = s["mode"].T
+        fields["seq"] = np.broadcast_to(s["seq"][:, None], (t, self.n))
+        fields["timestamp_ms"] = np.broadcast_to((s["timestamp_ms"] & 0xFFFFFFFF)[:, None], (t, self.n))
+        flat = out.reshape(-1) if out is not None else np.empty(t * self.n, dtype=TM_DTYPE)
+        return pack_many(fields, flat).reshape(t, self.n)
@@ -1,5 +1,33 @@
 # sat_sim/link.py
+"""
+Downlink transports. UDPSender sends one frame per datagram; StreamSender
+writes frames back to back onto a TCP connection or a serial device, the
+way a radio modem or serial bridge delivers them (the ground splits the
+stream again with packet.Deframer).
+
+Also the kernel receive timestamp plumbing (SO_TIMESTAMPNS) shared by
+the spacecraft uplink (sat_sim.runtime) and the ground (ground.udp_rx).
+"""
+import os
 import socket
+import struct
+import sys
+import time
+from typing import Optional
+
+# not exported by every CPython build; value from <asm-generic/socket.h>
+SO_TIMESTAMPNS = getattr(socket, "SO_TIMESTAMPNS", 35 if sys.platform.startswith("linux") else None)
+TIMESPEC = struct.Struct("@ll")
+
+
+def rx_timestamp_ns(ancdata) -> Optional[int]:
+    """Kernel receive time (ns since epoch) from recvmsg ancillary data, or None."""
+    for level, ctype, data in ancdata:
+        if level == socket.SOL_SOCKET and ctype == SO_TIMESTAMPNS and len(data) >= TIMESPEC.size:
+            sec, nsec = TIMESPEC.unpack_from(data)
+            return sec * 1_000_000_000 + nsec
+    return None
+
 
 class UDPSender:
     def __init__(self, host='127.0.0.1', port=5005):
@@ -10,3 +38,96 @@ class UDPSender:
     def send(self, data: bytes):
         self.sock.sendto(data, (self.host, self.port))
 
+
+def open_serial(path: str, baud: int = 115200, nonblocking: bool = False) -> int:
+    """Open a tty raw (8N1, no echo, no line discipline) at `baud`; returns the fd."""
+    import termios
+    import tty
+    fd = os.open(path, os.O_RDWR | os.O_NOCTTY | (os.O_NONBLOCK if nonblocking else 0))
+    try:
+        tty.setraw(fd)
+        attrs = termios.tcgetattr(fd)
+        speed = getattr(termios, f"B{int(baud)}")
+        attrs[4] = attrs[5] = speed
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+    except (termios.error, AttributeError) as e:
+        os.close(fd)
+        raise OSError(f"cannot configure {path} at {baud} baud: {e}")
+    return fd
+
+
+class StreamSender:
+    """
+    Frames over a byte stream: a TCP connection to (host, port), or the
+    serial `device` if given. A broken link is reopened on a later send,
+    at most once per `retry_s`; frames sent while it is down are counted
+    in `dropped`.
+    """
+    def __init__(self, host: str = '127.0.0.1', port: int = 5005, device: Optional[str] = None,
+                 baud: int = 115200, retry_s: float = 1.0):
+        self.host = host
+        self.port = port
+        self.device = device
+        self.baud = baud
+        self.retry_s = retry_s
+        self.sock = None
+        self.fd = None
+        self.dropped = 0
+        self._last_try = float("-inf")
+
+    def _open(self) -> bool:
+        now = time.monotonic()
+        if now - self._last_try < self.retry_s:
+            return False
+        self._last_try = now
+        try:
+            if self.device:
+                self.fd = open_serial(self.device, self.baud)
+            else:
+                self.sock = socket.create_connection((self.host, self.port), timeout=2.0)
+                self.sock.settimeout(None)
+                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError as e:
+            print(f"[LINK] cannot open stream link: {e}")
+            return False
+        return True
+
+    def send(self, data: bytes):
+        if self.sock is None and self.fd is None and not self._open():
+            self.dropped += 1
+            return
+        try:
+            if self.sock is not None:
+                self.sock.sendall(data)
+            else:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(self.fd, view):]
+        except OSError as e:
+            print(f"[LINK] stream link lost: {e}")
+            self.close()
+            self.dropped += 1
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def make_sender(cfg: dict):
+    """
+    Downlink from config: link_transport "udp" (default), "tcp" (to
+    udp_host:udp_port) or "serial" (sat_serial_device at serial_baud).
+    """
+    transport = cfg.get("link_transport", "udp")
+    host, port = cfg.get("udp_host", "127.0.0.1"), int(cfg.get("udp_port", 5005))
+    if transport == "udp":
+        return UDPSender(host, port)
+    if transport == "tcp":
+        return StreamSender(host, port)
+    if transport == "serial":
+        return StreamSender(device=cfg["sat_serial_device"], baud=int(cfg.get("serial_baud", 115200)))
+    raise ValueError(f"Unknown link_transport: {transport!r}")
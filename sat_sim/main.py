@@ -1,14 +1,29 @@
 # sat_sim/main.py
+"""
+Spacecraft simulator. Live (default): samples on the wall clock, sends
+over the configured downlink and handles uplink commands, all on one
+event loop (sat_sim.runtime). Headless (--headless): the same telemetry
+on a virtual clock, reproducible from --seed, written as fast as the CPU
+allows:
+
+    python -m sat_sim.main --headless --duration 86400 --seed 1 --out day.bin
+    python -m sat_sim.main --headless --duration 86400 --format tlm --out ground/logs
+"""
+import argparse
 import random
+import signal
+import sys
 import time
 import json
 import os
-import threading
+from typing import Optional
 from .sensors import SensorSimulator
-from .packet import pack_telemetry, pack_command, unpack_frame, MSGTYPE_CMD, unpack_command
-from .link import UDPSender
+from .packet import pack_telemetry, TelemetryDeltaEncoder, TelemetryBatcher
+from .clock import VirtualClock, WallClock
+from .link import make_sender
 from .fsm import CubeSatFSM
-from .command_listener import CommandListener
+from .runtime import SatRuntime, TelemetryTask
+from .timing import StageTimer
 
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config.json')
 
@@ -16,97 +31,159 @@ def load_config():
     with open(CONFIG_PATH, 'r') as f:
         return json.load(f)
 
-def main():
-    cfg = load_config()
-    sim = SensorSimulator(cfg)
+def live(cfg: dict):
+    """
+    Real-time spacecraft: wall clock, configured downlink, uplink commands
+    on the same single-threaded loop (sat_sim.runtime.SatRuntime).
+    """
+    clock = WallClock()
+    rng = random.Random(cfg.get("sim_seed"))
+    sim = SensorSimulator(cfg, clock, rng)
     fsm = CubeSatFSM(temp_high_centi=4000, batt_low_mv=3300)
-    sender = UDPSender(cfg.get('udp_host', '127.0.0.1'), cfg.get('udp_port', 5005))
-
-    # uplink listener callback
-    def on_command(datagram, addr):
-        MIN_CMD_FRAME_SIZE = 10
-        if len(datagram) < MIN_CMD_FRAME_SIZE:
-            print(f"[UPLINK] Ignored too-short frame ({len(datagram)} bytes)")
-            return
-
-        try:
-            cmd = unpack_command(datagram)
-        except Exception as e:
-            print("Received bad uplink frame:", e)
-            return
-        ack_code, msg = fsm.apply_command( cmd["cmd_id"], cmd["param"])
-        print(f"Uplink: id={cmd['cmd_id']} param={cmd['param']} -> ack={ack_code} msg='{msg}'")
-        try:
-            # reuse unpack_frame to examine header; unpack_frame may raise on CRC fail
-            info = unpack_frame(datagram)
-        except Exception as e:
-            print("Received bad uplink frame:", e)
-            return
-        if info.get("msgtype") != MSGTYPE_CMD:
-            print("Ignoring non-command uplink frame (msgtype=%s)" % info.get("msgtype"))
-            return
-        # parse cmd_id and param from payload portion (we packed cmd_id (1B) + param (4B) after seq)
-        # compute where payload starts: preamble(2) + VERSION(1)+MSGTYPE(1)+SEQ(2) = 6 bytes after preamble => index 2+1+1+2 = 6
-        # but unpack_frame consumes and returns values; easiest is to parse raw bytes:
-        raw = datagram
-        # cmd_id at offset 2+1+1+2 = 6
-        try:
-            import struct
-            cmd_id = raw[6]
-            param = struct.unpack_from('<i', raw, 7)[0]
-        except Exception as e:
-            print("Failed to parse command payload:", e)
-            return
-        ack_code, msg = fsm.apply_command(cmd_id, param)
-        print(f"Uplink cmd received id={cmd_id} param={param} -> ack={ack_code} msg='{msg}'")
-        # optional: send an ACK back as telemetry or command response (not implemented)
-
-    # start command listener
+    sender = make_sender(cfg)   # link_transport: udp / tcp / serial
+
+    period_s = float(cfg.get('telemetry_rate_ms', 500)) / 1000.0
+    # a console line per frame only at human rates
+    telemetry = TelemetryTask(cfg, clock, sim, fsm, make_encoder(cfg), lambda frame, ts: sender.send(frame),
+                              rng, verbose=period_s >= 0.05)
     uplink_host = cfg.get('uplink_host', '127.0.0.1')
     uplink_port = int(cfg.get('uplink_port', 5006))
-    cmd_listener = CommandListener(uplink_host, uplink_port, on_command)
-    cmd_listener.start()
-    print(f"Command listener started on {uplink_host}:{uplink_port}")
-
-    seq = 0
-    rate = max(50, int(cfg.get('telemetry_rate_ms', 500)))
-    corrupt_prob = float(cfg.get("debug_corrupt_prob", 0.0))
-    print("Starting sim -> sending to {}:{}".format(cfg.get('udp_host', '127.0.0.1'), cfg.get('udp_port', 5005)))
+    runtime = SatRuntime(telemetry, period_s, uplink_host, uplink_port,
+                         spin_s=float(cfg.get("sim_spin_us", 0)) / 1e6,
+                         status_interval_s=float(cfg.get("sim_timing_interval_sec", 10)))
+    signal.signal(signal.SIGTERM, lambda signum, frame: runtime.stop())
+    print(f"Uplink on {uplink_host}:{uplink_port}")
+    print("Starting sim -> sending to {}:{} ({}) every {:g} ms".format(
+        cfg.get('udp_host', '127.0.0.1'), cfg.get('udp_port', 5005), cfg.get('link_transport', 'udp'),
+        period_s * 1000))
     try:
-        while True:
-            s = sim.step()
-            mode = fsm.update(s)
-            ts_ms = int(time.time() * 1000) & 0xFFFFFFFF
-            frame = pack_telemetry(
-                seq=seq,
-                timestamp_ms=ts_ms,
-                mode=mode,
-                batt_mv=s['batt_mv'],
-                temp_centideg=s['temp_centideg'],
-                press_pa=s['press_pa'],
-                alt_cm=s['alt_cm'],
-                gyro_xyz=s['gyro'],
-                acc_xyz=s['acc'],
-                light=s['light']
-            )
-
-            # optional corruption (debug only)
-            if corrupt_prob > 0.0 and random.random() < corrupt_prob:
-                fb = bytearray(frame)
-                if len(fb) > 8:
-                    fb[8] ^= 0xFF
-                    frame = bytes(fb)
-
-            sender.send(frame)
-            print(f"Sent seq={seq} mode={mode} batt={s['batt_mv']} temp_c={s['temp_centideg']/100:.2f}")
-            seq = (seq + 1) & 0xFFFF
-            time.sleep(rate / 1000.0)
+        runtime.run()
     except KeyboardInterrupt:
-        print("Simulator stopped")
+        pass
+    finally:
+        telemetry.finish()     # last part-filled batch, before the downlink goes
+        runtime.close()
+        if hasattr(sender, "close"):
+            sender.close()
+        cmds = runtime.on_command
+        print(f"Simulator stopped: {runtime.ticks} frames, {runtime.missed} missed deadlines, "
+              f"{cmds.applied} commands applied, {cmds.duplicates} duplicates, {cmds.bad} bad uplink frames")
+        print(f"[sim timing] {runtime.timer.status(reset_interval=False)}")
+
+
+def make_encoder(cfg: dict, full_frames: bool = False):
+    """
+    batch mode: K samples per frame (takes precedence over delta mode);
+    delta mode: keyframe every N frames, compact delta frames in between.
+    """
+    batch_k = int(cfg.get("telemetry_batch_k", 1))
+    if full_frames:
+        return pack_telemetry
+    if batch_k > 1:
+        return TelemetryBatcher(batch_k).encode
+    if cfg.get("telemetry_delta", False):
+        return TelemetryDeltaEncoder(int(cfg.get("telemetry_keyframe_interval", 20))).encode
+    return pack_telemetry
+
+
+def run_loop(cfg: dict, clock, sim, fsm, encode, emit, rng: random.Random, period_s: float,
+             samples: Optional[int] = None, verbose: bool = True) -> StageTimer:
+    """
+    The headless telemetry loop: TelemetryTask.tick() then sleep `period_s`
+    on `clock`, `samples` times (forever if None); TelemetryTask.finish()
+    on the way out. Live runs use
+    runtime.SatRuntime, which schedules ticks on absolute deadlines.
+    """
+    timer = StageTimer()
+    task = TelemetryTask(cfg, clock, sim, fsm, encode, emit, rng, timer, verbose)
+    # per-stage send-path latency (sample / pack / send), printed every timing_iv s
+    timing_iv = float(cfg.get("sim_timing_interval_sec", 10))
+    last_timing = time.monotonic()
+    n = 0
+    try:
+        while samples is None or n < samples:
+            task.tick()
+            n += 1
+            if verbose and time.monotonic() - last_timing >= timing_iv:
+                print(f"[sim timing] {timer.status()}")
+                last_timing = time.monotonic()
+            clock.sleep(period_s)
+    finally:
+        task.finish()
+    return timer
+
+
+def run_headless(cfg: dict, args) -> int:
+    """
+    Generate telemetry on a VirtualClock: as fast as the CPU allows
+    (--speed 0) or N times real time, into a frame file, a .tlm segment
+    or the configured downlink. Same --seed and --start, same bytes out.
+    """
+    clock = VirtualClock(args.start, args.speed)
+    rng = random.Random(args.seed)
+    sim = SensorSimulator(cfg, clock, rng)
+    fsm = CubeSatFSM(temp_high_centi=4000, batt_low_mv=3300)
+    period_s = (args.rate_ms or int(cfg.get('telemetry_rate_ms', 500))) / 1000.0
+    samples = args.samples if args.samples is not None else int(args.duration / period_s)
+
+    out = None
+    if args.send:
+        sender = make_sender(cfg)
+        emit = lambda frame, ts: sender.send(frame)
+        encode = make_encoder(cfg)
+    elif args.format == "tlm":
+        # ground log segment (full frames only), ground time = sample time
+        from ground.logger import BinaryLogger
+        out = BinaryLogger(args.out, flush_rows=4096)
+        emit = lambda frame, ts: out.write_frame(frame, ts)
+        encode = make_encoder(cfg, full_frames=True)
+    else:
+        # frames back to back, exactly as a stream link carries them
+        out = open(args.out, "wb", buffering=1 << 20)
+        emit = lambda frame, ts: out.write(frame)
+        encode = make_encoder(cfg)
+
+    t0 = time.perf_counter()
+    try:
+        timer = run_loop(cfg, clock, sim, fsm, encode, emit, rng, period_s, samples, verbose=False)
     finally:
-        cmd_listener.stop()
+        if out is not None:
+            out.close()
+    elapsed = time.perf_counter() - t0
+    dest = "downlink" if args.send else getattr(out, "path", args.out)
+    print(f"{samples} samples, {samples * period_s:.0f} s simulated in {elapsed:.2f} s "
+          f"(x{samples * period_s / elapsed:,.0f}) -> {dest}")
+    print(f"[sim timing] {timer.status()}")
+    return 0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="CubeSat telemetry simulator")
+    ap.add_argument("--headless", action="store_true",
+                    help="virtual clock, no uplink, no per-frame output")
+    ap.add_argument("--duration", type=float, default=3600.0, help="headless: simulated seconds")
+    ap.add_argument("--samples", type=int, default=None, help="headless: sample count (overrides --duration)")
+    ap.add_argument("--rate-ms", type=float, default=None, help="sample period (default telemetry_rate_ms)")
+    ap.add_argument("--speed", type=float, default=0.0, help="headless: N x real time, 0 = as fast as possible")
+    ap.add_argument("--seed", type=int, default=None, help="RNG seed (default sim_seed from config)")
+    ap.add_argument("--start", type=float, default=1_700_000_000.0, help="headless: epoch seconds of the first sample")
+    ap.add_argument("--out", default="sim_frames.bin", help="headless: frame file, or log dir with --format tlm")
+    ap.add_argument("--format", choices=("frames", "tlm"), default="frames")
+    ap.add_argument("--send", action="store_true", help="headless: send over the configured downlink instead")
+    args = ap.parse_args(argv)
+    cfg = load_config()
+    if args.seed is None:
+        args.seed = cfg.get("sim_seed")
+    if args.headless:
+        return run_headless(cfg, args)
+    cfg["sim_seed"] = args.seed
+    if args.rate_ms:
+        cfg["telemetry_rate_ms"] = args.rate_ms
+    live(cfg)
+    return 0
+
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
 
 
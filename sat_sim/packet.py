@@ -1,17 +1,72 @@
 # sat_sim/packet.py
 """
-Packet framing, pack/unpack helpers, CRC-16/X25 implementation and
-a simple delta+zlib compression helper.
+Packet framing, pack/unpack helpers, CRC-16/X25 implementation,
+delta-compressed telemetry frames, a simple delta+zlib compression helper
+and an incremental deframer for byte-stream links.
 """
 
+import binascii
 import struct
 import zlib
-from typing import Tuple
+from functools import lru_cache
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
 
 PREAMBLE = b'\xAA\x55'
 VERSION = 0x01
 MSGTYPE_TM = 0x01  # telemetry
 MSGTYPE_CMD = 0x02  # uplink
+MSGTYPE_TM_DELTA = 0x03  # telemetry, delta against the previous sample
+MSGTYPE_TM_BATCH = 0x04  # telemetry, K consecutive samples in one frame
+MSGTYPE_ACK = 0x05  # downlink, command acknowledgement
+
+# The spacecraft remembers the last CMD_HISTORY (source, SEQ) pairs to
+# suppress duplicates, so a ground client may keep at most that many
+# commands in flight: a retransmission then always finds its original.
+CMD_HISTORY = 1024
+
+# ---------------- Precompiled frame layouts (little-endian)
+# Telemetry: PREAMBLE VERSION MSGTYPE SEQ TIMESTAMP_MS MODE BATT_MV TEMP_CENTI
+#            PRESS_PA ALT_CM GYRO_X,Y,Z ACC_X,Y,Z LIGHT COMP_LEN | CRC16
+TM_HEAD = struct.Struct('<2sBBHIBHhIIhhhhhhHB')   # everything before the CRC
+TM_FIELDS = struct.Struct('<BBHIBHhIIhhhhhhHB')   # same, without the preamble
+CRC_STRUCT = struct.Struct('<H')
+TM_FRAME_LEN = TM_HEAD.size + CRC_STRUCT.size     # 40 bytes
+# Command: PREAMBLE VERSION MSGTYPE SEQ CMD_ID PARAM | CRC16
+CMD_HEAD = struct.Struct('<2sBBHBi')
+CMD_FIELDS = struct.Struct('<BBHBi')
+CMD_FRAME_LEN = CMD_HEAD.size + CRC_STRUCT.size   # 13 bytes
+# Command ACK: PREAMBLE VERSION MSGTYPE SEQ(of the command) CMD_ID ACK_CODE | CRC16
+ACK_HEAD = struct.Struct('<2sBBHBB')
+ACK_FIELDS = struct.Struct('<BBHBB')
+ACK_FRAME_LEN = ACK_HEAD.size + CRC_STRUCT.size   # 10 bytes
+# Delta telemetry: PREAMBLE VERSION MSGTYPE SEQ COMP_LEN PAYLOAD[COMP_LEN] | CRC16
+TM_DELTA_HEAD = struct.Struct('<2sBBHB')
+# Batch telemetry: PREAMBLE VERSION MSGTYPE SEQ(first) COUNT SAMPLE*COUNT | CRC16
+TM_BATCH_HEAD = struct.Struct('<2sBBHB')
+TM_SAMPLE = struct.Struct('<IBHhIIhhhhhhH')       # TIMESTAMP_MS .. LIGHT of one sample
+TM_BATCH_MAX = 255
+
+
+class TelemetryRecord(NamedTuple):
+    """Fixed, flat view of one telemetry frame (order matches TM_FIELDS)."""
+    version: int
+    msgtype: int
+    seq: int
+    timestamp_ms: int
+    mode: int
+    batt_mv: int
+    temp_centideg: int
+    press_pa: int
+    alt_cm: int
+    gyro_x: int
+    gyro_y: int
+    gyro_z: int
+    acc_x: int
+    acc_y: int
+    acc_z: int
+    light: int
+    comp_len: int
+
 
 def pack_command(cmd_id: int, param: int = 0, seq: int = 0) -> bytes:
     """
@@ -20,66 +75,85 @@ def pack_command(cmd_id: int, param: int = 0, seq: int = 0) -> bytes:
       + CMD_ID(1) + PARAM(4, int32 little-endian) + CRC16(2)
     CRC computed over everything AFTER preamble and BEFORE CRC.
     """
-    import struct
-    frame = bytearray()
-    frame.extend(PREAMBLE)                       # 2
-    frame.extend(struct.pack('<B', VERSION))     # 1
-    frame.extend(struct.pack('<B', MSGTYPE_CMD)) # 1
-    frame.extend(struct.pack('<H', seq & 0xFFFF))# 2
-    frame.extend(struct.pack('<B', cmd_id & 0xFF))   # 1
-    frame.extend(struct.pack('<i', int(param)))      # 4
-    crc = crc16_x25(bytes(frame[2:]))            # CRC over [VERSION..PARAM]
-    frame.extend(struct.pack('<H', crc & 0xFFFF)) # 2
-    return bytes(frame)
+    frame = CMD_HEAD.pack(PREAMBLE, VERSION, MSGTYPE_CMD, seq & 0xFFFF, cmd_id & 0xFF, int(param))
+    return frame + CRC_STRUCT.pack(crc16_x25(frame[2:]))  # CRC over [VERSION..PARAM]
 
 def unpack_command(data: bytes) -> dict:
     """
     Parse and validate a command frame. Raises ValueError on problems.
     Returns: {version, msgtype, seq, cmd_id, param}
     """
-    import struct
-    # minimal length: 2 + 1 + 1 + 2 + 1 + 4 + 2 = 13
-    if len(data) < 13:
+    if len(data) < CMD_FRAME_LEN:
         raise ValueError("Command frame too short")
     if data[0:len(PREAMBLE)] != PREAMBLE:
         raise ValueError("Bad preamble")
 
-    version = data[2]
-    msgtype = data[3]
+    version, msgtype, seq, cmd_id, param = CMD_FIELDS.unpack_from(data, 2)
     if msgtype != MSGTYPE_CMD:
         raise ValueError("Not a command frame")
 
-    seq = struct.unpack_from('<H', data, 4)[0]
-    cmd_id = data[6]
-    param = struct.unpack_from('<i', data, 7)[0]
-    rx_crc = struct.unpack_from('<H', data, 11)[0]
-    calc_crc = crc16_x25(data[2:-2])
-    if (rx_crc & 0xFFFF) != (calc_crc & 0xFFFF):
+    rx_crc = CRC_STRUCT.unpack_from(data, CMD_HEAD.size)[0]
+    calc_crc = crc16_x25(data[2:CMD_HEAD.size])
+    if rx_crc != calc_crc:
         raise ValueError("Bad command CRC")
 
     return {
-        "version": int(version),
-        "msgtype": int(msgtype),
-        "seq": int(seq),
-        "cmd_id": int(cmd_id),
-        "param": int(param),
+        "version": version,
+        "msgtype": msgtype,
+        "seq": seq,
+        "cmd_id": cmd_id,
+        "param": param,
     }
 
+def pack_ack(seq: int, cmd_id: int, ack_code: int) -> bytes:
+    """
+    Command acknowledgement: SEQ and CMD_ID echo the command,
+    ACK_CODE is CubeSatFSM.apply_command's (0 OK, 1 UNKNOWN_CMD, 2 BAD_PARAM).
+    """
+    frame = ACK_HEAD.pack(PREAMBLE, VERSION, MSGTYPE_ACK, seq & 0xFFFF, cmd_id & 0xFF, ack_code & 0xFF)
+    return frame + CRC_STRUCT.pack(crc16_x25(frame[2:]))
+
+def unpack_ack(data: bytes) -> Tuple[int, int, int]:
+    """Validate an ACK frame; returns (seq, cmd_id, ack_code). Raises ValueError on problems."""
+    if len(data) < ACK_FRAME_LEN:
+        raise ValueError("ACK frame too short")
+    if data[0:len(PREAMBLE)] != PREAMBLE:
+        raise ValueError("Bad preamble")
+    version, msgtype, seq, cmd_id, ack_code = ACK_FIELDS.unpack_from(data, 2)
+    if msgtype != MSGTYPE_ACK:
+        raise ValueError("Not an ACK frame")
+    if CRC_STRUCT.unpack_from(data, ACK_HEAD.size)[0] != crc16_x25(data[2:ACK_HEAD.size]):
+        raise ValueError("Bad ACK CRC")
+    return seq, cmd_id, ack_code
+
 # ---------------- CRC-16/X25 (LSB-first, reflected poly 0x1021 -> use 0x8408)
+# CRC-16/X25 is the bit-reflected form of CRC-16/CCITT-FALSE (poly 0x1021,
+# init 0xFFFF), which binascii.crc_hqx computes with a C table lookup. Feeding
+# crc_hqx the bit-reversed input and bit-reversing its 16-bit result gives the
+# reflected CRC without a per-bit (or even per-byte) Python loop.
+_BITREV8 = bytes(int('{:08b}'.format(i)[::-1], 2) for i in range(256))
+
 def crc16_x25(data: bytes) -> int:
     """
     Compute CRC-16/X25 (poly 0x1021, reflected, init 0xFFFF, XOROUT 0xFFFF)
     Returns integer 0..0xFFFF
     """
-    crc = 0xFFFF
-    for b in data:
-        crc ^= b
-        for _ in range(8):
-            if crc & 0x0001:
-                crc = (crc >> 1) ^ 0x8408
-            else:
-                crc >>= 1
-    return crc ^ 0xFFFF
+    crc = binascii.crc_hqx(bytes(data).translate(_BITREV8), 0xFFFF)
+    return ((_BITREV8[crc & 0xFF] << 8) | _BITREV8[crc >> 8]) ^ 0xFFFF
+
+def crc16_x25_many(buffers: Iterable[bytes]) -> List[int]:
+    """
+    Compute CRC-16/X25 for every buffer in `buffers` in one call.
+    Returns a list of CRCs in input order (same values as crc16_x25).
+    """
+    rev = _BITREV8
+    hqx = binascii.crc_hqx
+    out = []
+    append = out.append
+    for data in buffers:
+        crc = hqx(bytes(data).translate(rev), 0xFFFF)
+        append(((rev[crc & 0xFF] << 8) | rev[crc >> 8]) ^ 0xFFFF)
+    return out
 
 # ---------------- Frame packing/unpacking
 def pack_telemetry(
@@ -113,78 +187,107 @@ def pack_telemetry(
       COMP_LEN (1B)  (0 for now)
       CRC16 (2B)
     """
-    frame = bytearray()
-    frame.extend(PREAMBLE)
-    frame.extend(struct.pack('<B', VERSION))
-    frame.extend(struct.pack('<B', MSGTYPE_TM))
-    frame.extend(struct.pack('<H', seq & 0xFFFF))
-    frame.extend(struct.pack('<I', timestamp_ms & 0xFFFFFFFF))
-    frame.extend(struct.pack('<B', mode & 0xFF))
-    frame.extend(struct.pack('<H', batt_mv & 0xFFFF))
-    # temp (signed centi-degrees)
-    frame.extend(struct.pack('<h', int(temp_centideg)))
-    frame.extend(struct.pack('<I', int(press_pa) & 0xFFFFFFFF))
-    frame.extend(struct.pack('<I', int(alt_cm) & 0xFFFFFFFF))
-    frame.extend(struct.pack('<hhh', *gyro_xyz))
-    frame.extend(struct.pack('<hhh', *acc_xyz))
-    frame.extend(struct.pack('<H', int(light) & 0xFFFF))
-    frame.extend(struct.pack('<B', 0))  # comp_len = 0 (no extra payload yet)
-
+    frame = TM_HEAD.pack(
+        PREAMBLE, VERSION, MSGTYPE_TM,
+        seq & 0xFFFF,
+        timestamp_ms & 0xFFFFFFFF,
+        mode & 0xFF,
+        batt_mv & 0xFFFF,
+        int(temp_centideg),
+        int(press_pa) & 0xFFFFFFFF,
+        int(alt_cm) & 0xFFFFFFFF,
+        gyro_xyz[0], gyro_xyz[1], gyro_xyz[2],
+        acc_xyz[0], acc_xyz[1], acc_xyz[2],
+        int(light) & 0xFFFF,
+        0,  # comp_len = 0 (no extra payload yet)
+    )
     # CRC over bytes AFTER preamble (i.e., from VERSION ... COMP_LEN)
-    crc = crc16_x25(bytes(frame[2:]))
-    frame.extend(struct.pack('<H', crc & 0xFFFF))
-    return bytes(frame)
+    return frame + CRC_STRUCT.pack(crc16_x25(frame[2:]))
 
 
-def unpack_frame(frame: bytes) -> dict:
+def pack_telemetry_into(
+    buf,
+    offset: int,
+    seq: int,
+    timestamp_ms: int,
+    mode: int,
+    batt_mv: int,
+    temp_centideg: int,
+    press_pa: int,
+    alt_cm: int,
+    gyro_xyz: Tuple[int, int, int],
+    acc_xyz: Tuple[int, int, int],
+    light: int
+) -> int:
     """
-    Parse a frame and verify CRC. Returns dict of fields.
+    Same frame as pack_telemetry, written into a caller-supplied writable
+    buffer (bytearray / memoryview) at `offset`. Returns the offset just past
+    the frame so callers can fill a preallocated buffer back to back.
+    """
+    TM_HEAD.pack_into(
+        buf, offset,
+        PREAMBLE, VERSION, MSGTYPE_TM,
+        seq & 0xFFFF,
+        timestamp_ms & 0xFFFFFFFF,
+        mode & 0xFF,
+        batt_mv & 0xFFFF,
+        int(temp_centideg),
+        int(press_pa) & 0xFFFFFFFF,
+        int(alt_cm) & 0xFFFFFFFF,
+        gyro_xyz[0], gyro_xyz[1], gyro_xyz[2],
+        acc_xyz[0], acc_xyz[1], acc_xyz[2],
+        int(light) & 0xFFFF,
+        0,
+    )
+    end = offset + TM_HEAD.size
+    CRC_STRUCT.pack_into(buf, end, crc16_x25(bytes(buf[offset + 2:end])))
+    return end + CRC_STRUCT.size
+
+
+def unpack_telemetry(frame: bytes) -> TelemetryRecord:
+    """
+    Parse a telemetry frame and verify CRC. Returns a TelemetryRecord.
     Raises ValueError if preamble/CRC fail or frame too short.
     """
-    min_len = 2 + 1 + 1 + 2 + 4 + 1 + 2 + 2 + 4 + 4 + 6 + 6 + 2 + 1 + 2
-    if len(frame) < min_len:
+    if len(frame) < TM_FRAME_LEN:
         raise ValueError("Frame too short")
 
     if frame[0:2] != PREAMBLE:
         raise ValueError("Bad preamble")
 
+    if frame[3] != MSGTYPE_TM:
+        raise ValueError(f"Not a telemetry frame (msgtype={frame[3]})")
+
     # CRC is last 2 bytes
-    expected_crc = struct.unpack_from('<H', frame, len(frame) - 2)[0]
+    expected_crc = CRC_STRUCT.unpack_from(frame, len(frame) - 2)[0]
     computed_crc = crc16_x25(frame[2:-2])
     if expected_crc != computed_crc:
         raise ValueError(f"CRC mismatch: expected {hex(expected_crc)} vs computed {hex(computed_crc)}")
 
-    idx = 2
-    version = frame[idx]; idx += 1
-    msgtype = frame[idx]; idx += 1
-    seq = struct.unpack_from('<H', frame, idx)[0]; idx += 2
-    timestamp_ms = struct.unpack_from('<I', frame, idx)[0]; idx += 4
-    mode = frame[idx]; idx += 1
-    batt_mv = struct.unpack_from('<H', frame, idx)[0]; idx += 2
-    temp_centideg = struct.unpack_from('<h', frame, idx)[0]; idx += 2
-    press_pa = struct.unpack_from('<I', frame, idx)[0]; idx += 4
-    alt_cm = struct.unpack_from('<I', frame, idx)[0]; idx += 4
-    gyro_x, gyro_y, gyro_z = struct.unpack_from('<hhh', frame, idx); idx += 6
-    acc_x, acc_y, acc_z = struct.unpack_from('<hhh', frame, idx); idx += 6
-    light = struct.unpack_from('<H', frame, idx)[0]; idx += 2
-    comp_len = frame[idx]; idx += 1
-
-    # CRC taken from frame tail already validated
+    return TelemetryRecord._make(TM_FIELDS.unpack_from(frame, 2))
 
+
+def unpack_frame(frame: bytes) -> dict:
+    """
+    Parse a frame and verify CRC. Returns dict of fields.
+    Raises ValueError if preamble/CRC fail or frame too short.
+    Prefer unpack_telemetry on hot paths; this keeps the nested dict shape.
+    """
+    r = unpack_telemetry(frame)
     return {
-        "version": version,
-        "msgtype": msgtype,
-        "seq": seq,
-        "timestamp_ms": timestamp_ms,
-        "mode": mode,
-        "batt_mv": batt_mv,
-        "temp_centideg": temp_centideg,
-        "press_pa": press_pa,
-        "alt_cm": alt_cm,
-        "gyro": (gyro_x, gyro_y, gyro_z),
-        "acc": (acc_x, acc_y, acc_z),
-        "light": light,
-        "comp_len": comp_len,
+        "version": r.version,
+        "msgtype": r.msgtype,
+        "seq": r.seq,
+        "timestamp_ms": r.timestamp_ms,
+        "mode": r.mode,
+        "batt_mv": r.batt_mv,
+        "temp_centideg": r.temp_centideg,
+        "press_pa": r.press_pa,
+        "alt_cm": r.alt_cm,
+        "gyro": (r.gyro_x, r.gyro_y, r.gyro_z),
+        "acc": (r.acc_x, r.acc_y, r.acc_z),
+        "light": r.light,
+        "comp_len": r.comp_len,
         "raw_frame_len": len(frame)
     }
 
@@ -204,3 +307,394 @@ def delta_pack_and_compress(prev_vals: list, cur_vals: list) -> Tuple[bytes, boo
     else:
         return packed, False
 
+
+# ---------------- delta-compressed telemetry (MSGTYPE_TM_DELTA)
+# A delta frame carries, for every sensor field, the difference to the same
+# field of the previous sample (seq - 1), wrapped to the field's bit width,
+# zigzag-mapped and written as a LEB128 varint. Slowly varying channels then
+# cost one byte each. Senders interleave full MSGTYPE_TM keyframes so a
+# receiver that lost a frame can resync.
+# (field, bit width, signed) in payload order
+DELTA_FIELDS = (
+    ("timestamp_ms", 32, False),
+    ("mode", 8, False),
+    ("batt_mv", 16, False),
+    ("temp_centideg", 16, True),
+    ("press_pa", 32, False),
+    ("alt_cm", 32, False),
+    ("gyro_x", 16, True),
+    ("gyro_y", 16, True),
+    ("gyro_z", 16, True),
+    ("acc_x", 16, True),
+    ("acc_y", 16, True),
+    ("acc_z", 16, True),
+    ("light", 16, False),
+)
+_DELTA_IDX = tuple(TelemetryRecord._fields.index(name) for name, _, _ in DELTA_FIELDS)
+
+def _wrap_delta(cur: int, prev: int, bits: int) -> int:
+    """cur - prev as the shortest signed value modulo 2**bits."""
+    half = 1 << (bits - 1)
+    return ((cur - prev + half) & ((1 << bits) - 1)) - half
+
+def _apply_delta(prev: int, delta: int, bits: int, signed: bool) -> int:
+    v = (prev + delta) & ((1 << bits) - 1)
+    if signed and v >= 1 << (bits - 1):
+        v -= 1 << bits
+    return v
+
+def encode_varints(values: Iterable[int]) -> bytes:
+    """Zigzag + LEB128 encode signed ints."""
+    out = bytearray()
+    for v in values:
+        z = (v << 1) ^ (v >> 63)  # zigzag: 0,-1,1,-2.. -> 0,1,2,3..
+        while z > 0x7F:
+            out.append((z & 0x7F) | 0x80)
+            z >>= 7
+        out.append(z)
+    return bytes(out)
+
+def decode_varints(data, count: int, offset: int = 0) -> Tuple[List[int], int]:
+    """Inverse of encode_varints; returns (values, offset past the last byte)."""
+    values = []
+    n = len(data)
+    for _ in range(count):
+        z = shift = 0
+        while True:
+            if offset >= n:
+                raise ValueError("Truncated varint")
+            b = data[offset]
+            offset += 1
+            z |= (b & 0x7F) << shift
+            if not b & 0x80:
+                break
+            shift += 7
+        values.append((z >> 1) ^ -(z & 1))
+    return values, offset
+
+def pack_telemetry_delta(seq: int, prev: TelemetryRecord, cur: TelemetryRecord) -> bytes:
+    """Delta frame taking the receiver from `prev` (seq - 1) to `cur`."""
+    payload = encode_varints(
+        _wrap_delta(cur[i], prev[i], bits) for i, (_, bits, _) in zip(_DELTA_IDX, DELTA_FIELDS))
+    frame = TM_DELTA_HEAD.pack(PREAMBLE, VERSION, MSGTYPE_TM_DELTA, seq & 0xFFFF, len(payload)) + payload
+    return frame + CRC_STRUCT.pack(crc16_x25(frame[2:]))
+
+def unpack_telemetry_delta(frame: bytes) -> Tuple[int, List[int]]:
+    """
+    Validate a delta frame and return (seq, deltas) with deltas in
+    DELTA_FIELDS order. Raises ValueError on bad preamble/type/length/CRC.
+    """
+    head = TM_DELTA_HEAD.size
+    if len(frame) < head + CRC_STRUCT.size:
+        raise ValueError("Frame too short")
+    if frame[0:2] != PREAMBLE:
+        raise ValueError("Bad preamble")
+    _, _version, msgtype, seq, comp_len = TM_DELTA_HEAD.unpack_from(frame, 0)
+    if msgtype != MSGTYPE_TM_DELTA:
+        raise ValueError(f"Not a delta telemetry frame (msgtype={msgtype})")
+    end = head + comp_len
+    if len(frame) != end + CRC_STRUCT.size:
+        raise ValueError("Delta frame length does not match COMP_LEN")
+    expected_crc = CRC_STRUCT.unpack_from(frame, end)[0]
+    computed_crc = crc16_x25(frame[2:end])
+    if expected_crc != computed_crc:
+        raise ValueError(f"CRC mismatch: expected {hex(expected_crc)} vs computed {hex(computed_crc)}")
+    deltas, off = decode_varints(frame, len(DELTA_FIELDS), head)
+    if off != end:
+        raise ValueError("Delta payload length mismatch")
+    return seq, deltas
+
+def record_from_values(seq: int, timestamp_ms: int, mode: int, batt_mv: int, temp_centideg: int,
+                       press_pa: int, alt_cm: int, gyro_xyz: Tuple[int, int, int],
+                       acc_xyz: Tuple[int, int, int], light: int) -> TelemetryRecord:
+    """TelemetryRecord with the same wrapping pack_telemetry applies on the wire."""
+    return TelemetryRecord(
+        VERSION, MSGTYPE_TM, seq & 0xFFFF, timestamp_ms & 0xFFFFFFFF, mode & 0xFF,
+        batt_mv & 0xFFFF, int(temp_centideg), int(press_pa) & 0xFFFFFFFF, int(alt_cm) & 0xFFFFFFFF,
+        gyro_xyz[0], gyro_xyz[1], gyro_xyz[2], acc_xyz[0], acc_xyz[1], acc_xyz[2],
+        int(light) & 0xFFFF, 0)
+
+def pack_record(r: TelemetryRecord) -> bytes:
+    """Full MSGTYPE_TM frame for a record."""
+    return pack_telemetry(r.seq, r.timestamp_ms, r.mode, r.batt_mv, r.temp_centideg, r.press_pa,
+                          r.alt_cm, (r.gyro_x, r.gyro_y, r.gyro_z), (r.acc_x, r.acc_y, r.acc_z), r.light)
+
+
+class TelemetryDeltaEncoder:
+    """
+    Sender side: emits a full keyframe every `keyframe_interval` frames (and
+    whenever seq does not follow the previous frame), delta frames otherwise.
+    Takes the same keyword arguments as pack_telemetry.
+    """
+    def __init__(self, keyframe_interval: int = 20):
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self._prev: Optional[TelemetryRecord] = None
+        self._since_key = 0
+
+    def encode(self, **fields) -> bytes:
+        cur = record_from_values(**fields)
+        prev = self._prev
+        self._prev = cur
+        if prev is None or cur.seq != (prev.seq + 1) & 0xFFFF or self._since_key + 1 >= self.keyframe_interval:
+            self._since_key = 0
+            return pack_record(cur)
+        self._since_key += 1
+        return pack_telemetry_delta(cur.seq, prev, cur)
+
+
+class TelemetryDeltaDecoder:
+    """
+    Receiver side for one stream. feed() accepts keyframes and delta frames
+    and returns the reconstructed TelemetryRecord, or None for a delta that
+    cannot be applied because the previous sample was lost (the stream then
+    waits for the next keyframe). Counts bytes in / samples out.
+    """
+    def __init__(self):
+        self._prev: Optional[TelemetryRecord] = None
+        self.bytes_in = 0
+        self.samples = 0
+        self.keyframes = 0
+        self.unsynced = 0
+
+    def feed(self, frame: bytes) -> Optional[TelemetryRecord]:
+        """Raises ValueError for frames that fail validation."""
+        if len(frame) > 3 and frame[3] == MSGTYPE_TM_DELTA:
+            seq, deltas = unpack_telemetry_delta(frame)
+            rec = self.apply(seq, deltas)
+        else:
+            rec = self.keyframe(unpack_telemetry(frame))
+        self.bytes_in += len(frame)
+        return rec
+
+    def keyframe(self, rec: TelemetryRecord) -> TelemetryRecord:
+        self._prev = rec
+        self.keyframes += 1
+        self.samples += 1
+        return rec
+
+    def apply(self, seq: int, deltas: List[int]) -> Optional[TelemetryRecord]:
+        prev = self._prev
+        if prev is None or seq != (prev.seq + 1) & 0xFFFF:
+            self._prev = None  # out of sync until the next keyframe
+            self.unsynced += 1
+            return None
+        vals = list(prev)
+        vals[2] = seq
+        for i, (_, bits, signed), d in zip(_DELTA_IDX, DELTA_FIELDS, deltas):
+            vals[i] = _apply_delta(prev[i], d, bits, signed)
+        rec = self._prev = TelemetryRecord._make(vals)
+        self.samples += 1
+        return rec
+
+    @property
+    def bytes_per_sample(self) -> float:
+        return self.bytes_in / self.samples if self.samples else 0.0
+
+
+# ---------------- batched telemetry (MSGTYPE_TM_BATCH)
+# COUNT consecutive samples (SEQ, SEQ+1, ...) share one header and one CRC,
+# so a sender at a high sample rate pays for one datagram per COUNT samples.
+_SAMPLE_SLICE = slice(3, 16)   # TelemetryRecord timestamp_ms .. light, as in TM_SAMPLE
+_SAMPLE_FIELDS = _SAMPLE_SLICE.stop - _SAMPLE_SLICE.start
+
+@lru_cache(maxsize=16)
+def _batch_struct(count: int) -> struct.Struct:
+    return struct.Struct('<' + TM_SAMPLE.format[1:] * count)
+
+def pack_telemetry_batch(records: Sequence[TelemetryRecord]) -> bytes:
+    """
+    One batch frame for 1..TM_BATCH_MAX records with consecutive seq
+    (taken from the first record).
+    """
+    count = len(records)
+    if not 0 < count <= TM_BATCH_MAX:
+        raise ValueError(f"Batch must hold 1..{TM_BATCH_MAX} samples, got {count}")
+    vals = []
+    for r in records:
+        vals.extend(r[_SAMPLE_SLICE])
+    frame = TM_BATCH_HEAD.pack(PREAMBLE, VERSION, MSGTYPE_TM_BATCH, records[0].seq & 0xFFFF, count) \
+        + _batch_struct(count).pack(*vals)
+    return frame + CRC_STRUCT.pack(crc16_x25(frame[2:]))
+
+def unpack_telemetry_batch(frame: bytes) -> List[TelemetryRecord]:
+    """
+    Validate a batch frame and unroll it into one TelemetryRecord per sample
+    (msgtype MSGTYPE_TM, seq counting up from the frame's SEQ).
+    Raises ValueError on bad preamble/type/length/CRC.
+    """
+    head = TM_BATCH_HEAD.size
+    if len(frame) < head + CRC_STRUCT.size:
+        raise ValueError("Frame too short")
+    if frame[0:2] != PREAMBLE:
+        raise ValueError("Bad preamble")
+    _, version, msgtype, seq, count = TM_BATCH_HEAD.unpack_from(frame, 0)
+    if msgtype != MSGTYPE_TM_BATCH:
+        raise ValueError(f"Not a batch telemetry frame (msgtype={msgtype})")
+    end = head + count * TM_SAMPLE.size
+    if count == 0 or len(frame) != end + CRC_STRUCT.size:
+        raise ValueError("Batch frame length does not match COUNT")
+    expected_crc = CRC_STRUCT.unpack_from(frame, end)[0]
+    computed_crc = crc16_x25(frame[2:end])
+    if expected_crc != computed_crc:
+        raise ValueError(f"CRC mismatch: expected {hex(expected_crc)} vs computed {hex(computed_crc)}")
+    vals = _batch_struct(count).unpack_from(frame, head)
+    n = _SAMPLE_FIELDS
+    return [
+        TelemetryRecord(version, MSGTYPE_TM, (seq + i) & 0xFFFF, *vals[i * n:(i + 1) * n], 0)
+        for i in range(count)
+    ]
+
+
+class TelemetryBatcher:
+    """
+    Sender side: collects samples (same keyword arguments as pack_telemetry)
+    and returns one batch frame per `k` samples, None in between. A seq that
+    does not follow on from the pending samples closes the batch early; the
+    out-of-order sample then starts the next one.
+    """
+    def __init__(self, k: int):
+        self.k = max(1, min(TM_BATCH_MAX, int(k)))
+        self._pending: List[TelemetryRecord] = []
+
+    def encode(self, **fields) -> Optional[bytes]:
+        rec = record_from_values(**fields)
+        if self.k == 1:
+            # every sample is its own batch: nothing is ever held back
+            return pack_telemetry_batch([rec])
+        pending = self._pending
+        if pending and rec.seq != (pending[-1].seq + 1) & 0xFFFF:
+            # close the batch early; rec alone cannot fill the next one (k > 1)
+            out = self.flush()
+            self._pending.append(rec)
+            return out
+        pending.append(rec)
+        return self.flush() if len(pending) >= self.k else None
+
+    def flush(self) -> Optional[bytes]:
+        """Frame for whatever is pending (None if nothing)."""
+        if not self._pending:
+            return None
+        frame = pack_telemetry_batch(self._pending)
+        self._pending = []
+        return frame
+
+
+# ---------------- byte-stream framing (TCP, serial)
+# Every frame type carries its length in its first STREAM_HEAD_LEN bytes:
+# fixed for telemetry/command frames, COMP_LEN / COUNT at offset 6 for
+# delta/batch frames. A stream is therefore cut into frames by finding
+# PREAMBLE, reading the header and checking the CRC; anything that fails
+# (garbage, a preamble-looking pair inside a payload, a corrupted frame)
+# moves the search on by one byte.
+STREAM_HEAD_LEN = TM_DELTA_HEAD.size               # 7 bytes
+STREAM_MAX_FRAME = TM_BATCH_HEAD.size + TM_BATCH_MAX * TM_SAMPLE.size + CRC_STRUCT.size
+
+def frame_length(buf, offset: int = 0) -> Optional[int]:
+    """
+    Total length of the frame whose preamble is at `offset` (needs
+    STREAM_HEAD_LEN bytes), or None for an unknown version/type.
+    """
+    if buf[offset + 2] != VERSION:
+        return None
+    msgtype = buf[offset + 3]
+    if msgtype == MSGTYPE_TM:
+        return TM_FRAME_LEN
+    if msgtype == MSGTYPE_TM_DELTA:
+        return TM_DELTA_HEAD.size + buf[offset + 6] + CRC_STRUCT.size
+    if msgtype == MSGTYPE_TM_BATCH:
+        count = buf[offset + 6]
+        return TM_BATCH_HEAD.size + count * TM_SAMPLE.size + CRC_STRUCT.size if count else None
+    if msgtype == MSGTYPE_CMD:
+        return CMD_FRAME_LEN
+    if msgtype == MSGTYPE_ACK:
+        return ACK_FRAME_LEN
+    return None
+
+
+class Deframer:
+    """
+    Incremental frame splitter for a byte stream.
+
+    Bytes go into one preallocated buffer, either copied in by feed(data)
+    or read straight into writable() and then commit(n)-ed (recv_into /
+    readv); frames() yields every complete, CRC-valid frame as a
+    memoryview into that buffer. Views stay valid until the next
+    writable()/feed(), which may move unconsumed bytes to the front.
+    """
+    def __init__(self, capacity: int = 65536):
+        if capacity < 2 * STREAM_MAX_FRAME:
+            raise ValueError(f"capacity must be at least {2 * STREAM_MAX_FRAME} bytes")
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._head = 0     # first byte not consumed yet
+        self._tail = 0     # end of received bytes
+        self.bytes_in = 0
+        self.frames_out = 0
+        self.skipped = 0      # bytes discarded while resyncing
+        self.crc_errors = 0   # preamble + plausible header, bad CRC
+
+    def writable(self) -> memoryview:
+        """Free space after the pending bytes (compacting first when needed)."""
+        head, tail = self._head, self._tail
+        if head == tail:
+            self._head = self._tail = 0
+        elif len(self._buf) - tail < STREAM_MAX_FRAME:
+            n = tail - head
+            self._buf[:n] = self._buf[head:tail]
+            self._head, self._tail = 0, n
+        return self._view[self._tail:]
+
+    def commit(self, n: int):
+        """`n` bytes were written at the start of writable()."""
+        self._tail += n
+        self.bytes_in += n
+
+    def feed(self, data) -> Iterator[memoryview]:
+        """Copy `data` in and yield the frames it completes."""
+        data = memoryview(data)
+        pos = 0
+        while pos < len(data):
+            w = self.writable()
+            n = min(len(w), len(data) - pos)
+            w[:n] = data[pos:pos + n]
+            self.commit(n)
+            pos += n
+            yield from self.frames()
+
+    def frames(self) -> Iterator[memoryview]:
+        buf, view = self._buf, self._view
+        head, tail = self._head, self._tail
+        while True:
+            i = buf.find(PREAMBLE, head, tail)
+            if i < 0:
+                # a trailing 0xAA may be the first half of a preamble
+                keep = 1 if tail > head and buf[tail - 1] == PREAMBLE[0] else 0
+                self.skipped += tail - keep - head
+                head = tail - keep
+                break
+            self.skipped += i - head
+            head = i
+            if tail - i < STREAM_HEAD_LEN:
+                break
+            n = frame_length(buf, i)
+            if n is None:
+                self.skipped += 1
+                head = i + 1
+                continue
+            if tail - i < n:
+                break
+            if CRC_STRUCT.unpack_from(buf, i + n - 2)[0] != crc16_x25(view[i + 2:i + n - 2]):
+                self.crc_errors += 1
+                self.skipped += 1
+                head = i + 1
+                continue
+            head = i + n
+            self._head = head
+            self.frames_out += 1
+            yield view[i:head]
+        self._head = head
+
+    @property
+    def pending(self) -> int:
+        """Bytes received but not yet part of a frame."""
+        return self._tail - self._head
@@ -0,0 +1,85 @@
+# sat_sim/packet_np.py
+"""
+NumPy view of the telemetry frame layout (requires NumPy): the frame
+dtype, CRC-16/X25 across many frames at once and pack_many, which builds
+a contiguous buffer of N telemetry frames from field arrays in one pass.
+ground.bulk decodes with the same dtype.
+"""
+from typing import Mapping
+
+import numpy as np
+
+from .packet import PREAMBLE, VERSION, MSGTYPE_TM, TM_FRAME_LEN
+
+# Field order and widths match TM_HEAD / TelemetryRecord plus the trailing CRC.
+TM_DTYPE = np.dtype([
+    ("preamble", "<u2"),
+    ("version", "u1"),
+    ("msgtype", "u1"),
+    ("seq", "<u2"),
+    ("timestamp_ms", "<u4"),
+    ("mode", "u1"),
+    ("batt_mv", "<u2"),
+    ("temp_centideg", "<i2"),
+    ("press_pa", "<u4"),
+    ("alt_cm", "<u4"),
+    ("gyro_x", "<i2"),
+    ("gyro_y", "<i2"),
+    ("gyro_z", "<i2"),
+    ("acc_x", "<i2"),
+    ("acc_y", "<i2"),
+    ("acc_z", "<i2"),
+    ("light", "<u2"),
+    ("comp_len", "u1"),
+    ("crc", "<u2"),
+])
+assert TM_DTYPE.itemsize == TM_FRAME_LEN
+
+PREAMBLE_U16 = int.from_bytes(PREAMBLE, "little")
+# fields pack_many takes from the caller, with the wire mask pack_telemetry applies
+PACK_FIELDS = ("seq", "timestamp_ms", "mode", "batt_mv", "temp_centideg", "press_pa", "alt_cm",
+               "gyro_x", "gyro_y", "gyro_z", "acc_x", "acc_y", "acc_z", "light")
+
+def _crc16_x25_table() -> np.ndarray:
+    table = np.zeros(256, dtype=np.uint16)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x8408 if crc & 1 else crc >> 1
+        table[i] = crc
+    return table
+
+_CRC_TABLE = _crc16_x25_table()
+
+def crc16_x25_rows(rows: np.ndarray) -> np.ndarray:
+    """
+    CRC-16/X25 of every row of a 2-D uint8 array, one table step per column
+    (vectorized across rows). Returns a uint16 array of len(rows).
+    """
+    crc = np.full(rows.shape[0], 0xFFFF, dtype=np.uint16)
+    table = _CRC_TABLE
+    for j in range(rows.shape[1]):
+        crc = (crc >> 8) ^ table[(crc ^ rows[:, j]) & 0xFF]
+    return crc ^ np.uint16(0xFFFF)
+
+def pack_many(fields: Mapping[str, np.ndarray], out: np.ndarray = None) -> np.ndarray:
+    """
+    N telemetry frames, byte-identical to pack_telemetry, as a TM_DTYPE
+    array (frames.tobytes() / memoryview(frames) is the contiguous wire
+    buffer). `fields` maps every PACK_FIELDS name to an array (or scalar)
+    broadcastable to N; values wrap to the field width like
+    pack_telemetry's masks. `out` reuses a TM_DTYPE array of the right size.
+    """
+    n = max(np.size(fields[k]) for k in PACK_FIELDS)
+    frames = out if out is not None else np.empty(n, dtype=TM_DTYPE)
+    frames["preamble"] = PREAMBLE_U16
+    frames["version"] = VERSION
+    frames["msgtype"] = MSGTYPE_TM
+    frames["comp_len"] = 0
+    for name in PACK_FIELDS:
+        v = np.asarray(fields[name]).reshape(-1) if np.ndim(fields[name]) else fields[name]
+        # through int64 so negative values wrap into unsigned fields
+        frames[name] = np.asarray(v, dtype=np.int64).astype(TM_DTYPE[name])
+    raw = frames.view(np.uint8).reshape(n, TM_FRAME_LEN)
+    frames["crc"] = crc16_x25_rows(raw[:, 2:TM_FRAME_LEN - 2])
+    return frames
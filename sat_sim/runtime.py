@@ -0,0 +1,271 @@
+# sat_sim/runtime.py
+"""
+Single-threaded spacecraft runtime: telemetry and uplink on one selector
+loop, so the FSM is only ever touched from one thread.
+
+Telemetry runs on an absolute deadline grid (start + k * period on the
+monotonic clock), never "sleep one period after the last frame", so
+per-frame overhead does not accumulate into drift. Between deadlines the
+loop blocks in select() on the uplink socket, so a command is handled as
+soon as it arrives instead of after the current sleep. select.select is
+used rather than epoll because it takes microsecond timeouts (epoll
+rounds up to whole milliseconds, too coarse for kHz rates); with two
+file descriptors its O(n) scan costs nothing.
+
+Timing lands in the runtime's StageTimer: "jitter" (how late each tick
+fired after its deadline), "cmd" (datagram arrival, kernel timestamp where
+available, to command applied and ACK sent) next to the telemetry stages.
+"""
+import random
+import selectors
+import socket
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from .link import SO_TIMESTAMPNS, TIMESPEC, rx_timestamp_ns
+from .packet import CMD_HISTORY, TelemetryBatcher, pack_ack, unpack_command
+from .timing import StageTimer
+
+
+class TelemetryTask:
+    """
+    One telemetry sample per tick(): sensors, FSM update, pack,
+    emit(frame, ts_ms). ts_ms is the sample time in full epoch ms from
+    `clock`; the frame carries it mod 2**32. Stage times go to `timer`.
+    """
+    def __init__(self, cfg: dict, clock, sim, fsm, encode, emit, rng: random.Random,
+                 timer: Optional[StageTimer] = None, verbose: bool = True):
+        self.clock = clock
+        self.sim = sim
+        self.fsm = fsm
+        self.encode = encode
+        self.emit = emit
+        self.rng = rng
+        self.timer = timer or StageTimer()
+        self.verbose = verbose
+        self.corrupt_prob = float(cfg.get("debug_corrupt_prob", 0.0))
+        self.seq = 0
+
+    def tick(self):
+        timer = self.timer
+        t0 = time.perf_counter_ns()
+        s = self.sim.step()
+        mode = self.fsm.update(s)
+        now_ms = int(self.clock.time() * 1000)
+        t1 = time.perf_counter_ns()
+        frame = self.encode(
+            seq=self.seq,
+            timestamp_ms=now_ms & 0xFFFFFFFF,
+            mode=mode,
+            batt_mv=s['batt_mv'],
+            temp_centideg=s['temp_centideg'],
+            press_pa=s['press_pa'],
+            alt_cm=s['alt_cm'],
+            gyro_xyz=s['gyro'],
+            acc_xyz=s['acc'],
+            light=s['light']
+        )
+        t2 = time.perf_counter_ns()
+        timer.record("sample", t1 - t0)
+        timer.record("pack", t2 - t1)
+        if frame is not None:   # None: batch still filling up
+            # optional corruption (debug only)
+            if self.corrupt_prob > 0.0 and self.rng.random() < self.corrupt_prob:
+                fb = bytearray(frame)
+                if len(fb) > 8:
+                    fb[8] ^= 0xFF
+                    frame = bytes(fb)
+
+            t3 = time.perf_counter_ns()
+            self.emit(frame, now_ms)
+            timer.record("send", time.perf_counter_ns() - t3)
+            if self.verbose:
+                print(f"Sent seq={self.seq} mode={mode} batt={s['batt_mv']} temp_c={s['temp_centideg']/100:.2f}")
+        self.seq = (self.seq + 1) & 0xFFFF
+
+    def finish(self):
+        """
+        Emit what the encoder still holds (a part-filled TelemetryBatcher
+        batch), stamped now. Call once when telemetry stops, before the
+        downlink is closed.
+        """
+        batcher = getattr(self.encode, "__self__", None)
+        if isinstance(batcher, TelemetryBatcher):
+            frame = batcher.flush()
+            if frame:
+                self.emit(frame, int(self.clock.time() * 1000))
+
+
+class CommandHandler:
+    """
+    Uplink frame -> CubeSatFSM.apply_command -> ACK frame via reply(frame, addr).
+
+    The last `history` (source, seq) pairs are remembered with their
+    ack_code: a retransmitted command (same source and seq, e.g. its ACK
+    was lost) is acknowledged again with the original code but not
+    applied twice. CommandClient caps its window at CMD_HISTORY to match.
+    """
+    def __init__(self, fsm, reply: Optional[Callable] = None, history: int = CMD_HISTORY,
+                 verbose: bool = True):
+        self.fsm = fsm
+        self.reply = reply
+        self.history = history
+        self.verbose = verbose
+        self._seen: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.applied = 0
+        self.duplicates = 0
+        self.bad = 0
+
+    def __call__(self, datagram: bytes, addr) -> Optional[int]:
+        """Returns the ack_code, or None for an invalid frame (no ACK)."""
+        try:
+            cmd = unpack_command(datagram)
+        except ValueError as e:
+            self.bad += 1
+            if self.verbose:
+                print(f"[UPLINK] Bad frame ({len(datagram)} bytes): {e}")
+            return None
+        key = (addr, cmd["seq"])
+        prev = self._seen.get(key)
+        if prev is not None and prev[0] == cmd["cmd_id"]:
+            self.duplicates += 1
+            ack_code = prev[1]
+        else:
+            ack_code, msg = self.fsm.apply_command(cmd["cmd_id"], cmd["param"])
+            self.applied += 1
+            self._seen[key] = (cmd["cmd_id"], ack_code)
+            self._seen.move_to_end(key)
+            if len(self._seen) > self.history:
+                self._seen.popitem(last=False)
+            if self.verbose:
+                print(f"[UPLINK] seq={cmd['seq']} id={cmd['cmd_id']} param={cmd['param']} "
+                      f"-> ack={ack_code} msg='{msg}'")
+        if self.reply is not None:
+            try:
+                self.reply(pack_ack(cmd["seq"], cmd["cmd_id"], ack_code), addr)
+            except OSError:
+                pass    # the ground retransmits; the duplicate gets this ACK again
+        return ack_code
+
+
+class SatRuntime:
+    """
+    Runs `telemetry.tick()` every `period_s` and answers uplink datagrams
+    on (host, port) in between. `on_command(datagram, addr)` handles each
+    uplink frame (default: a CommandHandler on the telemetry FSM that
+    sends its ACKs back to the command's source address).
+    `spin_s` > 0 busy-polls the last stretch before each deadline for
+    lower jitter at the cost of CPU. stop() is safe from signal handlers
+    and other threads and wakes the loop at once.
+    """
+    def __init__(self, telemetry: TelemetryTask, period_s: float, host: str = "127.0.0.1",
+                 port: Optional[int] = 5006, on_command: Optional[Callable] = None,
+                 spin_s: float = 0.0, status_interval_s: float = 10.0):
+        self.telemetry = telemetry
+        self.timer = telemetry.timer
+        self.period_ns = max(1, int(round(period_s * 1e9)))
+        self.spin_ns = int(spin_s * 1e9)
+        self.status_interval_s = status_interval_s
+        self._sel = selectors.SelectSelector()
+        self.uplink = None
+        if port is not None:
+            self.uplink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.uplink.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if SO_TIMESTAMPNS is not None:
+                try:
+                    self.uplink.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+                except OSError:
+                    pass
+            self.uplink.bind((host, port))
+            self.uplink.setblocking(False)
+            self._sel.register(self.uplink, selectors.EVENT_READ, self._on_uplink)
+        if on_command is None and self.uplink is not None:
+            on_command = CommandHandler(telemetry.fsm, self.uplink.sendto, verbose=telemetry.verbose)
+        self.on_command = on_command
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._sel.register(self._wake_r, selectors.EVENT_READ, self._on_wake)
+        self._running = False
+        self.ticks = 0
+        self.missed = 0          # deadlines skipped because the loop fell a whole period behind
+        self.commands = 0
+
+    @property
+    def address(self):
+        return self.uplink.getsockname() if self.uplink else None
+
+    def stop(self):
+        self._running = False
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
+
+    def _on_wake(self):
+        try:
+            while self._wake_r.recv(64):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def _on_uplink(self):
+        while True:
+            try:
+                data, anc, _, addr = self.uplink.recvmsg(1024, socket.CMSG_SPACE(TIMESPEC.size))
+            except (BlockingIOError, InterruptedError):
+                return
+            rx_ns = rx_timestamp_ns(anc)
+            t0 = time.perf_counter_ns()
+            try:
+                self.on_command(data, addr)
+            except Exception as e:
+                print(f"[UPLINK] Command handler error: {e!r}")
+            self.commands += 1
+            t1 = time.perf_counter_ns()
+            # kernel arrival (CLOCK_REALTIME) to applied; wake-up to applied without it
+            self.timer.record("cmd", time.time_ns() - rx_ns if rx_ns is not None else t1 - t0)
+
+    def run(self, samples: Optional[int] = None) -> StageTimer:
+        """Until stop() (or `samples` ticks). Returns the StageTimer."""
+        sel, timer, tick = self._sel, self.timer, self.telemetry.tick
+        period, spin = self.period_ns, self.spin_ns
+        clock = time.monotonic_ns
+        self._running = True
+        start = clock()
+        k = 0                      # index of the next deadline on the grid
+        deadline = start
+        next_status = time.monotonic() + self.status_interval_s
+        while self._running and (samples is None or self.ticks < samples):
+            wait = deadline - clock()
+            if wait > 0:
+                events = sel.select((wait - spin) / 1e9 if wait > spin else 0)
+                for key, _ in events:
+                    key.data()
+                if clock() < deadline:
+                    continue
+            now = clock()
+            timer.record("jitter", now - deadline)
+            tick()
+            self.ticks += 1
+            k += 1
+            deadline = start + k * period
+            behind = clock() - deadline
+            if behind >= period:
+                # a whole period late (stall, overload): drop those ticks, stay on the grid
+                skip = behind // period
+                k += skip
+                self.missed += skip
+                deadline = start + k * period
+            if self.status_interval_s and time.monotonic() >= next_status:
+                print(f"[sim timing] {timer.status()} missed={self.missed}")
+                next_status = time.monotonic() + self.status_interval_s
+        return timer
+
+    def close(self):
+        self._sel.close()
+        if self.uplink:
+            self.uplink.close()
+        self._wake_r.close()
+        self._wake_w.close()
@@ -1,11 +1,20 @@
 # sat_sim/sensors.py
-import time
 import math
 import random
+from typing import Optional
+
+from .clock import WallClock
 
 class SensorSimulator:
-    def __init__(self, config):
-        self.t0 = time.time()
+    """
+    Fake sensor readings. `clock` (sat_sim.clock; wall clock by default)
+    drives the drift and oscillations, `rng` (a random.Random) the noise;
+    with a VirtualClock and a seeded rng the readings are reproducible.
+    """
+    def __init__(self, config, clock=None, rng: Optional[random.Random] = None):
+        self.clock = clock or WallClock()
+        self.rng = rng or random.Random(config.get("sim_seed"))
+        self.t0 = self.clock.time()
         self.batt_mv = config.get("battery_start_mv", 4200)
         self.batt_drain_mv_per_sec = config.get("battery_drain_mv_per_sec", 0.05)
         self.temp_base = config.get("temp_base_c", 25.0)
@@ -13,7 +22,8 @@ class SensorSimulator:
         self._last_time = self.t0
 
     def step(self):
-        now = time.time()
+        now = self.clock.time()
+        gauss = self.rng.gauss
         dt = now - self._last_time
         self._last_time = now
 
@@ -22,11 +32,11 @@ class SensorSimulator:
 
         # simple oscillating temperature (centi-deg)
         t = now - self.t0
-        temp = self.temp_base + math.sin(t / 30.0) * 1.5 + random.gauss(0, 0.2)  # deg C
+        temp = self.temp_base + math.sin(t / 30.0) * 1.5 + gauss(0, 0.2)  # deg C
         temp_centideg = int(temp * 100)
 
         # pressure varies slightly
-        press = self.press_base + math.cos(t / 45.0) * 5 + random.gauss(0, 1)
+        press = self.press_base + math.cos(t / 45.0) * 5 + gauss(0, 1)
 
         # altitude estimate (fake) from pressure using a simple model
         # approximate: altitude in meters from standard atmosphere (not precise)
@@ -34,15 +44,15 @@ class SensorSimulator:
         alt_cm = int(alt_m * 100)
 
         # gyro/acc simulated (int16)
-        gyro_x = int(random.gauss(0, 20))
-        gyro_y = int(random.gauss(0, 20))
-        gyro_z = int(random.gauss(0, 20))
+        gyro_x = int(gauss(0, 20))
+        gyro_y = int(gauss(0, 20))
+        gyro_z = int(gauss(0, 20))
 
-        acc_x = int(random.gauss(0, 50))
-        acc_y = int(random.gauss(0, 50))
-        acc_z = int(random.gauss(1000, 50))  # ~1g on Z (milligravities or scaled unit)
+        acc_x = int(gauss(0, 50))
+        acc_y = int(gauss(0, 50))
+        acc_z = int(gauss(1000, 50))  # ~1g on Z (milligravities or scaled unit)
 
-        light = int(max(0, min(1023, 512 + math.sin(t / 10.0) * 400 + random.gauss(0, 40))))
+        light = int(max(0, min(1023, 512 + math.sin(t / 10.0) * 400 + gauss(0, 40))))
 
         return {
             "batt_mv": int(max(3000, min(4200, self.batt_mv))),
@@ -0,0 +1,123 @@
+# sat_sim/timing.py
+"""
+Per-stage latency histograms, shared by the simulator and the ground.
+
+Durations go into log-linear (HDR-style) buckets in microseconds: exact
+below 16 us, then 16 sub-buckets per power of two (~6% resolution), so a
+record is one dict increment and percentiles need no stored samples.
+StageTimer keeps a lifetime histogram per stage plus an interval one that
+the status line reads and resets.
+"""
+import time
+from typing import Dict, Optional
+
+HIST_SUB_BITS = 4
+_HIST_SUB = 1 << HIST_SUB_BITS
+
+
+def hist_index(v: int) -> int:
+    """Log-linear bucket of a non-negative int (exact below 2**HIST_SUB_BITS)."""
+    if v < _HIST_SUB:
+        return v
+    shift = v.bit_length() - HIST_SUB_BITS - 1
+    return ((shift + 1) << HIST_SUB_BITS) + ((v >> shift) - _HIST_SUB)
+
+
+def hist_value(i: int) -> int:
+    """Upper edge of bucket i (inverse of hist_index, rounded up)."""
+    if i < _HIST_SUB:
+        return i
+    shift = (i >> HIST_SUB_BITS) - 1
+    return (((i & (_HIST_SUB - 1)) + _HIST_SUB + 1) << shift) - 1
+
+
+def hist_percentiles(hist: Dict[int, int], ps=(50, 90, 99)) -> dict:
+    total = sum(hist.values())
+    out = {f"p{p}": None for p in ps}
+    out["max"] = None
+    if not total:
+        return out
+    keys = sorted(hist)
+    targets = [(p, total * p / 100.0) for p in ps]
+    seen = 0
+    ti = 0
+    for k in keys:
+        seen += hist[k]
+        while ti < len(targets) and seen >= targets[ti][1]:
+            out[f"p{targets[ti][0]}"] = hist_value(k)
+            ti += 1
+    out["max"] = hist_value(keys[-1])
+    return out
+
+
+class _Stage:
+    __slots__ = ("count", "sum_us", "hist", "i_count", "i_sum_us", "i_hist")
+
+    def __init__(self):
+        self.count = 0
+        self.sum_us = 0
+        self.hist = {}
+        self.reset_interval()
+
+    def reset_interval(self):
+        self.i_count = 0
+        self.i_sum_us = 0
+        self.i_hist = {}
+
+
+def _summary(count: int, sum_us: int, hist: Dict[int, int]) -> dict:
+    out = {"count": count, "mean_us": round(sum_us / count, 1) if count else None}
+    out.update(hist_percentiles(hist))
+    return out
+
+
+class StageTimer:
+    """
+    record(stage, ns) with durations from time.perf_counter_ns() (or
+    time.time_ns() differences across processes/clocks).
+    """
+    def __init__(self):
+        self.stages: Dict[str, _Stage] = {}
+        self.interval_start = time.monotonic()
+
+    def record(self, stage: str, ns: int):
+        s = self.stages.get(stage)
+        if s is None:
+            s = self.stages[stage] = _Stage()
+        us = ns // 1000 if ns > 0 else 0
+        k = hist_index(us)
+        s.count += 1
+        s.sum_us += us
+        s.hist[k] = s.hist.get(k, 0) + 1
+        s.i_count += 1
+        s.i_sum_us += us
+        s.i_hist[k] = s.i_hist.get(k, 0) + 1
+
+    def snapshot(self, reset_interval: bool = False) -> dict:
+        """{"interval": {stage: summary}, "lifetime": {stage: summary}}; times in us."""
+        out = {
+            "interval_s": round(time.monotonic() - self.interval_start, 1),
+            "interval": {n: _summary(s.i_count, s.i_sum_us, s.i_hist) for n, s in self.stages.items()},
+            "lifetime": {n: _summary(s.count, s.sum_us, s.hist) for n, s in self.stages.items()},
+        }
+        if reset_interval:
+            for s in self.stages.values():
+                s.reset_interval()
+            self.interval_start = time.monotonic()
+        return out
+
+    def status(self, reset_interval: bool = True, stages: Optional[list] = None) -> str:
+        """One-line p50/p99 per stage for the interval since the last call."""
+        snap = self.snapshot(reset_interval)["interval"]
+        parts = []
+        for name in stages or list(snap):
+            s = snap.get(name)
+            if s and s["count"]:
+                parts.append(f"{name} p50/p99={_fmt_us(s['p50'])}/{_fmt_us(s['p99'])}")
+        return " ".join(parts)
+
+
+def _fmt_us(us: Optional[int]) -> str:
+    if us is None:
+        return "-"
+    return f"{us}us" if us < 1000 else f"{us / 1000:.1f}ms"
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+from sat_sim.packet import pack_telemetry
+from ground.logger import BinaryLogger
+from ground.query import read_index
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+@unittest.skipIf(numpy is None, "numpy not installed")
+class BulkDecodeTest(unittest.TestCase):
+    def test_decode_many_flags_bad_frames(self):
+        from ground.bulk import decode_many
+        frames = [
+            pack_telemetry(
+                seq=i, timestamp_ms=1000 + i, mode=0,
+                batt_mv=4000 - i, temp_centideg=-100 + i,
+                press_pa=101325, alt_cm=0,
+                gyro_xyz=(i, -i, 0), acc_xyz=(0, 0, 1000), light=i
+            ) for i in range(10)
+        ]
+        corrupt = bytearray(frames[3])
+        corrupt[8] ^= 0xFF
+        frames[3] = bytes(corrupt)
+        cols, bad = decode_many(b"".join(frames) + b"\x00\x01")
+        self.assertEqual(len(bad), 10)
+        self.assertEqual(list(bad.nonzero()[0]), [3])
+        self.assertEqual(list(cols["seq"][~bad]), [0, 1, 2, 4, 5, 6, 7, 8, 9])
+        self.assertEqual(int(cols["temp_centideg"][0]), -100)
+        self.assertEqual(int(cols["gyro_y"][9]), -9)
+
+    def test_binary_segment_roundtrip(self):
+        from ground.bulk import open_segment
+        with tempfile.TemporaryDirectory() as d:
+            log = BinaryLogger(d, flush_rows=4)
+            for i in range(10):
+                frame = pack_telemetry(
+                    seq=100 + i, timestamp_ms=5000 + i, mode=1,
+                    batt_mv=3900, temp_centideg=2500, press_pa=101000, alt_cm=12,
+                    gyro_xyz=(0, 0, 0), acc_xyz=(0, 0, 1000), light=300
+                )
+                log.write_frame(frame, ground_ts_ms=1_700_000_000_000 + i)
+            log.close()
+            self.assertTrue(os.path.exists(os.path.join(d, "latest.tlm")))
+            cols = open_segment(log.path)
+            self.assertEqual(list(cols["seq"]), list(range(100, 110)))
+            self.assertEqual(int(cols["ground_ts_ms"][9]), 1_700_000_000_009)
+            idx = read_index(log.path)
+            # batches of 4, 4 and the 2 flushed on close
+            self.assertEqual([e[3] for e in idx], [100, 104, 108])
+            self.assertEqual([e[2] for e in idx], [5000, 5004, 5008])
+
+if __name__ == "__main__":
+    unittest.main()
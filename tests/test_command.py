@@ -1,6 +1,14 @@
 # tests/test_command.py
+import random
+import threading
 import unittest
-from sat_sim.packet import pack_command, unpack_command, MSGTYPE_CMD
+from ground.command_client import CommandClient
+from sat_sim.clock import WallClock
+from sat_sim.fsm import CubeSatFSM
+from sat_sim.packet import (pack_ack, pack_command, pack_telemetry, unpack_ack, unpack_command,
+                            Deframer, CMD_HISTORY, MSGTYPE_CMD)
+from sat_sim.runtime import CommandHandler, SatRuntime, TelemetryTask
+from sat_sim.sensors import SensorSimulator
 
 class CmdTest(unittest.TestCase):
     def test_cmd_roundtrip(self):
@@ -11,6 +19,99 @@ class CmdTest(unittest.TestCase):
         self.assertEqual(parsed["cmd_id"], 1)
         self.assertEqual(parsed["param"], 2)
 
+    def test_ack_roundtrip_and_stream_length(self):
+        frame = pack_ack(seq=65535, cmd_id=3, ack_code=2)
+        self.assertEqual(unpack_ack(frame), (65535, 3, 2))
+        with self.assertRaises(ValueError):
+            unpack_ack(frame[:-1] + bytes([frame[-1] ^ 1]))
+        stream = pack_command(1, 2, seq=1) + frame + pack_ack(1, 1, 0)
+        self.assertEqual([bytes(v) for v in Deframer().feed(stream)][1], frame)
+
+    def test_duplicate_command_acked_not_reapplied(self):
+        fsm = CubeSatFSM()
+        calls, acks = [], []
+        apply = fsm.apply_command
+        fsm.apply_command = lambda cmd_id, param: (calls.append(cmd_id), apply(cmd_id, param))[1]
+        handler = CommandHandler(fsm, lambda frame, addr: acks.append(unpack_ack(frame)), verbose=False)
+        src = ("127.0.0.1", 40000)
+        self.assertEqual(handler(pack_command(1, 7, seq=5), src), 2)
+        self.assertEqual(handler(pack_command(1, 7, seq=5), src), 2)      # retransmission
+        self.assertEqual(handler(pack_command(1, 1, seq=5), ("127.0.0.1", 40001)), 0)   # other client
+        self.assertIsNone(handler(b"\xaa\x55junk", src))
+        self.assertEqual(calls, [1, 1])
+        self.assertEqual(acks, [(5, 1, 2), (5, 1, 2), (5, 1, 0)])
+        self.assertEqual((handler.applied, handler.duplicates, handler.bad), (2, 1, 1))
+
+    def test_full_window_retransmit_still_suppressed(self):
+        handler = CommandHandler(CubeSatFSM(), verbose=False)
+        src = ("127.0.0.1", 40000)
+        # a full window of commands, then the oldest retransmitted (its ACK was lost)
+        for seq in range(CMD_HISTORY):
+            handler(pack_command(CubeSatFSM.CMD_PING, 0, seq=seq), src)
+        handler(pack_command(CubeSatFSM.CMD_PING, 0, seq=0), src)
+        self.assertEqual((handler.applied, handler.duplicates), (CMD_HISTORY, 1))
+
+
+class LossyHandler(CommandHandler):
+    """Drops the first ACK of every third command."""
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self.dropped = set()
+        send = self.reply
+
+        def reply(frame, addr):
+            seq = unpack_ack(frame)[0]
+            if seq % 3 == 0 and seq not in self.dropped:
+                self.dropped.add(seq)
+                return
+            send(frame, addr)
+        self.reply = reply
+
+
+class CommandClientTest(unittest.TestCase):
+    def test_window_retransmit_and_rtt(self):
+        clock = WallClock()
+        rng = random.Random(1)
+        fsm = CubeSatFSM()
+        task = TelemetryTask({}, clock, SensorSimulator({}, clock, rng), fsm, pack_telemetry,
+                             lambda frame, ts: None, rng, verbose=False)
+        rt = SatRuntime(task, 0.05, port=0, status_interval_s=0)
+        handler = rt.on_command = LossyHandler(fsm, rt.uplink.sendto, verbose=False)
+        th = threading.Thread(target=rt.run)
+        th.start()
+        client = CommandClient(*rt.address, window=8, timeout_s=0.05, retries=3)
+        try:
+            cmds = [(CubeSatFSM.CMD_PING, 0)] * 29 + [(CubeSatFSM.CMD_SET_MODE, 9)]
+            results = client.send_all(cmds)
+        finally:
+            client.close()
+            rt.stop()
+            th.join(2)
+            rt.close()
+        self.assertEqual([r.seq for r in results], list(range(30)))
+        self.assertEqual([r.ack_code for r in results], [0] * 29 + [2])
+        self.assertEqual({r.seq for r in results if r.tries > 1}, handler.dropped)
+        self.assertEqual(handler.applied, 30)
+        self.assertEqual(handler.duplicates, len(handler.dropped))
+        s = client.stats()
+        self.assertEqual((s["acked"], s["failed"], s["retransmits"]), (30, 0, 10))
+        self.assertEqual(s["rtt_us"]["count"], 30)
+
+    def test_window_larger_than_history_rejected(self):
+        with self.assertRaisesRegex(ValueError, str(CMD_HISTORY)):
+            CommandClient("127.0.0.1", 9, window=CMD_HISTORY + 1)
+        CommandClient("127.0.0.1", 9, window=CMD_HISTORY).close()
+
+    def test_no_listener_fails_after_retries(self):
+        client = CommandClient("127.0.0.1", 9, window=4, timeout_s=0.005, retries=2)
+        try:
+            r = client.request(CubeSatFSM.CMD_PING)
+        finally:
+            client.close()
+        self.assertIsNone(r.ack_code)
+        self.assertEqual(r.tries, 3)
+        self.assertEqual(client.stats()["failed"], 1)
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,77 @@
+import unittest
+from sat_sim.fsm import CubeSatFSM
+from sat_sim.packet import TM_FRAME_LEN, pack_telemetry, unpack_telemetry
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+@unittest.skipIf(numpy is None, "numpy not installed")
+class PackManyTest(unittest.TestCase):
+    def test_matches_pack_telemetry(self):
+        from sat_sim.packet_np import pack_many
+        rows = [dict(seq=65530 + i, timestamp_ms=(1 << 32) - 2 + i, mode=i % 3,
+                     batt_mv=4000 - i, temp_centideg=-250 + 100 * i, press_pa=101325 - i,
+                     alt_cm=i * 7, gyro_xyz=(i, -i, 3), acc_xyz=(-50, 20, 1000 + i), light=1023 - i)
+                 for i in range(8)]
+        cols = {k: numpy.array([r[k] for r in rows]) for k in rows[0] if k not in ("gyro_xyz", "acc_xyz")}
+        for j, axis in enumerate("xyz"):
+            cols["gyro_" + axis] = numpy.array([r["gyro_xyz"][j] for r in rows])
+            cols["acc_" + axis] = numpy.array([r["acc_xyz"][j] for r in rows])
+        # pack_telemetry masks to the field width; pack_many wraps the same way
+        cols["timestamp_ms"] = cols["timestamp_ms"] & 0xFFFFFFFF
+        cols["seq"] = cols["seq"] & 0xFFFF
+        buf = pack_many(cols).tobytes()
+        self.assertEqual(len(buf), 8 * TM_FRAME_LEN)
+        for i, r in enumerate(rows):
+            r = dict(r, seq=r["seq"] & 0xFFFF, timestamp_ms=r["timestamp_ms"] & 0xFFFFFFFF)
+            self.assertEqual(buf[i * TM_FRAME_LEN:(i + 1) * TM_FRAME_LEN], pack_telemetry(**r))
+
+
+@unittest.skipIf(numpy is None, "numpy not installed")
+class FleetSimulatorTest(unittest.TestCase):
+    def test_shapes_and_per_sat_params(self):
+        from sat_sim.fleet import FleetSimulator
+        cfg = {"fleet_sim": {"temp_base_c": [10.0, 25.0, 60.0],
+                             "battery_start_mv": {"min": 3900, "max": 4100}}}
+        fleet = FleetSimulator(3, cfg, period_s=1.0, seed=1)
+        s = fleet.step(50)
+        self.assertEqual(s["temp_centideg"].shape, (3, 50))
+        self.assertEqual(s["seq"].shape, (50,))
+        means = s["temp_centideg"].mean(axis=1)
+        self.assertTrue(means[0] < means[1] < means[2])
+        self.assertTrue(((s["batt_mv"] >= 3000) & (s["batt_mv"] <= 4200)).all())
+        self.assertTrue(((s["light"] >= 0) & (s["light"] <= 1023)).all())
+        # 60 C is over the 40 C limit: that spacecraft sits in safe mode
+        self.assertTrue((s["mode"][2] == CubeSatFSM.MODE_SAFE).all())
+        self.assertTrue((s["mode"][0] == CubeSatFSM.MODE_OPERATIONAL).all())
+        self.assertEqual(list(fleet.step(2)["seq"]), [50, 51])
+        with self.assertRaises(ValueError):
+            FleetSimulator(2, cfg)
+
+    def test_mode_hysteresis_matches_fsm(self):
+        from sat_sim.fleet import FleetSimulator
+        fleet = FleetSimulator(1, {}, seed=1)
+        temp = numpy.array([[3900, 4100, 3900, 3790, 3900, 4001]])
+        batt = numpy.full((1, 6), 4000)
+        fsm = CubeSatFSM()
+        expect = [fsm.update({"temp_centideg": int(t), "batt_mv": 4000}) for t in temp[0]]
+        self.assertEqual(list(fleet._modes(temp, batt)[0]), expect)
+
+    def test_frames_deterministic_and_decodable(self):
+        from sat_sim.fleet import FleetSimulator
+        cfg = {"fleet_sim": {"phase_s": {"min": 0, "max": 3600}}}
+        a = FleetSimulator(4, cfg, start=1000.0, seed=7).frames(5)
+        b = FleetSimulator(4, cfg, start=1000.0, seed=7).frames(5)
+        self.assertEqual(a.shape, (5, 4))
+        self.assertEqual(a.tobytes(), b.tobytes())
+        buf = a.tobytes()
+        first = unpack_telemetry(buf[:TM_FRAME_LEN])
+        last = unpack_telemetry(buf[-TM_FRAME_LEN:])
+        self.assertEqual((first.seq, first.timestamp_ms), (0, 1000000))
+        self.assertEqual((last.seq, last.timestamp_ms), (4, 1002000))
+
+
+if __name__ == "__main__":
+    unittest.main()
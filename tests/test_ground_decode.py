@@ -1,7 +1,7 @@
 # tests/test_ground_decode.py
 import unittest
-from sat_sim.packet import pack_telemetry
-from ground.decode import decode_datagram
+from sat_sim.packet import pack_telemetry, TelemetryBatcher
+from ground.decode import decode_datagram, StreamDecoder
 
 class TestGroundDecode(unittest.TestCase):
     def test_decode_roundtrip(self):
@@ -16,6 +16,19 @@ class TestGroundDecode(unittest.TestCase):
         self.assertEqual(row["mode"], "SAFE")
         self.assertAlmostEqual(row["temp_c"], 26.12, places=2)
 
+    def test_stream_decoder_unrolls_batches(self):
+        batcher = TelemetryBatcher(3)
+        frame = None
+        for i in range(3):
+            frame = batcher.encode(seq=10 + i, timestamp_ms=i, mode=0, batt_mv=4000,
+                                   temp_centideg=2500 + i, press_pa=101325, alt_cm=0,
+                                   gyro_xyz=(0, 0, 0), acc_xyz=(0, 0, 1000), light=0)
+        samples = StreamDecoder().decode(frame, ("127.0.0.1", 1))
+        self.assertEqual([row["seq"] for row, _ in samples], [10, 11, 12])
+        self.assertEqual(samples[2][0]["temp_c"], 25.02)
+        # each sample comes with a full single-sample frame for the archive
+        self.assertEqual(decode_datagram(samples[1][1])["seq"], 11)
+
 if __name__ == "__main__":
     unittest.main()
 
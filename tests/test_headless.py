@@ -0,0 +1,59 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from sat_sim.clock import VirtualClock
+from sat_sim.main import main
+from sat_sim.packet import Deframer, TelemetryDeltaDecoder
+from sat_sim.sensors import SensorSimulator
+
+class HeadlessTest(unittest.TestCase):
+    def run_sim(self, path, seed, rate_ms=250, samples=300):
+        with contextlib.redirect_stdout(io.StringIO()):
+            main(["--headless", "--samples", str(samples), "--rate-ms", str(rate_ms), "--seed", str(seed),
+                  "--start", "1700000000", "--out", path])
+        with open(path, "rb") as f:
+            return f.read()
+
+    def test_same_seed_same_bytes(self):
+        with tempfile.TemporaryDirectory() as d:
+            a = self.run_sim(os.path.join(d, "a.bin"), 5)
+            b = self.run_sim(os.path.join(d, "b.bin"), 5)
+            c = self.run_sim(os.path.join(d, "c.bin"), 6)
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+        # samples are stamped on the virtual clock, 250 ms apart
+        dec = TelemetryDeltaDecoder()
+        recs = [dec.feed(bytes(v)) for v in Deframer().feed(a)]
+        recs = [r for r in recs if r]
+        self.assertEqual(len(recs), 300)
+        self.assertEqual(recs[0].timestamp_ms, 1_700_000_000_000 & 0xFFFFFFFF)
+        self.assertEqual({(b.timestamp_ms - a.timestamp_ms) for a, b in zip(recs, recs[1:])}, {250})
+
+    def test_timestamps_stay_on_grid_for_inexact_period(self):
+        # 0.1 s has no exact binary form; summing it onto an epoch float drifts off the grid
+        with tempfile.TemporaryDirectory() as d:
+            data = self.run_sim(os.path.join(d, "a.bin"), 1, rate_ms=100, samples=5000)
+        dec = TelemetryDeltaDecoder()
+        recs = [r for r in (dec.feed(bytes(v)) for v in Deframer().feed(data)) if r]
+        start = 1_700_000_000_000 & 0xFFFFFFFF
+        self.assertEqual(len(recs), 5000)
+        off = [(i, r.timestamp_ms - start) for i, r in enumerate(recs) if r.timestamp_ms != start + 100 * i]
+        self.assertEqual(off[:3], [])
+
+    def test_virtual_clock_day_has_no_drift(self):
+        clock = VirtualClock(start=1_700_000_000.0)
+        for _ in range(864000):
+            clock.sleep(0.1)
+        self.assertEqual(clock.time(), 1_700_000_000.0 + 86400)
+
+    def test_virtual_clock_drives_sensors(self):
+        clock = VirtualClock(start=1000.0)
+        sim = SensorSimulator({"battery_start_mv": 4200, "battery_drain_mv_per_sec": 0.5}, clock)
+        clock.sleep(600)
+        self.assertEqual(sim.step()["batt_mv"], 3900)
+        self.assertEqual(clock.time(), 1600.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from ground.logger import (BinaryLogger, JsonlLogger, LogWriter, SEG_HEADER, SEG_RECORD_LEN,
+                           SourceRouter)
+from sat_sim.packet import pack_telemetry
+
+class GroupCommitTest(unittest.TestCase):
+    def test_rows_flushed_in_groups(self):
+        with tempfile.TemporaryDirectory() as d:
+            log = JsonlLogger(d, flush_rows=3)
+            log.write({"seq": 1})
+            log.write({"seq": 2})
+            self.assertEqual(os.path.getsize(log.path), 0)
+            log.write({"seq": 3})
+            with open(log.path) as f:
+                self.assertEqual(len(f.read().splitlines()), 3)
+            log.write({"seq": 4})
+            log.close()  # close flushes the partial group
+            with open(log.path) as f:
+                self.assertEqual(len(f.read().splitlines()), 4)
+
+    def test_fsync_covers_index(self):
+        frame = pack_telemetry(seq=1, timestamp_ms=1000, mode=0, batt_mv=3700, temp_centideg=2100,
+                               press_pa=101325, alt_cm=100, gyro_xyz=(0, 0, 0), acc_xyz=(0, 0, 1000), light=10)
+        with tempfile.TemporaryDirectory() as d:
+            for log, write in ((BinaryLogger(d, flush_rows=2, fsync=True, tag="b"), "write_frame"),
+                               (JsonlLogger(d, flush_rows=2, fsync=True, tag="j"), "write")):
+                arg = frame if write == "write_frame" else {"seq": 1}
+                with mock.patch("ground.logger.os.fsync") as fsync:
+                    getattr(log, write)(arg)
+                    self.assertEqual(fsync.call_count, 0)
+                    getattr(log, write)(arg)
+                synced = [c.args[0] for c in fsync.call_args_list]
+                self.assertEqual(synced, [log._idx.fileno(), log._f.fileno()])
+                log.close()
+
+
+class LogWriterTest(unittest.TestCase):
+    def test_fsync_off_the_caller_thread(self):
+        frame = pack_telemetry(seq=1, timestamp_ms=1000, mode=0, batt_mv=3700, temp_centideg=2100,
+                               press_pa=101325, alt_cm=100, gyro_xyz=(0, 0, 0), acc_xyz=(0, 0, 1000), light=10)
+        synced_on = []
+
+        def slow_fsync(fd):
+            synced_on.append(threading.current_thread())
+            time.sleep(0.002)
+
+        with tempfile.TemporaryDirectory() as d, mock.patch("ground.logger.os.fsync", slow_fsync):
+            jsonl = SourceRouter(lambda tag: JsonlLogger(d, 1, 0, True, tag), per_source=False)
+            binlog = SourceRouter(lambda tag: BinaryLogger(d, 1, 0, True, tag), per_source=False)
+            writer = LogWriter([(jsonl, False), (binlog, True)], idle_s=0.05)
+            t0 = time.perf_counter()
+            for seq in range(50):
+                writer.write(("a", 1), {"seq": seq, "timestamp": 1.0}, frame)
+            self.assertLess(time.perf_counter() - t0, 0.1)    # 200 fsyncs at 2 ms each happen elsewhere
+            writer.close()
+            self.assertEqual(len(synced_on), 200)      # index + data, two loggers, 50 flushes
+            self.assertEqual(set(synced_on), {writer._thread})
+            with open(jsonl.get(None).path) as f:
+                self.assertEqual(len(f.read().splitlines()), 50)
+            self.assertEqual(os.path.getsize(binlog.get(None).path), SEG_HEADER.size + 50 * SEG_RECORD_LEN)
+        self.assertEqual((writer.dropped, writer.errors), (0, 0))
+
+    def test_full_queue_drops_and_counts(self):
+        gate = threading.Event()
+
+        class Stuck:
+            def get(self, source):
+                return self
+
+            def write(self, row):
+                gate.wait()
+
+            def poll(self):
+                pass
+
+            def close(self):
+                pass
+
+        writer = LogWriter([(Stuck(), False)], maxsize=2)
+        for seq in range(10):
+            writer.write(None, {"seq": seq}, b"")
+        gate.set()
+        writer.close()
+        self.assertGreaterEqual(writer.dropped, 7)
+
+if __name__ == "__main__":
+    unittest.main()
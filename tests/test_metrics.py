@@ -0,0 +1,74 @@
+import threading
+import unittest
+import urllib.request
+from ground import decode, metrics
+from ground.stats import FleetStats
+from ground.stats_http import StatsEndpoint
+from sat_sim import packet
+from sat_sim.timing import StageTimer
+
+FRAME = packet.pack_telemetry(seq=1, timestamp_ms=1000, mode=0, batt_mv=3700, temp_centideg=2100,
+                              press_pa=101325, alt_cm=100, gyro_xyz=(0, 0, 0), acc_xyz=(0, 0, 1000), light=10)
+
+class InstrumentTest(unittest.TestCase):
+    def tearDown(self):
+        metrics.uninstrument()
+
+    def test_wraps_and_restores(self):
+        original = decode.decode_datagram
+        fs = metrics.instrument()
+        self.assertIsNot(decode.decode_datagram, original)
+        for _ in range(3):
+            decode.decode_datagram(FRAME)
+        self.assertEqual(fs.calls["decode_datagram"], 3)
+        self.assertEqual(fs.calls["crc16_x25"], 3)
+        self.assertGreater(fs.ns["decode_datagram"], 0)
+        metrics.uninstrument()
+        self.assertIs(decode.decode_datagram, original)
+        decode.decode_datagram(FRAME)
+        self.assertEqual(fs.calls["decode_datagram"], 3)
+
+    def test_render_prometheus(self):
+        fs = metrics.instrument()
+        decode.decode_datagram(FRAME)
+        stats = FleetStats()
+        stats.note_good(("127.0.0.1", 1), 1, None, now=1000.0)
+        timer = StageTimer()
+        timer.record("decode", 40_000)
+        text = metrics.render_prometheus(stats.snapshot(1000.5), timer.snapshot(), fs,
+                                         {"cubesat_rx_timeouts_total": ("Timeouts.", 2)})
+        self.assertIn('cubesat_frames_total{result="good"} 1', text)
+        self.assertIn("# TYPE cubesat_rx_timeouts_total counter", text)
+        self.assertIn("cubesat_rx_timeouts_total 2", text)
+        self.assertIn('cubesat_fn_calls_total{fn="decode_datagram"} 1', text)
+        self.assertIn('cubesat_stage_latency_seconds_count{stage="decode"} 1', text)
+        self.assertTrue(text.endswith("\n"))
+
+class SamplerTest(unittest.TestCase):
+    def test_profile_route_returns_folded_stacks(self):
+        stop = threading.Event()
+
+        def busy_loop():
+            while not stop.is_set():
+                sum(range(1000))
+
+        t = threading.Thread(target=busy_loop)
+        t.start()
+        ep = StatsEndpoint("127.0.0.1", 0)
+        try:
+            ep.route("/profile", metrics.profile_route(metrics.Sampler(t.ident, hz=500)))
+            url = f"http://127.0.0.1:{ep.address[1]}/profile?seconds=0.2"
+            with urllib.request.urlopen(url, timeout=5) as r:
+                folded = r.read().decode()
+        finally:
+            stop.set()
+            t.join()
+            ep.close()
+        lines = folded.splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(any("busy_loop" in l for l in lines), folded[:500])
+        stack, n = lines[0].rsplit(" ", 1)
+        self.assertGreater(int(n), 0)
+
+if __name__ == "__main__":
+    unittest.main()
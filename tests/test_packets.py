@@ -1,6 +1,8 @@
-# tests/test_packet.py
 import unittest
-from sat_sim.packet import pack_telemetry, unpack_frame
+from sat_sim.packet import (pack_telemetry, pack_telemetry_into, unpack_frame, unpack_telemetry,
+                            crc16_x25, crc16_x25_many, TM_FRAME_LEN, MSGTYPE_TM_DELTA,
+                            TelemetryDeltaEncoder, TelemetryDeltaDecoder, TelemetryBatcher,
+                            unpack_telemetry_batch, pack_command, Deframer, STREAM_MAX_FRAME)
 
 class PacketTest(unittest.TestCase):
     def test_roundtrip(self):
@@ -18,6 +20,131 @@ class PacketTest(unittest.TestCase):
         self.assertEqual(parsed['batt_mv'], 4100)
         self.assertEqual(parsed['temp_centideg'], 2534)
 
+    def test_pack_into_matches_pack(self):
+        kw = dict(seq=7, timestamp_ms=1000, mode=2,
+                  batt_mv=3800, temp_centideg=-150,
+                  press_pa=100000, alt_cm=-250,
+                  gyro_xyz=(1, 2, 3), acc_xyz=(-4, -5, 1000), light=1023)
+        frame = pack_telemetry(**kw)
+        self.assertEqual(len(frame), TM_FRAME_LEN)
+        buf = bytearray(3 * TM_FRAME_LEN)
+        end = pack_telemetry_into(buf, TM_FRAME_LEN, **kw)
+        self.assertEqual(end, 2 * TM_FRAME_LEN)
+        self.assertEqual(bytes(buf[TM_FRAME_LEN:end]), frame)
+        rec = unpack_telemetry(frame)
+        self.assertEqual(rec.temp_centideg, -150)
+        self.assertEqual((rec.acc_x, rec.acc_y, rec.acc_z), (-4, -5, 1000))
+
+    def test_crc_check_value(self):
+        # standard CRC-16/X25 check value
+        self.assertEqual(crc16_x25(b"123456789"), 0x906E)
+        self.assertEqual(crc16_x25(b""), 0x0000)
+        self.assertEqual(crc16_x25_many([b"123456789", bytearray(b"123456789"), b""]),
+                         [0x906E, 0x906E, 0x0000])
+    def test_delta_stream_roundtrip_and_resync(self):
+        def sample(i):
+            return dict(seq=(0xFFF0 + i) & 0xFFFF, timestamp_ms=(0xFFFFFF00 + 100 * i) & 0xFFFFFFFF,
+                        mode=i % 3, batt_mv=4100 - i, temp_centideg=-20 + 3 * i,
+                        press_pa=101325 - i, alt_cm=-5 + i,
+                        gyro_xyz=(i, -i, 32767 - i), acc_xyz=(-32768 + i, 0, 1000), light=i * 7)
+        enc = TelemetryDeltaEncoder(keyframe_interval=5)
+        frames = [enc.encode(**sample(i)) for i in range(12)]
+        self.assertEqual([f[3] == MSGTYPE_TM_DELTA for f in frames[:6]],
+                         [False, True, True, True, True, False])
+        self.assertLess(len(frames[1]), TM_FRAME_LEN)
+
+        dec = TelemetryDeltaDecoder()
+        got = [dec.feed(f) for f in frames]
+        self.assertEqual(got, [unpack_telemetry(pack_telemetry(**sample(i))) for i in range(12)])
+
+        # lose frame 6: deltas 7-9 cannot be applied, keyframe 10 resyncs
+        dec = TelemetryDeltaDecoder()
+        got = [dec.feed(f) for i, f in enumerate(frames) if i != 6]
+        self.assertEqual([r is None for r in got[6:]], [True, True, True, False, False])
+        self.assertEqual(got[-1].seq, sample(11)["seq"])
+        self.assertEqual(dec.unsynced, 3)
+    def test_batch_frame_unrolls_to_samples(self):
+        batcher = TelemetryBatcher(4)
+        frames = []
+        for i in range(8):
+            f = batcher.encode(seq=0xFFFE + i, timestamp_ms=10 * i, mode=1, batt_mv=4000 - i,
+                               temp_centideg=-i, press_pa=101325, alt_cm=i,
+                               gyro_xyz=(i, 0, -i), acc_xyz=(0, 0, 1000), light=i)
+            if f is not None:
+                frames.append(f)
+        self.assertEqual(len(frames), 2)
+        self.assertEqual(len(frames[0]), 9 + 4 * 31)
+        recs = unpack_telemetry_batch(frames[0]) + unpack_telemetry_batch(frames[1])
+        self.assertEqual([r.seq for r in recs], [0xFFFE, 0xFFFF, 0, 1, 2, 3, 4, 5])
+        self.assertEqual(recs[5].temp_centideg, -5)
+        self.assertEqual(recs[7].gyro_z, -7)
+        bad = bytearray(frames[1])
+        bad[20] ^= 1
+        with self.assertRaises(ValueError):
+            unpack_telemetry_batch(bytes(bad))
+
+    def test_batcher_gaps_never_strand_samples(self):
+        fields = dict(timestamp_ms=0, mode=0, batt_mv=4000, temp_centideg=2500, press_pa=101325,
+                      alt_cm=0, gyro_xyz=(0, 0, 0), acc_xyz=(0, 0, 1000), light=0)
+        for k, seqs in ((1, [0, 1, 5, 6, 9]), (3, [0, 1, 5, 6, 7, 8, 20])):
+            batcher = TelemetryBatcher(k)
+            frames = [f for f in (batcher.encode(seq=q, **fields) for q in seqs) if f]
+            last = batcher.flush()
+            if last:
+                frames.append(last)
+            got = [[r.seq for r in unpack_telemetry_batch(f)] for f in frames]
+            self.assertEqual(sum(got, []), seqs, f"k={k}")
+            self.assertTrue(all(len(g) <= k for g in got))
+        # k == 1: each sample goes out on its own call, nothing left to flush
+        batcher = TelemetryBatcher(1)
+        self.assertIsNotNone(batcher.encode(seq=0, **fields))
+        self.assertIsNotNone(batcher.encode(seq=7, **fields))
+        self.assertIsNone(batcher.flush())
+
+    def test_deframer_splits_resyncs_and_rejects_bad_crc(self):
+        fields = dict(mode=0, batt_mv=4000, temp_centideg=2500, press_pa=101325, alt_cm=10,
+                      gyro_xyz=(1, 2, 3), acc_xyz=(4, 5, 6), light=7)
+        enc = TelemetryDeltaEncoder(keyframe_interval=4)
+        batcher = TelemetryBatcher(3)
+        frames = [enc.encode(seq=i, timestamp_ms=1000 + i, **fields) for i in range(8)]
+        frames += [f for f in (batcher.encode(seq=100 + i, timestamp_ms=i, **fields) for i in range(6)) if f]
+        frames.append(pack_command(1, 2, seq=5))
+        corrupt = bytearray(frames[0])
+        corrupt[10] ^= 0xFF
+        # garbage, a stray preamble, a corrupted frame and a lone 0xAA between good frames
+        stream = b"\x00junk\xaa\x55\x01" + frames[0] + b"\xaa"
+        for f in frames[1:]:
+            stream += f + b"\xaa\x55\xff" + bytes(corrupt)
+        expected = list(frames)
+
+        for size in (1, 7, 40, 1500):
+            d = Deframer()
+            got = []
+            for i in range(0, len(stream), size):
+                got.extend(bytes(v) for v in d.feed(stream[i:i + size]))
+            self.assertEqual(got, expected, f"chunk size {size}")
+        self.assertEqual(d.frames_out, len(expected))
+        self.assertEqual(d.crc_errors, len(frames) - 1)
+        self.assertGreater(d.skipped, 0)
+        self.assertEqual(d.bytes_in, len(stream))
+
+    def test_deframer_reads_in_place_across_compaction(self):
+        frame = pack_telemetry(1, 2, 0, 3, 4, 5, 6, (0, 0, 0), (0, 0, 0), 9)
+        d = Deframer(2 * STREAM_MAX_FRAME)
+        total = 0
+        for _ in range(2000):
+            w = d.writable()
+            n = min(len(w), len(frame))
+            w[:n] = frame[:n]
+            d.commit(n)
+            total += len(list(d.frames()))
+            if n < len(frame):
+                w = d.writable()
+                w[:len(frame) - n] = frame[n:]
+                d.commit(len(frame) - n)
+                total += len(list(d.frames()))
+        self.assertEqual(total, 2000)
+        self.assertEqual(d.pending, 0)
+
 if __name__ == '__main__':
     unittest.main()
-
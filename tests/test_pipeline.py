@@ -0,0 +1,70 @@
+import contextlib
+import io
+import socket
+import time
+import unittest
+from sat_sim.packet import pack_telemetry
+from ground.pipeline import DecodePipeline
+
+def frame(i):
+    return pack_telemetry(seq=i, timestamp_ms=i, mode=0, batt_mv=4000, temp_centideg=2500,
+                          press_pa=101325, alt_cm=0, gyro_xyz=(0, 0, 0), acc_xyz=(0, 0, 1000), light=0)
+
+class DecodePipelineTest(unittest.TestCase):
+    def test_batches_come_back_in_receive_order(self):
+        rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        rx.bind(("127.0.0.1", 0))
+        pipe = DecodePipeline(rx, workers=2, max_batch=8, flush_ms=5)
+        try:
+            tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            for i in range(40):
+                tx.sendto(frame(i), rx.getsockname())
+                if i == 20:
+                    tx.sendto(b"\xAA\x55junk" * 8, rx.getsockname())
+            tx.close()
+            got = []
+            while len(got) < 41:
+                batch = pipe.poll(5.0)
+                self.assertTrue(batch, "pipeline stalled")
+                got.extend(batch)
+            seqs = [row["seq"] if row else None for _data, _addr, row in got]
+            self.assertEqual(seqs, list(range(21)) + [None] + list(range(21, 40)))
+            self.assertEqual(len(got[0][0]), 40)
+        finally:
+            pipe.close()
+            rx.close()
+
+    def test_dead_worker_marks_batch_bad_and_recovers(self):
+        rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        rx.bind(("127.0.0.1", 0))
+        pipe = DecodePipeline(rx, workers=1, max_batch=4, flush_ms=5, slots=2)
+        tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+        def send_and_collect(seqs):
+            for i in seqs:
+                tx.sendto(frame(i), rx.getsockname())
+            got = []
+            while len(got) < len(seqs):
+                batch = pipe.poll(5.0)
+                self.assertTrue(batch, "pipeline stalled")
+                got.extend(batch)
+            return [row["seq"] if row else None for _data, _addr, row in got]
+
+        try:
+            self.assertEqual(send_and_collect(range(4)), [0, 1, 2, 3])
+            for p in pipe.pool._processes.values():
+                p.kill()
+            time.sleep(0.2)
+            with contextlib.redirect_stdout(io.StringIO()):
+                seqs = send_and_collect(range(4, 8))
+                # either the dead pool took the batch down (all bad) or it was replaced first
+                self.assertIn(seqs, ([None] * 4, [4, 5, 6, 7]))
+                self.assertEqual(send_and_collect(range(8, 16)), list(range(8, 16)))
+            self.assertEqual(pipe.respawns, 1)
+        finally:
+            tx.close()
+            pipe.close()
+            rx.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import tempfile
+import unittest
+from ground.pubsub import LivePublisher, LiveSubscriber
+from sat_sim.packet import pack_telemetry
+
+def frame(seq):
+    return pack_telemetry(seq=seq, timestamp_ms=1000 + seq, mode=1, batt_mv=3900,
+                          temp_centideg=2150, press_pa=101325, alt_cm=5000,
+                          gyro_xyz=(1, 2, 3), acc_xyz=(4, 5, 6), light=700)
+
+class LivePubSubTest(unittest.TestCase):
+    def test_fanout_to_several_viewers(self):
+        path = os.path.join(tempfile.mkdtemp(), "live.sock")
+        pub = LivePublisher(path)
+        subs = [LiveSubscriber(path) for _ in range(3)]
+        pub.flush()   # picks up the SUBs
+        self.assertEqual(len(pub.subscribers), 3)
+        for seq in range(5):
+            pub.publish(frame(seq), 42)
+        pub.flush()
+        for sub in subs:
+            recs = sub.recv(1.0)
+            self.assertEqual([r.seq for _ts, r in recs], list(range(5)))
+            self.assertEqual(recs[0][0], 42)
+            self.assertEqual(recs[0][1].press_pa, 101325)
+
+        # a viewer that left is dropped without disturbing the others
+        subs[0].close()
+        pub.publish(frame(5), 43)
+        pub.flush()
+        self.assertEqual(len(pub.subscribers), 2)
+        self.assertEqual(subs[1].recv(1.0)[0][1].seq, 5)
+        for sub in subs[1:]:
+            sub.close()
+        pub.close()
+        self.assertFalse(os.path.exists(path))
+
+if __name__ == "__main__":
+    unittest.main()
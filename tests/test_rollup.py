@@ -0,0 +1,53 @@
+import tempfile
+import unittest
+from ground.rollup import ROLLUP_FIELDS, Rollup, pick_resolution, query, summary
+
+def row(batt_mv):
+    r = {k: 0 for k in ROLLUP_FIELDS}
+    r["batt_mv"] = batt_mv
+    return r
+
+class RollupTest(unittest.TestCase):
+    def test_cascade_and_coarsest_resolution(self):
+        with tempfile.TemporaryDirectory() as d:
+            r = Rollup(d)
+            t0 = 3_600_000 * 1000
+            # 2 h at 10 Hz, battery draining 1 mV per second
+            for i in range(2 * 3600 * 10):
+                r.add(row(4000 - i // 10), t0 + i * 100)
+            r.close()
+
+            self.assertEqual(pick_resolution(60_000), 60_000)
+            self.assertEqual(pick_resolution(7_200_000), 3_600_000)
+            self.assertEqual(pick_resolution(1_500), 1_000)
+
+            hours = query(d, t0, t0 + 7_200_000 - 1, 3_600_000, ["batt_mv"])
+            self.assertEqual([h["count"] for h in hours], [36000, 36000])
+            self.assertEqual(hours[0]["batt_mv"]["max"], 4000)
+            self.assertEqual(hours[0]["batt_mv"]["min"], 4000 - 3599)
+            self.assertAlmostEqual(hours[0]["batt_mv"]["mean"], 4000 - 3599 / 2, places=1)
+            self.assertEqual(hours[1]["batt_mv"]["last"], 4000 - 7199)
+
+            # the dashboard's trend: one aggregate over the last hour from minute buckets
+            last_hour = summary(d, t0 + 3_600_000, t0 + 7_200_000 - 1, 60_000, ["batt_mv"])
+            self.assertEqual(last_hour["count"], 36000)
+            self.assertEqual((last_hour["batt_mv"]["min"], last_hour["batt_mv"]["max"]), (4000 - 7199, 4000 - 3600))
+            self.assertIsNone(summary(d, 0, t0 - 1, 60_000))
+
+            # a 10-minute window in 5-minute steps comes from the minute file
+            steps = query(d, t0 + 600_000, t0 + 1_199_999, 300_000, ["batt_mv"])
+            self.assertEqual([s["start_ms"] - t0 for s in steps], [600_000, 900_000])
+            self.assertEqual(steps[0]["batt_mv"]["max"], 4000 - 600)
+
+            # a restart within the same second appends a second bucket; reads merge it
+            r = Rollup(d)
+            r.add(row(1), t0 + 7_200_000)
+            r.close()
+            r = Rollup(d)
+            r.add(row(3), t0 + 7_200_500)
+            r.close()
+            (sec,) = query(d, t0 + 7_200_000, t0 + 7_200_999, 1_000, ["batt_mv"])
+            self.assertEqual((sec["count"], sec["batt_mv"]["mean"]), (2, 2))
+
+if __name__ == "__main__":
+    unittest.main()
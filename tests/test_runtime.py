@@ -0,0 +1,124 @@
+import contextlib
+import io
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+import unittest
+from sat_sim.clock import WallClock
+from sat_sim.fsm import CubeSatFSM
+from sat_sim import runtime as sat_runtime
+from sat_sim import main as sim_main
+from sat_sim.packet import pack_command, pack_telemetry, unpack_telemetry_batch
+from sat_sim.runtime import SatRuntime, TelemetryTask
+from sat_sim.sensors import SensorSimulator
+
+def make_runtime(period_s, port=0, emit=None):
+    clock = WallClock()
+    rng = random.Random(1)
+    task = TelemetryTask({}, clock, SensorSimulator({}, clock, rng), CubeSatFSM(), pack_telemetry,
+                         emit or (lambda frame, ts: None), rng, verbose=False)
+    return SatRuntime(task, period_s, port=port, status_interval_s=0)
+
+class RuntimeTest(unittest.TestCase):
+    def test_command_handled_between_slow_ticks(self):
+        rt = make_runtime(1.0)
+        applied = []
+        fsm = rt.telemetry.fsm
+        apply = fsm.apply_command
+        fsm.apply_command = lambda cmd_id, param: (applied.append(time.perf_counter()), apply(cmd_id, param))[1]
+        th = threading.Thread(target=rt.run)
+        th.start()
+        try:
+            time.sleep(0.1)   # first tick done, next one 0.9 s away
+            tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sent = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                tx.sendto(pack_command(CubeSatFSM.CMD_PING, 0, seq=1), rt.address)
+                tx.sendto(b"\x00" * 4, rt.address)   # invalid: ignored, loop carries on
+                while not applied and time.perf_counter() - sent < 0.5:
+                    time.sleep(0.001)
+            tx.close()
+            self.assertEqual(len(applied), 1)        # applied once, not once per parse
+            self.assertLess(applied[0] - sent, 0.1)
+        finally:
+            t0 = time.perf_counter()
+            rt.stop()
+            th.join(2)
+            self.assertLess(time.perf_counter() - t0, 0.2)
+            rt.close()
+        self.assertEqual(rt.ticks, 1)
+        self.assertEqual(rt.commands, 2)
+        self.assertEqual(rt.timer.snapshot()["lifetime"]["cmd"]["count"], 2)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "SO_TIMESTAMPNS is Linux-only")
+    def test_command_latency_uses_kernel_stamp(self):
+        stamps = []
+        read = sat_runtime.rx_timestamp_ns
+        sat_runtime.rx_timestamp_ns = lambda anc: stamps.append(read(anc)) or stamps[-1]
+        rt = make_runtime(1.0)
+        rt.on_command = lambda data, addr: None
+        th = threading.Thread(target=rt.run)
+        th.start()
+        try:
+            tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sent = time.time_ns()
+            tx.sendto(pack_command(CubeSatFSM.CMD_PING, 0, seq=1), rt.address)
+            tx.close()
+            deadline = time.monotonic() + 1.0
+            while rt.commands < 1 and time.monotonic() < deadline:
+                time.sleep(0.001)
+        finally:
+            rt.stop()
+            th.join(2)
+            rt.close()
+            sat_runtime.rx_timestamp_ns = read
+        self.assertEqual(len(stamps), 1)
+        self.assertIsNotNone(stamps[0])
+        self.assertLess(abs(stamps[0] - sent), 100_000_000)   # kernel wall clock, near the send
+
+    def test_deadlines_do_not_drift(self):
+        # each tick costs ~0.5 ms; a sleep-after-send loop would take ~50 ms longer
+        rt = make_runtime(0.002, port=None, emit=lambda frame, ts: time.sleep(0.0005))
+        t0 = time.monotonic()
+        rt.run(samples=100)
+        elapsed = time.monotonic() - t0
+        rt.close()
+        self.assertLess(elapsed, 100 * 0.002 + 0.03)
+        self.assertGreaterEqual(elapsed, 99 * 0.002)
+        self.assertEqual(rt.timer.snapshot()["lifetime"]["jitter"]["count"], 100)
+
+    def test_live_shutdown_flushes_partial_batch(self):
+        rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        rx.bind(("127.0.0.1", 0))
+        rx.settimeout(0.5)
+        cfg = dict(sim_main.load_config(), udp_port=rx.getsockname()[1], uplink_port=0,
+                   link_transport="udp", telemetry_batch_k=4, telemetry_rate_ms=1,
+                   sim_timing_interval_sec=0, debug_corrupt_prob=0.0)
+
+        class TenTicks(SatRuntime):
+            def run(self, samples=None):
+                return super().run(samples=10)    # then shut down like after SIGTERM
+
+        old = signal.getsignal(signal.SIGTERM)
+        orig, sim_main.SatRuntime = sim_main.SatRuntime, TenTicks
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                sim_main.live(cfg)
+        finally:
+            sim_main.SatRuntime = orig
+            signal.signal(signal.SIGTERM, old)
+        batches = []
+        try:
+            while True:
+                batches.append([r.seq for r in unpack_telemetry_batch(rx.recv(4096))])
+        except socket.timeout:
+            pass
+        rx.close()
+        # two full batches of 4, then the 2 samples still held when the loop stopped
+        self.assertEqual(batches, [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import asyncio
+import contextlib
+import csv
+import glob
+import io
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+import urllib.request
+from sat_sim.packet import pack_telemetry
+from ground.logger import CsvLogger, SourceRouter
+from ground.server import GroundServer, LoggerSink, Sink, SubscriberSink
+from ground.stats_http import StatsEndpoint
+
+def _frame(i):
+    return pack_telemetry(seq=i, timestamp_ms=i, mode=0, batt_mv=4000, temp_centideg=2500,
+                          press_pa=101325, alt_cm=0, gyro_xyz=(0, 0, 0), acc_xyz=(0, 0, 1000), light=0)
+
+class _SlowSink(Sink):
+    name = "slow"
+
+    async def handle(self, batch):
+        await asyncio.sleep(10)
+
+class _SlowRouter:
+    """SourceRouter stand-in whose writes take a while and must not outlive close()."""
+    def __init__(self):
+        self.rows = []
+        self.closed = False
+        self.started = threading.Event()
+
+    def get(self, source):
+        return self
+
+    def write(self, row):
+        self.started.set()
+        time.sleep(0.05)
+        if self.closed:
+            raise ValueError("write to closed router")
+        self.rows.append(row["seq"])
+
+    def poll(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+class GroundServerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_fanout_and_backpressure(self):
+        live = SubscriberSink(maxsize=64)
+        slow = _SlowSink(maxsize=2)
+        server = GroundServer([live, slow])
+        await server.start("127.0.0.1", 0)
+        sub = live.subscribe()
+
+        tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for i in range(5):
+            tx.sendto(_frame(i), server.address)
+        tx.sendto(b"garbage", server.address)
+        tx.close()
+
+        seqs = [(await asyncio.wait_for(sub.get(), 2.0))["seq"] for _ in range(5)]
+        self.assertEqual(seqs, [0, 1, 2, 3, 4])
+        await asyncio.sleep(0.05)
+        snap = server.stats.snapshot()
+        self.assertEqual((snap["total_good"], snap["total_bad"], snap["sources"]), (5, 1, 1))
+        # slow sink holds one batch in handle() and 2 queued; the rest are dropped
+        self.assertGreater(slow.dropped, 0)
+        await server.stop(drain_timeout=0.1)
+
+    async def test_stop_waits_for_in_flight_logger_write(self):
+        router = _SlowRouter()
+        sink = LoggerSink("slow", router)
+        server = GroundServer([sink])
+        await server.start("127.0.0.1", 0)
+        tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for i in range(4):
+            tx.sendto(_frame(i), server.address)
+        tx.close()
+        await asyncio.to_thread(router.started.wait, 2.0)
+        # the drain times out mid-batch: the task is cancelled while its thread still writes
+        await server.stop(drain_timeout=0.01)
+        self.assertTrue(router.closed)
+        self.assertEqual(router.rows[:1], [0])      # the cut-off write finished, then close()
+        self.assertEqual(router.rows, sorted(router.rows))
+
+    async def test_per_source_logs_only_for_good_sources(self):
+        with tempfile.TemporaryDirectory() as d:
+            router = SourceRouter(lambda tag: CsvLogger(d, tag=tag), per_source=True)
+            server = GroundServer([LoggerSink("csv", router)])
+            await server.start("127.0.0.1", 0)
+            sats = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(2)]
+            junk = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            with contextlib.redirect_stdout(io.StringIO()):
+                for i in range(3):
+                    for n, tx in enumerate(sats):
+                        tx.sendto(_frame(10 * n + i), server.address)
+                    junk.sendto(b"\x00" * 40, server.address)
+                for _ in range(200):
+                    if server.stats.snapshot()["total_good"] + server.stats.snapshot()["total_bad"] == 9:
+                        break
+                    await asyncio.sleep(0.01)
+            await server.stop()
+            tags = {f"127.0.0.1_{tx.getsockname()[1]}" for tx in sats}
+            files = {os.path.basename(p).rsplit("_", 1)[0][len("telemetry_"):]: p
+                     for p in glob.glob(os.path.join(d, "telemetry_*.csv"))}
+            self.assertEqual(set(files), tags)     # none for the junk sender
+            for n, tx in enumerate(sats):
+                with open(files[f"127.0.0.1_{tx.getsockname()[1]}"], newline="") as f:
+                    seqs = [r["seq"] for r in csv.DictReader(f)]
+                self.assertEqual(seqs, [str(10 * n + i) for i in range(3)])
+            snap = server.stats.snapshot()
+            self.assertEqual((snap["sources"], snap["bad_unknown_source"]), (2, 3))
+            for tx in sats + [junk]:
+                tx.close()
+
+    async def test_metrics_endpoint(self):
+        live = SubscriberSink(maxsize=64)
+        server = GroundServer([live])
+        await server.start("127.0.0.1", 0)
+        ep = StatsEndpoint("127.0.0.1", 0)
+        sub = live.subscribe()
+        try:
+            tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            for i in range(3):
+                tx.sendto(_frame(i), server.address)
+            tx.close()
+            for _ in range(3):
+                await asyncio.wait_for(sub.get(), 2.0)
+            await asyncio.sleep(0.05)
+            ep.publish_text(server.metrics_text(), "/metrics", "text/plain; version=0.0.4; charset=utf-8")
+            url = f"http://127.0.0.1:{ep.address[1]}/metrics"
+            text = await asyncio.to_thread(lambda: urllib.request.urlopen(url, timeout=5).read().decode())
+        finally:
+            ep.close()
+            await server.stop(drain_timeout=0.5)
+        self.assertIn('cubesat_frames_total{result="good"} 3', text)
+        self.assertIn('cubesat_sink_delivered_total{sink="live"} 3', text)
+        self.assertIn('cubesat_sink_dropped_total{sink="live"} 0', text)
+        self.assertIn("# TYPE cubesat_sink_queue_depth gauge", text)
+        self.assertIn('cubesat_stage_latency_seconds_count{stage="decode"} 3', text)
+
+if __name__ == "__main__":
+    unittest.main()
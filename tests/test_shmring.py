@@ -0,0 +1,104 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from multiprocessing import shared_memory
+from ground.shmring import RING_HEADER, RING_FORMAT_VERSION, RING_MAGIC, RingWriter
+from ground.logger import SEG_RECORD_LEN
+from sat_sim.packet import pack_telemetry
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def frame(seq):
+    return pack_telemetry(seq=seq, timestamp_ms=1000 + seq, mode=1, batt_mv=3900,
+                          temp_centideg=2150, press_pa=101325, alt_cm=5000,
+                          gyro_xyz=(1, 2, 3), acc_xyz=(4, 5, 6), light=700)
+
+@unittest.skipIf(numpy is None, "numpy not installed")
+class ShmRingTest(unittest.TestCase):
+    def test_window_wraps_and_detects_lapping(self):
+        from ground.shmring import RingReader
+        w = RingWriter(f"cubesat_test_ring_{os.getpid()}", capacity=8)
+        r = RingReader(w.name)
+        self.assertEqual(len(r.latest()), 0)
+        for seq in range(11):
+            w.write(frame(seq), 5000 + seq)
+
+        recs = r.latest()
+        self.assertEqual(list(recs["frame"]["seq"]), list(range(3, 11)))
+        self.assertEqual(list(r.since(5009)["ground_ts_ms"]), [5009, 5010])
+
+        lo, (older, newer) = r.views(4)
+        self.assertEqual(list(older["frame"]["seq"]) + list(newer["frame"]["seq"]), [7, 8, 9, 10])
+        self.assertTrue(r.valid(lo))
+        for seq in range(11, 16):
+            w.write(frame(seq))
+        self.assertFalse(r.valid(lo))   # slot of seq 7 was reused
+        del older, newer
+        r.close()
+        w.close()
+
+class TakeoverTest(unittest.TestCase):
+    def setUp(self):
+        self.name = f"cubesat_test_takeover_{os.getpid()}"
+
+    def leftover(self, magic=RING_MAGIC, pid=0, head=0):
+        shm = shared_memory.SharedMemory(name=self.name, create=True, size=RING_HEADER.size + 8 * SEG_RECORD_LEN)
+        RING_HEADER.pack_into(shm.buf, 0, magic, RING_FORMAT_VERSION, SEG_RECORD_LEN, 8, pid, head, head)
+        shm.close()
+
+    def takeover(self, **kw):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            w = RingWriter(self.name, capacity=8, **kw)
+        w.write(frame(0))
+        w.close()
+        return out.getvalue()
+
+    def test_replaces_foreign_block(self):
+        self.leftover(magic=b"XXXX")
+        self.assertIn("unsupported ring", self.takeover())
+
+    def test_replaces_ring_of_dead_owner(self):
+        p = subprocess.Popen([sys.executable, "-c", "pass"])
+        p.wait()
+        self.leftover(pid=p.pid, head=42)
+        t0 = time.monotonic()
+        self.assertIn(f"owner pid {p.pid} is gone", self.takeover(stale_after_s=5))
+        self.assertLess(time.monotonic() - t0, 1)     # no need to watch the head
+
+    def test_replaces_ring_that_stopped_advancing(self):
+        self.leftover(pid=os.getpid(), head=42)
+        self.assertIn("head idle", self.takeover(stale_after_s=0.1))
+
+    def test_refuses_live_ring(self):
+        live = RingWriter(self.name, capacity=8)
+        stop = threading.Event()
+
+        def feed():
+            seq = 0
+            while not stop.is_set():
+                live.write(frame(seq & 0xFFFF))
+                seq += 1
+                time.sleep(0.01)
+
+        t = threading.Thread(target=feed)
+        t.start()
+        try:
+            with self.assertRaisesRegex(FileExistsError, "another ground station"):
+                RingWriter(self.name, capacity=8, stale_after_s=0.3)
+        finally:
+            stop.set()
+            t.join()
+        head = live.head
+        self.assertEqual(RING_HEADER.unpack_from(live.buf, 0)[5], head)   # untouched
+        live.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import socket
+from ground.stats import FleetStats, StatsTracker
+from ground.stats_http import StatsEndpoint, fetch
+from sat_sim.timing import hist_index, hist_value
+
+class StatsTrackerTest(unittest.TestCase):
+    def test_wrap_gap_reorder_duplicate(self):
+        t = StatsTracker()
+        now = 1000.0
+        for seq in (65533, 65534, 65535, 0, 1, 3, 2, 2, 6):
+            t.note_good(seq, now=now)
+        snap = t.snapshot(now)
+        # 4 and 5 lost; 2 arrived late once and then again as a duplicate
+        self.assertEqual((snap["seq_loss"], snap["reordered"], snap["duplicates"]), (2, 1, 1))
+        self.assertEqual(snap["windows"]["10s"]["lost"], 2)
+        self.assertEqual(snap["loss_pct"], 20.0)    # 2 of 10 expected
+        # a counter reset is a restart, not 60k lost frames
+        t.note_good(40000, now=now)
+        self.assertEqual((t.seq_loss, t.restarts), (2, 1))
+
+    def test_late_frame_after_long_gap(self):
+        t = StatsTracker()
+        for seq in range(6):
+            t.note_good(seq, now=1000.0)
+        t.note_good(1030, now=1000.0)      # 1024 lost; 1029 shares a slot with 5
+        t.note_good(1029, now=1000.0)
+        t.note_good(1029, now=1000.0)
+        self.assertEqual((t.seq_loss, t.reordered, t.duplicates), (1023, 1, 1))
+
+    def test_windows_expire_and_latency(self):
+        t = StatsTracker(windows=(10, 60))
+        for i in range(600):
+            now = 2000 + i * 0.1          # 10 Hz for a minute
+            sat_ms = int(now * 1000) - 25 - (i % 2) * 10
+            t.note_good(i, sat_ms, now=now)
+        snap = t.snapshot(2059.99)
+        self.assertAlmostEqual(snap["windows"]["10s"]["rate_pps"], 10.0, delta=1.0)
+        self.assertEqual(snap["windows"]["60s"]["good"], 600)
+        self.assertAlmostEqual(snap["windows"]["10s"]["jitter_ms"], 10, delta=1)
+        lat = snap["windows"]["10s"]["latency_ms"]
+        self.assertTrue(24 <= lat["p50"] <= 37 and 34 <= lat["p99"] <= 37, lat)
+        self.assertEqual(t.snapshot(2200.0)["windows"]["60s"]["good"], 0)
+
+    def test_histogram_buckets(self):
+        for v in (0, 7, 15, 16, 100, 1234, 10**6):
+            hv = hist_value(hist_index(v))
+            self.assertTrue(v <= hv <= v * 1.07 + 1, (v, hv))
+
+    def test_fleet_merges_windows(self):
+        f = FleetStats(windows=(10,))
+        for i in range(10):
+            f.note_good(("a", 1), i, now=100.0)
+            f.note_good(("b", 1), i * 2, now=100.0)
+        snap = f.snapshot(100.5)
+        self.assertEqual((snap["sources"], snap["windows"]["10s"]["good"], snap["seq_loss"]), (2, 20, 9))
+
+    def test_junk_sources_get_no_tracker(self):
+        f = FleetStats(windows=(10,))
+        for port in range(1000):
+            f.note_bad(("10.0.0.9", port), now=100.0)
+        f.note_good(("a", 1), 0, now=100.0)
+        f.note_bad(("a", 1), now=100.0)       # a known source keeps its own count
+        snap = f.snapshot(100.5)
+        self.assertEqual(list(f.trackers), [("a", 1)])
+        self.assertEqual((snap["sources"], snap["total_bad"], snap["bad_unknown_source"]), (1, 1001, 1000))
+        self.assertEqual(snap["windows"]["10s"]["bad"], 1001)
+        self.assertEqual(f.per_source(100.5)["a_1"]["total_bad"], 1)
+
+class FetchTest(unittest.TestCase):
+    def test_reads_what_the_ground_publishes(self):
+        f = FleetStats()
+        f.note_good(("a", 1), 1, now=100.0)
+        f.note_good(("b", 1), 7, now=100.0)
+        ep = StatsEndpoint("127.0.0.1", 0)
+        try:
+            ep.publish({"link": f.snapshot(100.5)})
+            link = fetch(ep.address)["link"]
+        finally:
+            ep.close()
+        self.assertEqual((link["sources"], link["total_good"], link["seq_loss"]), (2, 2, 0))
+        self.assertIn("10s", link["windows"])
+
+    def test_nobody_listening(self):
+        s = socket.socket()
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+        s.close()
+        self.assertIsNone(fetch(("127.0.0.1", port)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import unittest
+from ground.stream_rx import StreamReceiver
+from sat_sim.link import StreamSender
+from sat_sim.packet import pack_telemetry, unpack_telemetry
+
+def frame(seq):
+    return pack_telemetry(seq, 1000 + seq, 0, 4000, 2500, 101325, 10, (1, 2, 3), (4, 5, 6), 7)
+
+def drain(rx, want, rounds=50):
+    got = []
+    for _ in range(rounds):
+        if len(got) >= want:
+            break
+        if rx.recv_batch(0.1):
+            got.extend(unpack_telemetry(v).seq for v, _addr in rx.frames())
+    return got
+
+class StreamReceiverTest(unittest.TestCase):
+    def test_tcp_stream(self):
+        rx = StreamReceiver("127.0.0.1", 0)
+        tx = StreamSender(*rx.address)
+        try:
+            # one write carrying many frames, then one frame split over writes
+            tx.send(b"".join(frame(i) for i in range(100)))
+            tx.send(frame(100)[:15])
+            got = drain(rx, 100)
+            tx.send(frame(100)[15:])
+            got += drain(rx, 1)
+            self.assertEqual(got, list(range(101)))
+            self.assertEqual(rx.connections, 1)
+            tx.close()
+            rx.recv_batch(0.1)   # EOF closes the stream
+            snap = rx.snapshot()
+            self.assertEqual((snap["streams"], snap["frames"], snap["crc_errors"]), (0, 101, 0))
+        finally:
+            tx.close()
+            rx.close()
+
+    def test_serial_pty(self):
+        master, slave = os.openpty()
+        path = os.ttyname(slave)
+        rx = StreamReceiver(devices=[(path, 115200)])
+        try:
+            for i in range(20):
+                os.write(master, b"\x00\xff" + frame(i))
+            got = drain(rx, 20)
+            self.assertEqual(got, list(range(20)))
+            self.assertEqual(rx.snapshot()["skipped"], 40)
+        finally:
+            rx.close()
+            os.close(master)
+            os.close(slave)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import json
+import unittest
+import urllib.request
+from ground.stats_http import StatsEndpoint, parse_addr
+from sat_sim.timing import StageTimer
+
+class StageTimerTest(unittest.TestCase):
+    def test_interval_and_lifetime(self):
+        t = StageTimer()
+        for us in range(1, 101):
+            t.record("decode", us * 1000)
+        snap = t.snapshot(reset_interval=True)
+        d = snap["interval"]["decode"]
+        self.assertEqual((d["count"], d["mean_us"]), (100, 50.5))
+        self.assertTrue(50 <= d["p50"] <= 53 and 99 <= d["p99"] <= 103, d)
+        t.record("decode", 5000)
+        snap = t.snapshot()
+        self.assertEqual(snap["interval"]["decode"]["count"], 1)
+        self.assertEqual(snap["lifetime"]["decode"]["count"], 101)
+        self.assertIn("decode p50/p99=", t.status())
+
+    def test_endpoint_serves_latest_doc(self):
+        self.assertEqual(parse_addr("8765"), ("127.0.0.1", 8765))
+        self.assertIsNone(parse_addr(None))
+        ep = StatsEndpoint("127.0.0.1", 0)
+        try:
+            ep.publish({"link": {"total_good": 3}})
+            url = f"http://127.0.0.1:{ep.address[1]}/stats"
+            with urllib.request.urlopen(url, timeout=2) as r:
+                self.assertEqual(json.load(r)["link"]["total_good"], 3)
+        finally:
+            ep.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,497 @@
+"""
+Benchmark suite: codec, ground decode/log path and sat -> ground loopback.
+
+Micro-benchmarks time one call of each hot function (CRC, pack/unpack,
+datagram decode, command frames, logger writes) over several rounds of
+auto-calibrated length and report the median and best ns/op. The loopback
+benchmark runs the real ground.ground receive loop in a child process
+(own UDP port, temp log dir) and drives it from sat_sim sensors + FSM +
+UDPSender at increasing frame rates, reading received/lost counts and
+latency from its stats endpoint.
+
+Results go to one JSON file per run (commit, interpreter and host in
+"meta"), so runs from different commits can be compared:
+
+    PYTHONPATH=. python tools/bench.py run                     # -> bench_results/<commit>.json
+    PYTHONPATH=. python tools/bench.py run --filter codec --no-loopback
+    PYTHONPATH=. python tools/bench.py run --compare bench_results/abc1234.json
+    PYTHONPATH=. python tools/bench.py compare OLD.json NEW.json [--threshold 10]
+
+compare exits 1 when a benchmark got slower than --threshold percent.
+A new optimization gets measured by adding a @bench function here.
+"""
+import argparse, json, multiprocessing as mp, os, platform, shutil, socket, statistics
+import subprocess, sys, tempfile, time, urllib.request
+
+from sat_sim.packet import (
+    crc16_x25, crc16_x25_many, pack_command, pack_telemetry, pack_telemetry_into,
+    unpack_command, unpack_frame, unpack_telemetry, TM_FRAME_LEN,
+)
+
+RESULTS_DIR = "bench_results"
+BENCHES = []          # (name, setup, items per call, unit)
+_CLOSERS = []         # loggers opened by setups, closed before the loopback runs
+
+
+def bench(name: str, items: int = 1, unit: str = "op"):
+    """
+    Register setup(tmp_dir) -> zero-argument callable (or (callable, items)
+    when the count is only known after setup); `items` units per call.
+    unit "B" benchmarks also report MB/s.
+    """
+    def register(setup):
+        BENCHES.append((name, setup, items, unit))
+        return setup
+    return register
+
+
+def _frame(seq: int = 1) -> bytes:
+    return pack_telemetry(seq=seq, timestamp_ms=123456, mode=0, batt_mv=3987, temp_centideg=2345,
+                          press_pa=101325, alt_cm=1200, gyro_xyz=(12, -34, 56),
+                          acc_xyz=(-3, 7, 1001), light=512)
+
+
+def _row() -> dict:
+    from ground.decode import decode_datagram
+    return decode_datagram(_frame())
+
+
+# ---------------- codec
+@bench("codec.crc16_x25")
+def _(tmp):
+    data = _frame()[2:-2]
+    return lambda: crc16_x25(data)
+
+@bench("codec.crc16_x25_many", items=256)
+def _(tmp):
+    frames = [_frame(i)[2:-2] for i in range(256)]
+    return lambda: crc16_x25_many(frames)
+
+@bench("codec.pack_telemetry")
+def _(tmp):
+    return lambda: pack_telemetry(1, 123456, 0, 3987, 2345, 101325, 1200, (12, -34, 56), (-3, 7, 1001), 512)
+
+@bench("codec.pack_telemetry_into")
+def _(tmp):
+    buf = bytearray(TM_FRAME_LEN)
+    return lambda: pack_telemetry_into(buf, 0, 1, 123456, 0, 3987, 2345, 101325, 1200,
+                                       (12, -34, 56), (-3, 7, 1001), 512)
+
+@bench("codec.unpack_telemetry")
+def _(tmp):
+    frame = _frame()
+    return lambda: unpack_telemetry(frame)
+
+@bench("codec.unpack_frame")
+def _(tmp):
+    frame = _frame()
+    return lambda: unpack_frame(frame)
+
+@bench("codec.pack_command")
+def _(tmp):
+    return lambda: pack_command(1, 2, seq=7)
+
+@bench("codec.unpack_command")
+def _(tmp):
+    frame = pack_command(1, 2, seq=7)
+    return lambda: unpack_command(frame)
+
+
+# ---------------- simulator
+@bench("sim.sensor_step")
+def _(tmp):
+    from sat_sim.clock import VirtualClock
+    from sat_sim.sensors import SensorSimulator
+    clock = VirtualClock()
+    sim = SensorSimulator({"sim_seed": 1}, clock=clock)
+
+    def fn():
+        clock.sleep(0.5)
+        sim.step()
+    return fn
+
+@bench("sim.fleet_frames", items=1000 * 10)
+def _(tmp):
+    import numpy as np
+    from sat_sim.fleet import FleetSimulator
+    from sat_sim.packet_np import TM_DTYPE
+    fleet = FleetSimulator(1000, {"fleet_sim": {"phase_s": {"min": 0, "max": 3600}}}, seed=1)
+    out = np.empty((10, 1000), dtype=TM_DTYPE)
+    return lambda: fleet.frames(10, out)
+
+
+# ---------------- ground decode
+@bench("ground.decode_datagram")
+def _(tmp):
+    from ground.decode import decode_datagram
+    frame = _frame()
+    return lambda: decode_datagram(frame)
+
+@bench("ground.stream_decode")
+def _(tmp):
+    from ground.decode import StreamDecoder
+    dec, frame = StreamDecoder(), _frame()
+    return lambda: dec.decode(frame, ("127.0.0.1", 1))
+
+@bench("ground.bulk_decode_many", items=4096)
+def _(tmp):
+    from ground.bulk import decode_many
+    buf = b"".join(_frame(i) for i in range(4096))
+    return lambda: decode_many(buf)
+
+
+# ---------------- byte-stream links (MB/s)
+def _stream_bytes() -> bytes:
+    """Keyframes, delta and batch frames with some line noise between them."""
+    from sat_sim.packet import TelemetryBatcher, TelemetryDeltaEncoder
+    fields = dict(mode=0, batt_mv=3987, temp_centideg=2345, press_pa=101325, alt_cm=1200,
+                  gyro_xyz=(12, -34, 56), acc_xyz=(-3, 7, 1001), light=512)
+    enc, batcher = TelemetryDeltaEncoder(20), TelemetryBatcher(16)
+    parts = []
+    for i in range(2048):
+        parts.append(enc.encode(seq=i, timestamp_ms=i, **fields))
+        b = batcher.encode(seq=i, timestamp_ms=i, **fields)
+        if b:
+            parts.append(b)
+        if i % 97 == 0:
+            parts.append(b"\x00\xaa\x13\x37")
+    return b"".join(parts)
+
+@bench("stream.deframe", unit="B")
+def _(tmp):
+    from sat_sim.packet import Deframer
+    data = _stream_bytes()
+    chunks = [data[i:i + 1460] for i in range(0, len(data), 1460)]   # TCP-segment sized reads
+    d = Deframer()
+
+    def run():
+        for c in chunks:
+            for _ in d.feed(c):
+                pass
+    return run, len(data)
+
+@bench("stream.tcp_receive", unit="B")
+def _(tmp):
+    from ground.stream_rx import StreamReceiver
+    from sat_sim.link import StreamSender
+    data = _stream_bytes()[:32768]
+    rx = StreamReceiver("127.0.0.1", 0)
+    tx = StreamSender(*rx.address)
+    _CLOSERS.extend((tx.close, rx.close))
+    tx.send(b"")
+    while not rx.connections:
+        rx.recv_batch(0.1)
+
+    def run():
+        tx.send(data)
+        want = rx.snapshot()["bytes_in"] + len(data)
+        while rx.snapshot()["bytes_in"] < want:
+            rx.recv_batch(1.0)
+    return run, len(data)
+
+
+# ---------------- loggers (group-commit settings from config.json)
+def _logger_setup(tmp, ext):
+    from ground.ground import load_config, make_loggers
+    cfg = dict(load_config(), ground_log_csv=ext == "csv", ground_log_jsonl=ext == "jsonl",
+               ground_log_bin=ext == "bin", ground_per_source_logs=False)
+    router = [r for r in make_loggers(cfg, os.path.join(tmp, ext)) if r][0]
+    _CLOSERS.append(router.close)
+    return router.get(None)
+
+@bench("logger.csv_write")
+def _(tmp):
+    log, row = _logger_setup(tmp, "csv"), _row()
+    return lambda: log.write(row)
+
+@bench("logger.jsonl_write")
+def _(tmp):
+    log, row = _logger_setup(tmp, "jsonl"), _row()
+    return lambda: log.write(row)
+
+@bench("logger.bin_write_frame")
+def _(tmp):
+    log, frame = _logger_setup(tmp, "bin"), _frame()
+    return lambda: log.write_frame(frame)
+
+
+def measure(fn, items: int = 1, rounds: int = 7, min_time: float = 0.1, unit: str = "op") -> dict:
+    """ns per item over `rounds` rounds of at least `min_time` s each."""
+    clock = time.perf_counter_ns
+    number = 1
+    while True:                      # calibrate: calls per round
+        t0 = clock()
+        for _ in range(number):
+            fn()
+        dt = clock() - t0
+        if dt >= min_time * 1e9 / 4 or number >= 1 << 24:
+            break
+        number *= 4
+    number = max(1, int(number * min_time * 1e9 / max(dt, 1)))
+    per = []
+    for _ in range(rounds):
+        t0 = clock()
+        for _ in range(number):
+            fn()
+        per.append((clock() - t0) / (number * items))
+    med = statistics.median(per)
+    out = {
+        "unit": unit,
+        "ns_per_op": round(med, 2),
+        "min_ns": round(min(per), 1),
+        "stdev_pct": round(statistics.stdev(per) / med * 100, 2) if len(per) > 1 else 0.0,
+        "ops_per_s": round(1e9 / med),
+        "rounds": rounds,
+        "calls_per_round": number,
+        "items_per_call": items,
+    }
+    if unit == "B":
+        out["mb_per_s"] = round(1e3 / med, 1)
+    return out
+
+
+# ---------------- loopback
+def _free_port(kind) -> int:
+    with socket.socket(socket.AF_INET, kind) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get_stats(port: int):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=1) as r:
+            return json.load(r)
+    except OSError:
+        return None
+
+
+def loopback(rate_pps: float, duration: float, tmp: str, transport: str = "udp") -> dict:
+    """
+    Send `rate_pps` frames/s for `duration` s to a fresh ground.ground over
+    `transport` (udp / tcp); what arrived and how late.
+    """
+    from ground.ground import load_config, run
+    from sat_sim.fsm import CubeSatFSM
+    from sat_sim.link import make_sender
+    from sat_sim.sensors import SensorSimulator
+
+    cfg = load_config()
+    udp_port = _free_port(socket.SOCK_DGRAM if transport == "udp" else socket.SOCK_STREAM)
+    http_port = _free_port(socket.SOCK_STREAM)
+    cfg.update({
+        "udp_host": "127.0.0.1", "udp_port": udp_port, "link_transport": transport,
+        "ground_log_dir": os.path.join(tmp, f"loop_{int(rate_pps)}"),
+        "ground_rollup_dir": os.path.join(tmp, f"rollup_{int(rate_pps)}"),
+        "ground_live_socket": None,   # don't collide with a running ground
+        "ground_shm_ring": f"cubesat_bench_ring_{os.getpid()}",
+        "ground_stats_http": f"127.0.0.1:{http_port}",
+        "ground_status_interval_sec": 3600,
+    })
+    ground = mp.Process(target=run, args=(cfg,), daemon=True)
+    ground.start()
+    deadline = time.monotonic() + 10
+    while _get_stats(http_port) is None:
+        if time.monotonic() > deadline or not ground.is_alive():
+            ground.kill()
+            raise RuntimeError("ground did not come up")
+        time.sleep(0.05)
+
+    sim, fsm, tx = SensorSimulator(cfg), CubeSatFSM(), make_sender(cfg)
+    tick = 0.001
+    sent = 0
+    owed = 0.0
+    t0 = time.perf_counter()
+    next_tick = t0
+    while True:
+        now = time.perf_counter()
+        if now - t0 >= duration:
+            break
+        owed += rate_pps * tick
+        while owed >= 1.0:
+            s = sim.step()
+            tx.send(pack_telemetry(
+                seq=sent & 0xFFFF, timestamp_ms=time.time_ns() // 1_000_000 & 0xFFFFFFFF,
+                mode=fsm.update(s), batt_mv=s['batt_mv'], temp_centideg=s['temp_centideg'],
+                press_pa=s['press_pa'], alt_cm=s['alt_cm'], gyro_xyz=s['gyro'],
+                acc_xyz=s['acc'], light=s['light']))
+            sent += 1
+            owed -= 1.0
+        next_tick += tick
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    elapsed = time.perf_counter() - t0
+
+    # stats publish once a second; wait until the count stops moving
+    last = -1
+    doc = None
+    for _ in range(20):
+        time.sleep(1.1)
+        doc = _get_stats(http_port) or doc
+        good = doc["link"]["total_good"] if doc else 0
+        if good == last or good >= sent:
+            break
+        last = good
+    ground.terminate()               # SIGTERM: ground flushes and closes its logs
+    ground.join(10)
+
+    link = doc["link"] if doc else {"total_good": 0, "total_bad": 0}
+    got = link["total_good"]
+    lat = ((doc or {}).get("latency_us") or {}).get("lifetime", {}).get("ground", {})
+    return {
+        "transport": transport,
+        "rate_target_pps": rate_pps,
+        "sent": sent,
+        "send_pps": round(sent / elapsed),
+        "received": got,
+        "bad": link["total_bad"],
+        "recv_pps": round(got / elapsed),
+        "loss_pct": round((sent - got) / sent * 100, 3) if sent else 0.0,
+        "kernel_drops": (doc or {}).get("kernel_drops"),
+        "ground_p50_us": lat.get("p50"),
+        "ground_p99_us": lat.get("p99"),
+    }
+
+
+# ---------------- results
+def meta() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, timeout=10).stdout.strip()
+        except OSError:
+            return ""
+    out = {
+        "commit": git("rev-parse", "--short", "HEAD") or "unknown",
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "subject": git("log", "-1", "--format=%s"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.platform(),
+        "cpus": os.cpu_count(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+    try:
+        import numpy
+        out["numpy"] = numpy.__version__
+    except ImportError:
+        pass
+    return out
+
+
+def compare(old: dict, new: dict, threshold: float = 10.0) -> list:
+    """Print a side-by-side table; return the names that regressed by more than threshold %."""
+    regressed = []
+    print(f"{'benchmark':<28} {old['meta']['commit']:>12} {new['meta']['commit']:>12}   change")
+    for name, n in new.get("micro", {}).items():
+        o = old.get("micro", {}).get(name)
+        if not o:
+            print(f"{name:<28} {'-':>12} {n['ns_per_op']:>10.1f}ns")
+            continue
+        change = (n["ns_per_op"] - o["ns_per_op"]) / o["ns_per_op"] * 100
+        flag = ""
+        if change > threshold:
+            flag = "  SLOWER"
+            regressed.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        if n.get("unit") == "B":
+            print(f"{name:<28} {o['mb_per_s']:>8.1f}MB/s {n['mb_per_s']:>8.1f}MB/s {change:+7.1f}%{flag}")
+        else:
+            print(f"{name:<28} {o['ns_per_op']:>10.1f}ns {n['ns_per_op']:>10.1f}ns {change:+7.1f}%{flag}")
+    old_loop = {(r.get("transport", "udp"), r["rate_target_pps"]): r for r in old.get("loopback", [])}
+    for n in new.get("loopback", []):
+        o = old_loop.get((n.get("transport", "udp"), n["rate_target_pps"]))
+        name = f"loopback/{n.get('transport', 'udp')}@{n['rate_target_pps']:g}pps"
+        if not o:
+            print(f"{name:<28} {'-':>12} {n['loss_pct']:>10.2f}% lost")
+            continue
+        # loss is the signal here; a point of extra loss counts as a regression
+        flag = ""
+        if n["loss_pct"] - o["loss_pct"] > 1.0:
+            flag = "  MORE LOSS"
+            regressed.append(name)
+        print(f"{name:<28} {o['loss_pct']:>10.2f}% {n['loss_pct']:>10.2f}%  lost"
+              f"  p99 {o['ground_p99_us']}->{n['ground_p99_us']}us{flag}")
+    return regressed
+
+
+def cmd_run(args) -> int:
+    tmp = tempfile.mkdtemp(prefix="cubesat_bench_")
+    result = {"meta": meta(), "micro": {}, "loopback": []}
+    try:
+        for name, setup, items, unit in BENCHES:
+            if args.filter and args.filter not in name:
+                continue
+            try:
+                fn = setup(tmp)
+            except ImportError as e:          # e.g. NumPy for the bulk path
+                print(f"{name:<28} skipped ({e})")
+                continue
+            if isinstance(fn, tuple):
+                fn, items = fn
+            r = measure(fn, items, args.rounds, args.min_time, unit)
+            result["micro"][name] = r
+            if unit == "B":
+                print(f"{name:<28} {r['mb_per_s']:>10.1f} MB/s  ±{r['stdev_pct']}%")
+            else:
+                print(f"{name:<28} {r['ns_per_op']:>10.1f} ns/op  {r['ops_per_s']:>12,}/s  ±{r['stdev_pct']}%")
+        for close in _CLOSERS:
+            close()
+        if args.loopback:
+            for rate in args.rates:
+                r = loopback(rate, args.duration, tmp, args.transport)
+                result["loopback"].append(r)
+                print(f"{'loopback/' + args.transport + '@' + format(rate, 'g') + 'pps':<28} sent={r['sent']} recv={r['received']} "
+                      f"loss={r['loss_pct']}% kdrop={r['kernel_drops']} "
+                      f"ground p50/p99={r['ground_p50_us']}/{r['ground_p99_us']}us")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{result['meta']['commit']}"
+                                   f"{'-dirty' if result['meta']['dirty'] else ''}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=1)
+    print(f"wrote {out}")
+    if args.compare:
+        with open(args.compare) as f:
+            return 1 if compare(json.load(f), result, args.threshold) else 0
+    return 0
+
+
+def cmd_compare(args) -> int:
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    return 1 if compare(old, new, args.threshold) else 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="cubesat-proto benchmarks")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run")
+    r.add_argument("--filter", default=None, help="only micro-benchmarks whose name contains this")
+    r.add_argument("--rounds", type=int, default=7)
+    r.add_argument("--min-time", type=float, default=0.1, help="seconds per round")
+    r.add_argument("--no-loopback", dest="loopback", action="store_false")
+    r.add_argument("--rates", type=lambda v: [float(x) for x in v.split(",")],
+                   default=[500.0, 2000.0, 8000.0], help="loopback frames/s, comma separated")
+    r.add_argument("--duration", type=float, default=5.0, help="seconds per loopback rate")
+    r.add_argument("--transport", choices=("udp", "tcp"), default="udp", help="loopback downlink")
+    r.add_argument("--out", default=None, help=f"default {RESULTS_DIR}/<commit>.json")
+    r.add_argument("--compare", default=None, help="earlier results file to compare against")
+    r.add_argument("--threshold", type=float, default=10.0, help="percent slower that counts as a regression")
+    r.set_defaults(func=cmd_run)
+    c = sub.add_parser("compare")
+    c.add_argument("old")
+    c.add_argument("new")
+    c.add_argument("--threshold", type=float, default=10.0)
+    c.set_defaults(func=cmd_compare)
+    args = ap.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Fleet load test: N simulated spacecraft against one ground process.
+
+The ground side is a ground.server.GroundServer (stats + optional logs)
+running in its own process, so its CPU time can be measured on its own.
+Each spacecraft has its own UDP socket (= its own source address); the
+fleet is spread over a few worker processes. With --sim vector (default)
+a worker simulates all of its spacecraft with one sat_sim.fleet
+FleetSimulator, a second of samples at a time, and sends slices of the
+packed frame buffer; --sim scalar runs one SensorSimulator + CubeSatFSM
+per spacecraft as sat_sim.main does. At the end the ground process reports
+sustained frames/sec, CPU per frame and per-spacecraft loss.
+
+Usage: PYTHONPATH=. python tools/load_test_fleet.py [--sats 100] [--rate-hz 10]
+           [--duration 10] [--workers 4] [--sim vector|scalar] [--log-dir DIR]
+"""
+import argparse, asyncio, multiprocessing as mp, os, resource, sys, time
+
+from sat_sim.fsm import CubeSatFSM
+from sat_sim.link import UDPSender
+from sat_sim.main import load_config
+from sat_sim.packet import pack_telemetry
+from sat_sim.sensors import SensorSimulator
+
+
+def ground_proc(port_q, result_q, stop_evt, log_dir):
+    from ground.ground import make_loggers
+    from ground.server import GroundServer, LoggerSink
+
+    async def main():
+        sinks = []
+        if log_dir:
+            cfg = {"ground_log_csv": False, "ground_log_jsonl": False, "ground_log_bin": True,
+                   "ground_per_source_logs": True}
+            _, _, binlog = make_loggers(cfg, log_dir)
+            sinks.append(LoggerSink("bin", binlog, raw=True))
+        server = GroundServer(sinks)
+        await server.start("127.0.0.1", 0)
+        ru0 = resource.getrusage(resource.RUSAGE_SELF)  # exclude interpreter start-up
+        port_q.put(server.address[1])
+        while not stop_evt.is_set():
+            await asyncio.sleep(0.05)
+        await server.stop()
+        ru = resource.getrusage(resource.RUSAGE_SELF)
+        result_q.put({
+            "fleet": server.stats.snapshot(),
+            "per_source": server.stats.per_source(),
+            "cpu_s": (ru.ru_utime + ru.ru_stime) - (ru0.ru_utime + ru0.ru_stime),
+        })
+
+    asyncio.run(main())
+
+
+def sat_worker(port, n_sats, rate_hz, duration, sent_q):
+    cfg = load_config()
+    sats = [(SensorSimulator(cfg), CubeSatFSM(), UDPSender("127.0.0.1", port)) for _ in range(n_sats)]
+    period = 1.0 / rate_hz
+    seq = 0
+    sent = 0
+    t_end = time.perf_counter() + duration
+    next_tick = time.perf_counter()
+    while time.perf_counter() < t_end:
+        ts_ms = int(time.time() * 1000) & 0xFFFFFFFF
+        for sim, fsm, tx in sats:
+            s = sim.step()
+            tx.send(pack_telemetry(
+                seq=seq, timestamp_ms=ts_ms, mode=fsm.update(s),
+                batt_mv=s['batt_mv'], temp_centideg=s['temp_centideg'],
+                press_pa=s['press_pa'], alt_cm=s['alt_cm'],
+                gyro_xyz=s['gyro'], acc_xyz=s['acc'], light=s['light']))
+        sent += n_sats
+        seq = (seq + 1) & 0xFFFF
+        next_tick += period
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    sent_q.put(sent)
+
+
+SEND_BLOCK = 64
+
+
+def vector_sat_worker(port, n_sats, rate_hz, duration, sent_q):
+    import socket
+    from sat_sim.fleet import FleetSimulator
+    from sat_sim.packet import TM_FRAME_LEN
+
+    cfg = load_config()
+    socks = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(n_sats)]
+    dest = ("127.0.0.1", port)
+    period = 1.0 / rate_hz
+    chunk = max(1, int(rate_hz))            # ticks simulated per FleetSimulator call
+    fleet = FleetSimulator(n_sats, cfg, period_s=period, start=time.time(), seed=os.getpid())
+    sent = 0
+    t_end = time.perf_counter() + duration
+    next_tick = time.perf_counter()
+    while time.perf_counter() < t_end:
+        buf = memoryview(fleet.frames(chunk)).cast("B")
+        for j in range(chunk):
+            if time.perf_counter() >= t_end:
+                break
+            base = j * n_sats * TM_FRAME_LEN
+            # spread the tick over its period in blocks, not one burst of n_sats datagrams
+            for lo in range(0, n_sats, SEND_BLOCK):
+                hi = min(lo + SEND_BLOCK, n_sats)
+                for i in range(lo, hi):
+                    off = base + i * TM_FRAME_LEN
+                    socks[i].sendto(buf[off:off + TM_FRAME_LEN], dest)
+                delay = next_tick + period * hi / n_sats - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            sent += n_sats
+            next_tick += period
+    for sock in socks:
+        sock.close()
+    sent_q.put(sent)
+
+
+def raise_nofile(need: int):
+    """One socket per spacecraft: lift the soft fd limit toward the hard one."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    want = need + 64
+    if soft != resource.RLIM_INFINITY and soft < want:
+        new = want if hard == resource.RLIM_INFINITY else min(want, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (new, hard))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sats", type=int, default=100)
+    ap.add_argument("--rate-hz", type=float, default=10.0)
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    ap.add_argument("--sim", choices=("vector", "scalar"), default="vector",
+                    help="vector: one NumPy FleetSimulator per worker; scalar: one SensorSimulator per spacecraft")
+    ap.add_argument("--log-dir", default=None, help="also write per-spacecraft binary logs here")
+    args = ap.parse_args()
+    target = vector_sat_worker if args.sim == "vector" else sat_worker
+
+    port_q, result_q, sent_q = mp.Queue(), mp.Queue(), mp.Queue()
+    stop_evt = mp.Event()
+    ground = mp.Process(target=ground_proc, args=(port_q, result_q, stop_evt, args.log_dir))
+    ground.start()
+    port = port_q.get(timeout=10)
+
+    per_worker = [args.sats // args.workers + (1 if i < args.sats % args.workers else 0)
+                  for i in range(args.workers)]
+    raise_nofile(max(per_worker))
+    workers = [mp.Process(target=target, args=(port, n, args.rate_hz, args.duration, sent_q))
+               for n in per_worker if n]
+    t0 = time.perf_counter()
+    for w in workers:
+        w.start()
+    sent = sum(sent_q.get() for _ in workers)
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - t0
+    time.sleep(0.5)  # let the ground drain its socket
+    stop_evt.set()
+    res = result_q.get(timeout=30)
+    ground.join()
+
+    fleet = res["fleet"]
+    good = fleet["total_good"]
+    worst = max(res["per_source"].items(), key=lambda kv: kv[1]["seq_loss"], default=(None, {"seq_loss": 0}))
+    print(f"spacecraft: {args.sats} @ {args.rate_hz} Hz for {args.duration}s "
+          f"({len(workers)} sender procs, {args.sim} sim)")
+    print(f"sent={sent} received={good} bad={fleet['total_bad']} sources={fleet['sources']} "
+          f"unreceived={sent - good} ({(sent - good) / sent * 100 if sent else 0:.2f}%)")
+    print(f"sustained {good / elapsed:,.0f} frames/s   ground CPU {res['cpu_s'] / good * 1e6 if good else 0:.1f} us/frame")
+    print(f"worst spacecraft: {worst[0]} seq_loss={worst[1]['seq_loss']}")
+    if fleet["sources"] != args.sats:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,72 +1,317 @@
 # tools/plot_from_log.py
-import os, sys, json, csv
-import matplotlib.pyplot as plt
+"""
+Plot any telemetry fields from a ground log (.jsonl, .csv or binary .tlm,
+or a directory of .tlm segments) in bounded memory and time.
 
-def load_jsonl(path):
-    rows = []
-    with open(path, "r") as f:
-        for line in f:
+Rows are streamed through ground.query (so a time window only reads that
+part of the log) and folded into at most --points min/max buckets per
+series as they go by: when the buckets run out, neighbours are merged and
+the bucket width doubles. Each bucket contributes its min and max sample
+in time order, so spikes survive downsampling. --method lttb further
+thins those points with Largest-Triangle-Three-Buckets.
+
+With --rollups (the ground's ground_rollup_dir), --step or a span of more
+than a second per point is answered from the 1 s / 1 min / 1 h rollups
+(ground.rollup) at the coarsest resolution that fits, plotted as the mean
+with a min/max band: a month costs its hourly buckets, not its frames.
+
+Usage: PYTHONPATH=. python tools/plot_from_log.py ground/logs/latest.jsonl
+           [--fields temp_c,batt_mv] [--start S] [--end S | --last S]
+           [--points 2000] [--method minmax|lttb] [--overlay] [--out plot.png]
+       PYTHONPATH=. python tools/plot_from_log.py --rollups ground/rollups --last 604800
+           [--step 3600] [--tag 127.0.0.1_40000]
+"""
+import argparse, os, sys, time
+
+from ground import rollup
+from ground.query import query, read_index
+
+DEFAULT_FIELDS = {
+    "tlm": ["temp_centideg", "batt_mv", "alt_cm"],
+    "jsonl": ["temp_c", "batt_mv", "alt_cm"],
+    "csv": ["temp_c", "batt_mv", "alt_cm"],
+}
+
+
+class MinMaxBuckets:
+    """
+    Streaming min/max downsampler for one series with at most `max_buckets`
+    buckets of equal time width. Samples must arrive in time order.
+    """
+    def __init__(self, max_buckets: int, width: float = 1e-3):
+        self.max_buckets = max(2, max_buckets)
+        self.width = width
+        self.t0 = None
+        self.buckets = []   # [index, tmin, vmin, tmax, vmax]
+
+    def add(self, t: float, v: float):
+        if self.t0 is None:
+            self.t0 = t
+        i = int((t - self.t0) // self.width)
+        while i >= self.max_buckets:
+            self._coarsen()
+            i = int((t - self.t0) // self.width)
+        b = self.buckets[-1] if self.buckets else None
+        if b is not None and i < b[0]:
+            i = b[0]   # clock stepped back: fold into the current bucket
+        if b is None or b[0] != i:
+            self.buckets.append([i, t, v, t, v])
+        else:
+            if v < b[2]:
+                b[1], b[2] = t, v
+            if v > b[4]:
+                b[3], b[4] = t, v
+
+    def _coarsen(self):
+        self.width *= 2
+        merged = []
+        for b in self.buckets:
+            i = b[0] // 2
+            if merged and merged[-1][0] == i:
+                m = merged[-1]
+                if b[2] < m[2]:
+                    m[1], m[2] = b[1], b[2]
+                if b[4] > m[4]:
+                    m[3], m[4] = b[3], b[4]
+            else:
+                merged.append([i, b[1], b[2], b[3], b[4]])
+        self.buckets = merged
+
+    def points(self):
+        """(ts, vs) with each bucket's min and max in time order."""
+        ts, vs = [], []
+        for _i, tmin, vmin, tmax, vmax in self.buckets:
+            pair = ((tmin, vmin), (tmax, vmax)) if tmin <= tmax else ((tmax, vmax), (tmin, vmin))
+            for t, v in pair:
+                if not ts or ts[-1] != t:
+                    ts.append(t)
+                    vs.append(v)
+        return ts, vs
+
+
+def lttb(ts, vs, n_out: int):
+    """Largest-Triangle-Three-Buckets: keep n_out points that preserve the shape."""
+    n = len(ts)
+    if n_out >= n or n_out < 3:
+        return ts, vs
+    out_t, out_v = [ts[0]], [vs[0]]
+    every = (n - 2) / (n_out - 2)
+    a = 0
+    for i in range(n_out - 2):
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        nlo, nhi = hi, min(int((i + 2) * every) + 1, n)
+        cnt = max(1, nhi - nlo)
+        avg_t = sum(ts[nlo:nhi]) / cnt if nhi > nlo else ts[-1]
+        avg_v = sum(vs[nlo:nhi]) / cnt if nhi > nlo else vs[-1]
+        best, best_area = lo, -1.0
+        at, av = ts[a], vs[a]
+        for j in range(lo, hi):
+            area = abs((at - avg_t) * (vs[j] - av) - (at - ts[j]) * (avg_v - av))
+            if area > best_area:
+                best, best_area = j, area
+        out_t.append(ts[best])
+        out_v.append(vs[best])
+        a = best
+    out_t.append(ts[-1])
+    out_v.append(vs[-1])
+    return out_t, out_v
+
+
+def _kind(path: str) -> str:
+    if os.path.isdir(path):
+        return "tlm"
+    return path.rsplit(".", 1)[-1]
+
+
+def _time_field(kind: str):
+    # (field, divisor to seconds)
+    return ("ground_ts_ms", 1000.0) if kind == "tlm" else ("timestamp", 1.0)
+
+
+def _feed_tlm_columns(path, series, start_ms, end_ms, chunk=1 << 20):
+    """
+    NumPy fast path for binary segments: memory-mapped columns are cut into
+    fixed-count slices, each slice's min and max go to the streaming
+    buckets. Returns the number of samples seen.
+    """
+    import numpy as np
+    from ground.query import log_files, query_columns
+    n = 0
+    fields = list(series)
+    for seg in (log_files(path) if os.path.isdir(path) else [path]):
+        cols = query_columns(seg, start_ms, end_ms, ["ground_ts_ms"] + fields)
+        total = len(cols["ground_ts_ms"])
+        n += total
+        for lo in range(0, total, chunk):
+            t = cols["ground_ts_ms"][lo:lo + chunk] / 1000.0
+            for f in fields:
+                s = series[f]
+                v = np.asarray(cols[f][lo:lo + chunk], dtype=np.float64)
+                per = max(1, len(v) // (s.max_buckets * 4))
+                for a in range(0, len(v), per * 4096):
+                    part = v[a:a + per * 4096]
+                    k = len(part) // per * per
+                    idx = []
+                    if k:
+                        grid = part[:k].reshape(-1, per)
+                        base = np.arange(0, k, per)
+                        idx = np.sort(np.concatenate((base + grid.argmin(axis=1),
+                                                      base + grid.argmax(axis=1))))
+                    for i in list(idx) + list(range(k, len(part))):
+                        s.add(float(t[a + i]), float(part[i]))
+    return n
+
+
+def downsample(path, fields, start_ms=None, end_ms=None, points=2000):
+    """One MinMaxBuckets per field, fed by a single streaming pass over the log."""
+    tfield, div = _time_field(_kind(path))
+    series = {f: MinMaxBuckets(points // 2) for f in fields}
+    if _kind(path) == "tlm":
+        try:
+            return series, _feed_tlm_columns(path, series, start_ms, end_ms)
+        except ImportError:
+            pass   # no NumPy: stream rows like the text logs
+    n = 0
+    for row in query(path, start_ms, end_ms, [tfield] + list(fields)):
+        try:
+            t = float(row[tfield]) / div
+        except (TypeError, ValueError):
+            continue
+        n += 1
+        for f, s in series.items():
+            v = row.get(f)
+            if v is None or v == "":
+                continue
             try:
-                rows.append(json.loads(line))
-            except Exception:
-                pass
-    return rows
-
-def load_csv(path):
-    rows = []
-    with open(path, "r") as f:
-        r = csv.DictReader(f)
-        for row in r:
-            rows.append({k: (float(v) if v.replace('.','',1).isdigit() else v) for k, v in row.items()})
-    return rows
-
-def main(path):
-    if path.endswith(".jsonl"):
-        rows = load_jsonl(path)
-    elif path.endswith(".csv"):
-        rows = load_csv(path)
-    else:
-        print("Give a .jsonl or .csv file")
+                s.add(t, float(v))
+            except ValueError:
+                pass   # non-numeric (e.g. mode names)
+    return series, n
+
+
+def rollup_step_ms(start_ms, end_ms, step_s=None, points=2000):
+    """Step to read from the rollups: --step, else one that keeps a long span under `points`; None: raw log."""
+    if step_s is not None:
+        return int(step_s * 1000)
+    if start_ms is None or end_ms is None:
+        return None
+    per_point = (end_ms - start_ms) / max(1, points)
+    if per_point < rollup.RESOLUTIONS_MS[0]:
+        return None     # finer than the rollups: the raw log has the detail
+    res = max(r for r in rollup.RESOLUTIONS_MS if r <= per_point)
+    return -(-int(per_point) // res) * res
+
+
+def rollup_series(rollup_dir, fields, start_ms, end_ms, step_ms, tag=None):
+    """{field: (ts, mins, means, maxs)} per step from the rollups; (series, samples covered)."""
+    unknown = [f for f in fields if f not in rollup.ROLLUP_FIELDS]
+    if unknown:
+        raise ValueError(f"Not in the rollups: {', '.join(unknown)} (have {', '.join(rollup.ROLLUP_FIELDS)})")
+    rows = rollup.query(rollup_dir, start_ms, end_ms, step_ms, fields, tag)
+    ts = [r["start_ms"] / 1000.0 for r in rows]
+    series = {f: (ts, [r[f]["min"] for r in rows], [r[f]["mean"] for r in rows], [r[f]["max"] for r in rows])
+              for f in fields}
+    return series, sum(r["count"] for r in rows)
+
+
+def _last_ts_ms(path):
+    paths = [path]
+    if os.path.isdir(path):
+        from ground.query import log_files
+        paths = log_files(path)[-1:]
+    for p in paths:
+        entries = read_index(p)
+        if entries:
+            return entries[-1][1]
+    return None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("path", nargs="?", help=".jsonl / .csv / .tlm log, or a directory of .tlm segments")
+    ap.add_argument("--fields", default=None, help="comma separated (default: temperature, battery, altitude)")
+    ap.add_argument("--start", type=float, default=None, help="epoch seconds")
+    ap.add_argument("--end", type=float, default=None, help="epoch seconds")
+    ap.add_argument("--last", type=float, default=None, help="only the last N seconds of the log")
+    ap.add_argument("--points", type=int, default=2000, help="max plotted points per series")
+    ap.add_argument("--method", choices=("minmax", "lttb"), default="minmax")
+    ap.add_argument("--overlay", action="store_true", help="all series on one axes instead of stacked")
+    ap.add_argument("--out", default="plot.png")
+    ap.add_argument("--rollups", default=None, help="rollup directory: --step / long spans read from it")
+    ap.add_argument("--step", type=float, default=None, help="seconds per point, from --rollups")
+    ap.add_argument("--tag", default=None, help="spacecraft tag with per-source rollups")
+    args = ap.parse_args(argv)
+
+    kind = _kind(args.path) if args.path else None
+    if kind not in DEFAULT_FIELDS and not args.rollups:
+        print("Give a .jsonl, .csv or .tlm file (or a directory of .tlm segments), or --rollups")
         sys.exit(1)
+    fields = args.fields.split(",") if args.fields else DEFAULT_FIELDS.get(kind, DEFAULT_FIELDS["jsonl"])
+    start_ms = int(args.start * 1000) if args.start is not None else None
+    end_ms = int(args.end * 1000) if args.end is not None else None
+    if args.last is not None:
+        last = _last_ts_ms(args.path) if args.path else None
+        if last is None and args.rollups:
+            last = end_ms if end_ms is not None else time.time_ns() // 1_000_000
+        if last is not None:
+            start_ms = last - int(args.last * 1000)
+            if args.rollups and end_ms is None:
+                end_ms = last
 
-    if not rows:
+    step_ms = rollup_step_ms(start_ms, end_ms, args.step, args.points) if args.rollups else None
+    if args.rollups and step_ms is None and not args.path:
+        print("--rollups alone needs --step, or --start/--end or --last")
+        sys.exit(1)
+    if step_ms is not None:
+        if start_ms is None or end_ms is None:
+            end_ms = end_ms if end_ms is not None else time.time_ns() // 1_000_000
+            start_ms = start_ms if start_ms is not None else end_ms - step_ms * args.points
+        try:
+            bands, n = rollup_series(args.rollups, fields, start_ms, end_ms, step_ms, args.tag)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+    else:
+        # min/max at 2x the target when LTTB gets the final say
+        budget = args.points * 2 if args.method == "lttb" else args.points
+        series, n = downsample(args.path, fields, start_ms, end_ms, budget)
+    if not n:
         print("No data")
         sys.exit(1)
 
-    t = [r.get("timestamp", 0) for r in rows]
-    temp = [r.get("temp_c", 0) for r in rows]
-    batt = [r.get("batt_mv", 0) for r in rows]
-    alt  = [ (r.get("alt_cm", 0) or 0)/100.0 for r in rows]
-
-    # temp
-    plt.figure()
-    plt.plot(t, temp)
-    plt.xlabel("time (s)")
-    plt.ylabel("temperature (°C)")
-    plt.title("Temperature vs Time")
-    plt.savefig("plot_temp.png", dpi=150)
-
-    # battery
-    plt.figure()
-    plt.plot(t, batt)
-    plt.xlabel("time (s)")
-    plt.ylabel("battery (mV)")
-    plt.title("Battery vs Time")
-    plt.savefig("plot_batt.png", dpi=150)
-
-    # altitude
-    plt.figure()
-    plt.plot(t, alt)
-    plt.xlabel("time (s)")
-    plt.ylabel("altitude (m)")
-    plt.title("Altitude vs Time")
-    plt.savefig("plot_alt.png", dpi=150)
-
-    print("Saved: plot_temp.png, plot_batt.png, plot_alt.png")
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python tools/plot_from_log.py ground/logs/latest.jsonl")
-        sys.exit(1)
-    main(sys.argv[1])
+    n_axes = 1 if args.overlay else len(fields)
+    fig, axes = plt.subplots(n_axes, 1, sharex=True, squeeze=False,
+                             figsize=(10, 2.5 * n_axes if n_axes > 1 else 4))
+    axes = axes[:, 0]
+    for i, f in enumerate(fields):
+        ax = axes[0 if args.overlay else i]
+        if step_ms is not None:
+            ts, lo, mean, hi = bands[f]
+            ax.fill_between(ts, lo, hi, step="post", alpha=0.3, linewidth=0)
+            ax.step(ts, mean, where="post", linewidth=0.8, label=f)
+        else:
+            ts, vs = series[f].points()
+            if args.method == "lttb":
+                ts, vs = lttb(ts, vs, args.points)
+            ax.plot(ts, vs, linewidth=0.8, label=f)
+        if not args.overlay:
+            ax.set_ylabel(f)
+    if args.overlay:
+        axes[0].legend()
+    axes[-1].set_xlabel("ground time (s)")
+    if step_ms is not None:
+        fig.suptitle(f"rollups {os.path.basename(args.rollups.rstrip(os.sep))}: {n:,} samples, "
+                     f"{step_ms / 1000:g} s steps")
+    else:
+        fig.suptitle(f"{os.path.basename(args.path.rstrip(os.sep))}: {n:,} samples")
+    fig.tight_layout()
+    fig.savefig(args.out, dpi=150)
+    print(f"Saved: {args.out} ({n:,} samples, <= {args.points} points per series)")
 
+if __name__ == "__main__":
+    main()